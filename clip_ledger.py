@@ -0,0 +1,313 @@
+"""
+SQLite ledger of every recording the clip processor has seen.
+
+Recordings are identified by their normalized path plus size and modification time, so duplicate
+create events and restarts don't process the same recording twice, while a recording that is
+saved again under the same name (different size/mtime) is treated as new. Each entry keeps the
+timestamps of every stage, the chosen CRF, the output size and the upload status of every webhook
+target, which the report at the bottom of this module turns into per-game throughput and latency
+figures.
+
+The ledger is also the durable job queue: the status column records how far each clip got, so
+after a crash or a stop the next run resumes every unfinished clip from its last finished stage.
+
+Run this module directly to print the report.
+"""
+import os
+import time
+import sqlite3
+import threading
+import os.path as path
+
+import config_helper
+
+LEDGER_FILE = 'clip_ledger.db'
+
+# Clip states
+STATUS_PENDING = 'pending'      # Finished recording, waiting for a worker
+STATUS_ENCODING = 'encoding'    # A worker is trimming and compressing it
+STATUS_ENCODED = 'encoded'      # Output file written, waiting for the uploader
+STATUS_UPLOADING = 'uploading'  # The uploader is sending it to Discord
+STATUS_DONE = 'done'            # Sent to Discord
+STATUS_FAILED = 'failed'        # Processing or upload failed - the recording may be retried
+
+# Clips in these states are picked up again by the next run
+RESUMABLE_STATUSES = (STATUS_PENDING, STATUS_ENCODING, STATUS_ENCODED, STATUS_UPLOADING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_key TEXT NOT NULL,
+    source_size INTEGER NOT NULL,
+    source_mtime REAL NOT NULL,
+    source_path TEXT NOT NULL,
+    game TEXT,
+    status TEXT NOT NULL,
+    detected_at REAL,
+    queued_at REAL,
+    encode_started_at REAL,
+    encode_finished_at REAL,
+    upload_started_at REAL,
+    upload_finished_at REAL,
+    crf INTEGER,
+    output_path TEXT,
+    output_size_mb REAL,
+    upload_status TEXT,
+    error TEXT,
+    UNIQUE (source_key, source_size, source_mtime)
+)
+"""
+
+# One row per clip and webhook target it is sent to
+UPLOADS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clip_uploads (
+    clip_id INTEGER NOT NULL REFERENCES clips (id),
+    target TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    PRIMARY KEY (clip_id, target)
+)
+"""
+
+# Upload states for each target
+UPLOAD_PENDING = 'pending'
+UPLOAD_SENT = 'sent'
+UPLOAD_FAILED = 'failed'
+
+
+def source_fingerprint(filepath):
+    """(normalized path, size, mtime) identifying one version of a recording"""
+    stat = os.stat(filepath)
+    return path.normcase(path.normpath(os.path.abspath(filepath))), stat.st_size, stat.st_mtime
+
+
+class ClipLedger:
+    """Thread-safe access to the clip ledger database"""
+
+    def __init__(self, filename=LEDGER_FILE):
+        self.db_path = config_helper.get_config_file_path(filename)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute(SCHEMA)
+            self.connection.execute(UPLOADS_SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _execute(self, sql, params=()):
+        with self.lock, self.connection:
+            return self.connection.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def claim(self, filepath, game, detected_at=None):
+        """Register a finished recording before it is queued.
+
+        Returns the clip id to pass to the later stages, or None if this exact recording has
+        already been processed (or is being processed) and should be skipped. Recordings whose
+        earlier attempt failed are claimed again. If only uploads failed and the output file is
+        still there, the clip goes back to STATUS_ENCODED with its unsent targets pending, so
+        only those uploads have to be repeated.
+        """
+        source_key, source_size, source_mtime = source_fingerprint(filepath)
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT id, status, output_path, upload_status FROM clips "
+                "WHERE source_key = ? AND source_size = ? AND source_mtime = ?",
+                (source_key, source_size, source_mtime)
+            ).fetchone()
+            if row is None:
+                cursor = self.connection.execute(
+                    "INSERT INTO clips (source_key, source_size, source_mtime, source_path, game, status, "
+                    "detected_at, queued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source_key, source_size, source_mtime, filepath, game, STATUS_PENDING, detected_at or now, now)
+                )
+                return cursor.lastrowid
+            if row['status'] != STATUS_FAILED:
+                return None
+            if row['upload_status'] and row['output_path'] and os.path.exists(row['output_path']):
+                self.connection.execute(
+                    "UPDATE clip_uploads SET status = ?, started_at = NULL, finished_at = NULL, error = NULL "
+                    "WHERE clip_id = ? AND status = ?", (UPLOAD_PENDING, row['id'], UPLOAD_FAILED)
+                )
+                self.connection.execute(
+                    "UPDATE clips SET status = ?, queued_at = ?, upload_finished_at = NULL, upload_status = NULL, "
+                    "error = NULL WHERE id = ?", (STATUS_ENCODED, now, row['id'])
+                )
+                return row['id']
+            self.connection.execute(
+                "UPDATE clips SET status = ?, detected_at = ?, queued_at = ?, error = NULL WHERE id = ?",
+                (STATUS_PENDING, detected_at or now, now, row['id'])
+            )
+            return row['id']
+
+    def encode_started(self, clip_id):
+        self._execute("UPDATE clips SET status = ?, encode_started_at = ? WHERE id = ?",
+                      (STATUS_ENCODING, time.time(), clip_id))
+
+    def encoded(self, clip_id, output_path, output_size_mb, crf, targets):
+        """Record the finished output file and the webhook targets it still has to be sent to.
+
+        Targets an earlier attempt already sent the clip to stay sent.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE clips SET status = ?, encode_finished_at = ?, output_path = ?, output_size_mb = ?, crf = ? "
+                "WHERE id = ?",
+                (STATUS_ENCODED, time.time(), output_path, output_size_mb, crf, clip_id)
+            )
+            self.connection.executemany(
+                "INSERT INTO clip_uploads (clip_id, target, status) VALUES (?, ?, ?) "
+                "ON CONFLICT (clip_id, target) DO UPDATE SET status = excluded.status, started_at = NULL, "
+                "finished_at = NULL, error = NULL WHERE status != ?",
+                [(clip_id, target, UPLOAD_PENDING, UPLOAD_SENT) for target in targets]
+            )
+
+    def upload_started(self, clip_id, target):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE clips SET status = ?, upload_started_at = COALESCE(upload_started_at, ?) WHERE id = ?",
+                (STATUS_UPLOADING, now, clip_id)
+            )
+            self.connection.execute(
+                "UPDATE clip_uploads SET started_at = ? WHERE clip_id = ? AND target = ?", (now, clip_id, target)
+            )
+
+    def upload_finished(self, clip_id, target, success, error=None):
+        """Record one target's upload result, finishing the clip once every target has a result"""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE clip_uploads SET status = ?, finished_at = ?, error = ? WHERE clip_id = ? AND target = ?",
+                (UPLOAD_SENT if success else UPLOAD_FAILED, now, error, clip_id, target)
+            )
+            statuses = [row['status'] for row in self.connection.execute(
+                "SELECT status FROM clip_uploads WHERE clip_id = ?", (clip_id,)
+            )]
+            if UPLOAD_PENDING in statuses:
+                return
+            sent = statuses.count(UPLOAD_SENT)
+            if sent == len(statuses):
+                status, upload_status = STATUS_DONE, 'sent'
+            else:
+                status, upload_status = STATUS_FAILED, 'partial' if sent else 'failed'
+            self.connection.execute(
+                "UPDATE clips SET status = ?, upload_finished_at = ?, upload_status = ?, error = ? WHERE id = ?",
+                (status, now, upload_status, error, clip_id)
+            )
+
+    def pending_targets(self, clip_id):
+        """Webhook targets an encoded clip has not been sent to yet"""
+        return [row['target'] for row in self._query(
+            "SELECT target FROM clip_uploads WHERE clip_id = ? AND status = ?", (clip_id, UPLOAD_PENDING)
+        )]
+
+    def job(self, clip_id):
+        """The ledger row of a clip as a dict"""
+        rows = self._query("SELECT * FROM clips WHERE id = ?", (clip_id,))
+        return dict(rows[0]) if rows else None
+
+    def failed(self, clip_id, error):
+        self._execute("UPDATE clips SET status = ?, error = ? WHERE id = ?", (STATUS_FAILED, str(error), clip_id))
+
+    def requeue(self, clip_id):
+        """Put a clip whose encode was interrupted back in the pending state"""
+        self._execute("UPDATE clips SET status = ?, encode_started_at = NULL WHERE id = ?", (STATUS_PENDING, clip_id))
+
+    def resumable_jobs(self):
+        """Clips a previous run left unfinished, oldest first"""
+        placeholders = ', '.join('?' for _ in RESUMABLE_STATUSES)
+        return [dict(row) for row in self._query(
+            f"SELECT * FROM clips WHERE status IN ({placeholders}) ORDER BY id", RESUMABLE_STATUSES
+        )]
+
+    def source_unchanged(self, job):
+        """True if the recording a job was created for still exists unmodified"""
+        try:
+            return source_fingerprint(job['source_path']) == (job['source_key'], job['source_size'], job['source_mtime'])
+        except OSError:
+            return False
+
+    def game_report(self):
+        """Per-game throughput and latency figures, one dict per game"""
+        rows = self._query("""
+            SELECT game,
+                   COUNT(*) AS clips,
+                   SUM(status = 'done') AS sent,
+                   SUM(status = 'failed') AS failed,
+                   AVG(encode_finished_at - encode_started_at) AS avg_encode_seconds,
+                   AVG(upload_finished_at - upload_started_at) AS avg_upload_seconds,
+                   AVG(CASE WHEN status = 'done' THEN upload_finished_at - detected_at END) AS avg_latency_seconds,
+                   MAX(CASE WHEN status = 'done' THEN upload_finished_at - detected_at END) AS max_latency_seconds,
+                   AVG(output_size_mb) AS avg_output_mb,
+                   AVG(crf) AS avg_crf
+            FROM clips
+            GROUP BY game
+            ORDER BY clips DESC
+        """)
+        busy_seconds = self._busy_seconds_per_game()
+        report = []
+        for row in rows:
+            entry = dict(row)
+            busy_hours = busy_seconds.get(entry['game'], 0) / 3600
+            entry['clips_per_busy_hour'] = (entry['sent'] or 0) / busy_hours if busy_hours > 0 else None
+            report.append(entry)
+        return report
+
+    def _busy_seconds_per_game(self):
+        """Seconds each game had at least one clip between encode start and its last upload.
+
+        Overlapping clips (several workers, or an upload running while the next clip encodes) are
+        only counted once, and time between play sessions not at all.
+        """
+        rows = self._query("""
+            SELECT game, encode_started_at AS started_at,
+                   COALESCE(upload_finished_at, encode_finished_at) AS finished_at
+            FROM clips
+            WHERE encode_started_at IS NOT NULL AND COALESCE(upload_finished_at, encode_finished_at) IS NOT NULL
+            ORDER BY game, started_at
+        """)
+        busy = {}
+        span_start = span_end = None
+        game = None
+        for row in rows:
+            if span_end is None or row['game'] != game or row['started_at'] > span_end:
+                if span_end is not None:
+                    busy[game] = busy.get(game, 0) + span_end - span_start
+                game, span_start, span_end = row['game'], row['started_at'], row['finished_at']
+            else:
+                span_end = max(span_end, row['finished_at'])
+        if span_end is not None:
+            busy[game] = busy.get(game, 0) + span_end - span_start
+        return busy
+
+
+def print_report(ledger):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    report = ledger.game_report()
+    if not report:
+        print("The clip ledger is empty")
+        return
+    print(f"{'Game':<28}{'Clips':>7}{'Sent':>7}{'Failed':>8}{'Encode s':>10}{'Upload s':>10}"
+          f"{'Latency s':>11}{'Max s':>8}{'Avg MB':>8}{'CRF':>6}{'Clips/busy h':>14}")
+    for entry in report:
+        print(f"{(entry['game'] or '-')[:27]:<28}{entry['clips']:>7}{entry['sent'] or 0:>7}{entry['failed'] or 0:>8}"
+              f"{fmt(entry['avg_encode_seconds'], '.1f'):>10}{fmt(entry['avg_upload_seconds'], '.1f'):>10}"
+              f"{fmt(entry['avg_latency_seconds'], '.1f'):>11}{fmt(entry['max_latency_seconds'], '.1f'):>8}"
+              f"{fmt(entry['avg_output_mb'], '.2f'):>8}{fmt(entry['avg_crf'], '.1f'):>6}"
+              f"{fmt(entry['clips_per_busy_hour'], '.1f'):>14}")
+
+
+if __name__ == "__main__":
+    print_report(ClipLedger())
@@ -1,11 +1,9 @@
 import os
 import time
-import requests
 import ffmpeg
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime
-import ntpath
 import math
 from dotenv import load_dotenv
 import sys
@@ -16,10 +14,23 @@ import io
 import threading
 import subprocess
 import queue
+import re
 import os.path as path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Import our config helper for proper path handling
 import config_helper
+import ffmpeg_runner
+from ffmpeg_runner import EncodeCancelled, EncodeStoppedEarly
+from crf_predictor import CrfSizeModel
+from crf_search import CrfSearch, DEFAULT_LOG_SLOPE
+from file_readiness import ReadinessChecker
+from clip_ledger import ClipLedger, STATUS_ENCODED, STATUS_UPLOADING
+from discord_uploader import DiscordUploader, UploadError, UploadCancelled, set_upload_limit, with_wait, attachment_url
+from reshare_cache import ReshareCache, file_sha256
+from video_codecs import CODEC_X264, get_codec
+from resolution_ladder import parse_frame_rate, plan_rung, rung_filter, rung_filters, bits_per_pixel
+from metrics import Metrics, MetricsServer, COUNTER, GAUGE, HISTOGRAM
 
 # Get application path for executable/script mode
 application_path = config_helper.get_application_path()
@@ -32,6 +43,34 @@ DEFAULTS_FILE = 'defaults.json'
 # Compression method constants
 COMPRESSION_PROGRESSIVE = "Progressive"  # Current multi-pass approach
 COMPRESSION_QUICK = "Quick"  # Simple one-pass approach with high quality
+COMPRESSION_TWO_PASS = "Two-Pass"  # Bitrate calculated from the target size, encoded in two passes
+
+# Extraction mode constants
+EXTRACT_STREAM_COPY = "Stream Copy"  # Cut on a keyframe without re-encoding when the source allows it
+EXTRACT_REENCODE = "Re-encode"  # Always re-encode the trimmed section at HIGH_QUALITY_CRF
+
+# Video codecs that can be stream copied into the MP4 intermediate file
+STREAM_COPY_VIDEO_CODECS = ('h264', 'hevc')
+# Furthest (seconds) the keyframe cut may start before the requested clip start
+STREAM_COPY_MAX_KEYFRAME_OFFSET = 3.0
+
+# CRF distance between neighbouring candidates when trials run in parallel
+PARALLEL_CRF_SPREAD = 3
+
+# Sampled size estimation: short evenly spaced slices encoded at a couple of CRFs
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 1.0
+SAMPLE_CRF_OFFSETS = (-4, 4)  # Sample CRFs relative to the starting CRF
+
+# Seconds between "Encode progress:" lines for one encode
+ENCODE_PROGRESS_INTERVAL = 1.0
+# Share of a Progressive trial that must be encoded before its projected size can stop it early
+EARLY_ABORT_MIN_PROGRESS = 0.2
+
+# Fraction of the size budget given to the encoder in Two-Pass mode, leaving room for MP4 container overhead
+TWO_PASS_SIZE_MARGIN = 0.97
+# Lowest video bitrate (kbps) Two-Pass mode will ask for, however long the clip is
+TWO_PASS_MIN_VIDEO_KBPS = 100
 
 # Default config definition
 DEFAULT_CONFIG = {
@@ -45,22 +84,40 @@ DEFAULT_CONFIG = {
     'CRF_MAX': 30,
     'CRF_STEP': 1,
     'EXTRACT_PRESET': "fast",
+    'EXTRACT_MODE': EXTRACT_STREAM_COPY,
     'COMPRESSION_PRESET': "medium",
+    'VIDEO_CODEC': CODEC_X264,  # Encoder for the final clip: libx264, libx265, libsvtav1 or libvpx-vp9
     'CLIP_DURATION': 15,
     'HIGH_QUALITY_CRF': 18,
-    'CLOSE_THRESHOLD': 0.9,
-    'MEDIUM_THRESHOLD': 0.75,
-    'FAR_THRESHOLD': 0.5,
     'WEBHOOK_URL': "",
+    'WEBHOOK_URLS': [],  # Send every clip to all of these webhooks (WEBHOOK_URL is used when empty)
     'COMPRESSION_METHOD': COMPRESSION_QUICK,
     'QUICK_CRF': 40,  # New setting for the CRF value used in Quick compression method
+    'QUICK_DIRECT_ENCODE': True,  # Trim and compress in a single FFmpeg run in Quick mode
     'CPU_THREADS': 0,  # 0 means auto/all threads, otherwise limits threads used by FFmpeg
-    'USER_NAME': ""    # User's name to display in Discord messages
+    'MAX_CONCURRENT_JOBS': 1,  # Number of clips processed at the same time, sharing the CPU threads
+    'READY_STABLE_SECONDS': 2.0,  # A recording is complete once its size and mtime stop changing for this long
+    'READY_TIMEOUT_SECONDS': 120,  # Process a recording that stays open this long without changing anyway
+    'USER_NAME': "",   # User's name to display in Discord messages
+    'UPLOAD_LIMIT_KBPS': 0,  # Upload bandwidth cap in KB/s shared by all uploads, 0 = unlimited
+    'RESHARE_CACHE': True,  # Post the link of an earlier upload instead of uploading the same clip again
+    'RESHARE_CACHE_MAX_AGE_HOURS': 20,  # Discord attachment links expire, so cached links are only reused this long
+    'AUDIO_BITRATE_KBPS': 128,  # AAC bitrate of compressed clips, reserved inside the size target
+    'AUDIO_CHANNELS': 0,  # 0 keeps the recording's channels, 1 = mono, 2 = stereo downmix
+    'CRF_PREDICTOR': True,  # Learn which CRF hits the target size per game and start Progressive there
+    'PARALLEL_CRF_TRIALS': 1,  # Number of Progressive CRF trials to encode at once (1 = one after another)
+    'SPLIT_CRF_TRIALS': False,  # Encode the parallel CRF trials in one FFmpeg process that decodes the clip once
+    'RESOLUTION_LADDER': True,  # Lower the resolution/frame rate when the size budget is too small for the source
+    'LADDER_MIN_BPP': 0.06,  # Fewest x264 bits per pixel the ladder accepts before stepping down a rung
+    'EARLY_ABORT_MARGIN': 0.25,  # Stop a Progressive trial projected this far outside the size range, 0 = off
+    'SAMPLE_ESTIMATION': True,  # Estimate the full-clip size from short samples before the first real encode
+    'METRICS_PORT': 0  # Serve stage timings on http://127.0.0.1:<port>/metrics, 0 = off
 }
 
 # Global variables
 CONFIG = None
 WEBHOOK_URL = None
+WEBHOOK_URLS = None  # Every webhook target a clip is sent to
 SHADOWPLAY_FOLDER = None
 OUTPUT_FOLDER = None
 MIN_SIZE_MB = None
@@ -71,24 +128,75 @@ CRF_MIN = None
 CRF_MAX = None
 CRF_STEP = None
 EXTRACT_PRESET = None
+EXTRACT_MODE = None
 COMPRESSION_PRESET = None
+VIDEO_CODEC = None
 CLIP_DURATION = None
 HIGH_QUALITY_CRF = None
-CLOSE_THRESHOLD = None
-MEDIUM_THRESHOLD = None
-FAR_THRESHOLD = None
 COMPRESSION_METHOD = None
 QUICK_CRF = None
+QUICK_DIRECT_ENCODE = None
 CPU_THREADS = None  # New global variable for CPU thread control
+MAX_CONCURRENT_JOBS = None
+READY_STABLE_SECONDS = None
+READY_TIMEOUT_SECONDS = None
 USER_NAME = None    # New global variable for user's name
+UPLOAD_LIMIT_KBPS = None
+RESHARE_CACHE = None
+RESHARE_CACHE_MAX_AGE_HOURS = None
+AUDIO_BITRATE_KBPS = None
+AUDIO_CHANNELS = None
+CRF_PREDICTOR = None
+PARALLEL_CRF_TRIALS = None
+SPLIT_CRF_TRIALS = None
+SAMPLE_ESTIMATION = None
+RESOLUTION_LADDER = None
+LADDER_MIN_BPP = None
+EARLY_ABORT_MARGIN = None
+METRICS_PORT = None
+video_codec = None  # Encoder profile for VIDEO_CODEC, created in run()
+crf_model = None  # Learned CRF -> size model, created in run() when CRF_PREDICTOR is enabled
 global_observer = None
 global_stop_event = None
 processing_queue = queue.Queue()  # Queue for pending clip processing tasks
-is_processing = False  # Flag to track if we're currently processing a clip
+worker_threads = []  # Clip processing workers started by run()
+active_jobs = 0  # Number of clips the workers are processing right now
 processing_lock = threading.Lock()  # Lock to synchronize access to processing state
 abort_processing = False  # Flag to signal active processing to abort
-active_processing_event = threading.Event()  # Used to signal when processing is actually complete
+active_processing_event = threading.Event()  # Set while any worker is processing a clip
+reserved_filenames = set()  # Output filenames claimed by clips that are still being processed
+upload_queues = {}  # Webhook URL -> queue of finished clips waiting to be sent to it
+uploader_threads = []  # One uploader per webhook target, started by run()
 file_detection_times = {}  # Dictionary to track when files were first detected
+readiness_checker = None  # Waits for new recordings to finish being written, created in run()
+clip_ledger = None  # SQLite record of processed recordings, created in run()
+discord_uploader = None  # Pooled, retrying webhook client, created in run()
+reshare_cache = None  # Attachment URLs of uploaded clips, created in run() when RESHARE_CACHE is enabled
+metrics_server = None  # Local HTTP endpoint for pipeline_metrics, started in run() when METRICS_PORT is set
+
+# Stage timings and throughput of the pipeline, kept for the whole session across stop/start
+METRIC_STAGE_SECONDS = 'autoclip_stage_duration_seconds'
+METRIC_COMPRESSION_SECONDS = 'autoclip_compression_attempt_duration_seconds'
+METRIC_CLIP_SECONDS = 'autoclip_clip_processing_seconds'
+METRIC_CLIPS = 'autoclip_clips_total'
+METRIC_UPLOADS = 'autoclip_uploads_total'
+METRIC_UPLOADED_BYTES = 'autoclip_uploaded_bytes_total'
+pipeline_metrics = Metrics()
+pipeline_metrics.define(METRIC_STAGE_SECONDS, HISTOGRAM,
+                        "Seconds spent per pipeline stage (readiness_wait, probe, extraction, audio, file_move, upload)")
+pipeline_metrics.define(METRIC_COMPRESSION_SECONDS, HISTOGRAM, "Seconds per compression attempt, by kind of encode")
+pipeline_metrics.define(METRIC_CLIP_SECONDS, HISTOGRAM, "Seconds from detecting a recording to handing the finished clip to the uploaders")
+pipeline_metrics.define(METRIC_CLIPS, COUNTER, "Clips processed, by result")
+pipeline_metrics.define(METRIC_UPLOADS, COUNTER, "Clips sent to webhooks, by result")
+pipeline_metrics.define(METRIC_UPLOADED_BYTES, COUNTER, "Bytes of clip files uploaded to Discord")
+pipeline_metrics.define('autoclip_queue_depth', GAUGE, "Recordings waiting to be processed",
+                        lambda: processing_queue.qsize())
+pipeline_metrics.define('autoclip_upload_queue_depth', GAUGE, "Clips waiting to be uploaded, summed over all webhooks",
+                        lambda: sum(target_queue.qsize() for target_queue in list(upload_queues.values())))
+pipeline_metrics.define('autoclip_jobs_in_flight', GAUGE, "Clips the workers are processing right now",
+                        lambda: active_jobs)
+pipeline_metrics.define('autoclip_ffmpeg_processes', GAUGE, "FFmpeg processes running right now",
+                        ffmpeg_runner.running_count)
 
 def load_config():
     """Load configuration with fallback to defaults"""
@@ -111,9 +219,8 @@ def load_config():
         # Print a more concise configuration summary
         print(f"Configuration loaded successfully")
         
-        # Verify webhook URL exists
-        webhook_url = config.get('WEBHOOK_URL', '')
-        if not webhook_url:
+        # Verify at least one webhook URL exists
+        if not webhook_targets(config):
             print("ERROR: No webhook URL configured. Please set the webhook URL in the application settings.")
             return None
             
@@ -123,92 +230,281 @@ def load_config():
         traceback.print_exc()
         return None
 
+def webhook_targets(config):
+    """Webhook URLs to send clips to: WEBHOOK_URLS, or the single WEBHOOK_URL when that's empty"""
+    urls = config.get('WEBHOOK_URLS') or [config.get('WEBHOOK_URL', '')]
+    if isinstance(urls, str):
+        urls = urls.splitlines()
+    targets = []
+    for url in urls:
+        url = url.strip()
+        if url and url not in targets:
+            targets.append(url)
+    return targets
+
+def webhook_label(webhook_url):
+    """Name a webhook target in the log without printing its secret token"""
+    if WEBHOOK_URLS and webhook_url in WEBHOOK_URLS and len(WEBHOOK_URLS) > 1:
+        return f"Discord webhook {WEBHOOK_URLS.index(webhook_url) + 1}"
+    return "Discord webhook"
+
 class ClipHandler(FileSystemEventHandler):
+    """Hands new recordings to the readiness checker, which queues them once they're fully written"""
+    
+    def is_new_recording(self, filepath):
+        if not filepath.lower().endswith(('.mp4', '.mov', '.avi')):
+            return False
+        # Skip files that are already in the output folder
+        if is_inside_folder(filepath, OUTPUT_FOLDER):
+            return False
+        # Recordings are saved in the main folder or directly inside a game folder
+        game_folder = recording_game_folder(filepath)
+        return game_folder is not None and game_folder.lower() != "auto-clips"
+    
+    def track_recording(self, filepath, detection_time=None):
+        # Save the detection time for later use in calculating processing time
+        # Normalize path to avoid lookup issues
+        normalized_path = path.normpath(filepath)
+        file_detection_times[normalized_path] = detection_time or datetime.now()
+        print(f"Recording start time for {normalized_path}")
+        readiness_checker.watch(filepath)
+        print(f"Waiting for {filepath} to finish writing")
+    
     def on_created(self, event):
         if event.is_directory:
+            # The recursive watch already covers it, this is just for the log
+            folder_path = path.normpath(event.src_path)
+            if (path.dirname(folder_path) == path.normpath(SHADOWPLAY_FOLDER)
+                    and not is_inside_folder(folder_path, OUTPUT_FOLDER)
+                    and path.basename(folder_path).lower() != "auto-clips"):
+                print(f"New game folder detected: {path.basename(folder_path)}")
             return
 
-        # Skip files that are already in the output folder
-        if OUTPUT_FOLDER.lower() in event.src_path.lower():
-            print(f"Skipping file in output folder: {event.src_path}")
+        if self.is_new_recording(event.src_path):
+            print(f"New file detected: {event.src_path}")
+            self.track_recording(event.src_path)
+    
+    def on_modified(self, event):
+        if not event.is_directory:
+            readiness_checker.touch(event.src_path)
+    
+    def on_moved(self, event):
+        if event.is_directory:
             return
+        
+        # Recorders that write to a temporary name rename the file once it's complete
+        readiness_checker.forget(event.src_path)
+        detection_time = file_detection_times.pop(path.normpath(event.src_path), None)
+        if self.is_new_recording(event.dest_path):
+            print(f"Recording renamed: {event.src_path} -> {event.dest_path}")
+            self.track_recording(event.dest_path, detection_time)
 
-        if event.src_path.lower().endswith(('.mp4', '.mov', '.avi')):
-            print(f"New file detected: {event.src_path}")
-            # Save the detection time for later use in calculating processing time
-            # Normalize path to avoid lookup issues
-            normalized_path = path.normpath(event.src_path)
-            file_detection_times[normalized_path] = datetime.now()
-            print(f"Recording start time for {normalized_path}")
-            time.sleep(2)  # Allow file to finish writing
-            try:
-                # Add the file to the processing queue instead of processing immediately
-                processing_queue.put(event.src_path)
-                print(f"Added {event.src_path} to processing queue")
-                
-                # Start the queue processor if it's not already running
-                global is_processing
-                with processing_lock:
-                    if not is_processing:
-                        threading.Thread(target=process_queue, daemon=True).start()
-            except Exception as e:
-                print(f"Error queueing clip {event.src_path}: {e}")
+def is_inside_folder(filepath, folder):
+    """True if filepath is folder itself or anywhere below it"""
+    if not folder:
+        return False
+    filepath = path.normcase(path.normpath(filepath))
+    folder = path.normcase(path.normpath(folder))
+    return filepath == folder or filepath.startswith(folder.rstrip(os.sep) + os.sep)
 
-def process_queue():
-    """Process files from the queue one at a time"""
-    global is_processing, abort_processing
-    
+def recording_game_folder(filepath):
+    """Name of the game folder a file in SHADOWPLAY_FOLDER belongs to.
+
+    Returns '' for files saved directly in SHADOWPLAY_FOLDER and None for files outside it
+    or nested deeper than one game folder.
+    """
+    relative_path = path.relpath(path.normpath(filepath), path.normpath(SHADOWPLAY_FOLDER))
+    parts = relative_path.split(os.sep)
+    if parts[0] == '..' or len(parts) > 2:
+        return None
+    return parts[0] if len(parts) == 2 else ''
+
+def queue_finished_recording(filepath):
+    """Called by the readiness checker once a recording has finished being written"""
+    if global_stop_event.is_set():
+        return
+    normalized_path = path.normpath(filepath)
     try:
-        with processing_lock:
-            is_processing = True
-            abort_processing = False
+        # Skip recordings the ledger has already seen (duplicate events, restarts, re-saves)
+        detection_time = file_detection_times.get(normalized_path)
+        clip_id = clip_ledger.claim(filepath, os.path.basename(os.path.dirname(filepath)),
+                                    detection_time.timestamp() if detection_time else None)
+        if clip_id is None:
+            print(f"Skipping {filepath}: this recording has already been processed")
+            file_detection_times.pop(normalized_path, None)
+            return
+        job = clip_ledger.job(clip_id)
+        if job['status'] == STATUS_ENCODED:
+            # Encoded before, but some webhooks never got it - send the existing output to just those
+            file_detection_times.pop(normalized_path, None)
+            if queue_pending_uploads(job):
+                print(f"Sending {job['output_path']} to the webhooks it didn't reach last time")
+            return
         
-        while not global_stop_event.is_set() and not abort_processing:
+        if detection_time is not None:
+            pipeline_metrics.observe(METRIC_STAGE_SECONDS, (datetime.now() - detection_time).total_seconds(),
+                                     stage='readiness_wait')
+        
+        # Add the file to the processing queue - the workers started by run() pick it up
+        processing_queue.put((filepath, clip_id))
+        print(f"Added {filepath} to processing queue")
+    except Exception as e:
+        print(f"Error queueing clip {filepath}: {e}")
+
+def job_thread_count():
+    """FFmpeg threads one clip may use, or 0 to let FFmpeg decide.
+
+    The budget is CPU_THREADS when set, otherwise the core count, split evenly between
+    the MAX_CONCURRENT_JOBS workers so concurrent clips don't oversubscribe the CPU.
+    """
+    if MAX_CONCURRENT_JOBS <= 1:
+        return CPU_THREADS if CPU_THREADS > 0 else 0
+    thread_budget = CPU_THREADS if CPU_THREADS > 0 else (os.cpu_count() or 1)
+    return max(1, thread_budget // MAX_CONCURRENT_JOBS)
+
+def start_workers():
+    """Start MAX_CONCURRENT_JOBS worker threads that process clips from the queue, plus one uploader per webhook"""
+    worker_threads.clear()
+    for worker_number in range(1, MAX_CONCURRENT_JOBS + 1):
+        worker = threading.Thread(target=process_queue, args=(worker_number,), daemon=True,
+                                  name=f"ClipWorker-{worker_number}")
+        worker.start()
+        worker_threads.append(worker)
+    
+    uploader_threads.clear()
+    for target_number, webhook_url in enumerate(WEBHOOK_URLS, start=1):
+        uploader = threading.Thread(target=process_uploads, args=(webhook_url,), daemon=True,
+                                    name=f"ClipUploader-{target_number}")
+        uploader.start()
+        uploader_threads.append(uploader)
+
+def process_queue(worker_number=1):
+    """Worker loop: process files from the queue one at a time until monitoring stops"""
+    global active_jobs
+    
+    while not global_stop_event.is_set() and not abort_processing:
+        try:
+            # Get the next file from the queue with a timeout
+            # This allows checking the stop_event periodically
             try:
-                # Get the next file from the queue with a timeout
-                # This allows checking the stop_event periodically
-                try:
-                    filepath = processing_queue.get(timeout=1.0)
-                except queue.Empty:
-                    # If queue is empty, exit the processing loop
-                    break
-                
-                # Signal that we're actively processing
-                active_processing_event.set()
-                
-                # Process the file
-                print(f"Processing file from queue: {filepath}")
-                
-                # Check if we should abort before starting processing
-                if abort_processing or global_stop_event.is_set():
-                    print(f"Aborting processing of {filepath} due to stop request")
-                    processing_queue.task_done()
-                    break
-                
-                process_clip(filepath)
-                
-                # Mark the task as done
+                filepath, clip_id = processing_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            
+            # Check if we should abort before starting processing
+            if abort_processing or global_stop_event.is_set():
+                print(f"Aborting processing of {filepath} due to stop request (it will resume on the next start)")
                 processing_queue.task_done()
-                
-                # Check again if we should abort after processing
-                if abort_processing or global_stop_event.is_set():
-                    print(f"Stopping queue processor due to stop request")
-                    break
-                
-            except Exception as e:
-                print(f"Error in queue processor: {e}")
-                traceback.print_exc()
-                # Continue processing next file even if this one failed
+                break
+            
+            # Signal that we're actively processing
+            with processing_lock:
+                active_jobs += 1
+                active_processing_event.set()
+            
+            try:
+                print(f"Worker {worker_number} processing file from queue: {filepath}")
+                process_clip(filepath, clip_id)
             finally:
-                # Signal that we're not actively processing anymore
-                active_processing_event.clear()
-    finally:
-        # Make sure to reset the processing flag when done
-        with processing_lock:
-            is_processing = False
-            abort_processing = False
-        active_processing_event.clear()
-        print("Queue processor stopped")
+                # Mark the task as done and signal once no worker is busy anymore
+                processing_queue.task_done()
+                with processing_lock:
+                    active_jobs -= 1
+                    if active_jobs == 0:
+                        active_processing_event.clear()
+            
+        except Exception as e:
+            print(f"Error in queue processor: {e}")
+            traceback.print_exc()
+            # Continue processing next file even if this one failed
+    
+    print(f"Worker {worker_number} stopped")
+
+def queue_upload(final_filepath, game_name, file_size_mb, detection_time, clip_id, targets):
+    """Hand a finished clip to the uploader of every target webhook"""
+    if detection_time is not None:
+        # Once per clip: the uploaders' own queue waits are part of the upload, not the processing
+        pipeline_metrics.observe(METRIC_CLIP_SECONDS, (datetime.now() - detection_time).total_seconds())
+    # Look the clip up once, before fanning out: only a link from an earlier send (or from before
+    # a restart) is reused, the targets of this hand-off never wait for each other's uploads
+    content_hash = cached_url = None
+    if reshare_cache is not None:
+        try:
+            content_hash = file_sha256(final_filepath)
+            cached_url = reshare_cache.get(content_hash)
+        except OSError as e:
+            print(f"Could not hash {final_filepath} for the re-share cache: {e}")
+    for webhook_url in targets:
+        upload_queues[webhook_url].put((final_filepath, game_name, file_size_mb, detection_time, clip_id,
+                                        content_hash, cached_url))
+
+def process_uploads(webhook_url):
+    """Uploader loop for one webhook: send finished clips to it one at a time until monitoring stops.
+
+    Uploads run separately from the clip workers, so the next clip encodes while this one uploads.
+    Every webhook has its own uploader, so a slow or failing webhook doesn't hold up the others.
+    """
+    target_queue = upload_queues[webhook_url]
+    label = webhook_label(webhook_url)
+    while not global_stop_event.is_set():
+        try:
+            upload = target_queue.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        
+        final_filepath, game_name, file_size_mb, detection_time, clip_id, content_hash, cached_url = upload
+        try:
+            if not os.path.exists(final_filepath):
+                print(f"Error: Could not find final output file to send to {label}: {final_filepath}")
+                if clip_id is not None:
+                    clip_ledger.upload_finished(clip_id, webhook_url, False, "Output file is missing")
+                continue
+            
+            processing_time = None
+            if detection_time is not None:
+                processing_time = datetime.now() - detection_time
+                print(f"Total processing time: {processing_time.total_seconds():.2f} seconds")
+            
+            if clip_id is not None:
+                clip_ledger.upload_started(clip_id, webhook_url)
+            with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='upload'):
+                sent = send_to_webhook(final_filepath, game_name, file_size_mb, processing_time, webhook_url,
+                                       content_hash, cached_url)
+            if clip_id is not None:
+                clip_ledger.upload_finished(clip_id, webhook_url, sent, None if sent else f"Upload to {label} failed")
+            if not sent:
+                print(f"Upload of {final_filepath} to {label} failed, the clip is still in the output folder")
+        except UploadCancelled as e:
+            # The target stays pending in the ledger, so the next start uploads it again
+            print(f"{e}: {final_filepath} will be sent to {label} on the next start")
+        except Exception as e:
+            print(f"Error in uploader for {label}: {e}")
+            traceback.print_exc()
+        finally:
+            target_queue.task_done()
+    
+    print(f"Uploader for {label} stopped")
+
+def reserve_output_filename(game_folder_name):
+    """Claim a unique GameName-Timestamp.mp4 name in OUTPUT_FOLDER.
+
+    Clips from the same game finishing within the same minute would otherwise overwrite each
+    other, so a -2, -3, ... suffix is added. Release the name with release_output_filename().
+    """
+    timestamp = datetime.now().strftime("%m%d%Y-%H%M")
+    with processing_lock:
+        final_filename = f"{game_folder_name}-{timestamp}.mp4"
+        suffix = 2
+        while final_filename in reserved_filenames or os.path.exists(os.path.join(OUTPUT_FOLDER, final_filename)):
+            final_filename = f"{game_folder_name}-{timestamp}-{suffix}.mp4"
+            suffix += 1
+        reserved_filenames.add(final_filename)
+    return final_filename
+
+def release_output_filename(final_filename):
+    """Release a name claimed by reserve_output_filename()"""
+    with processing_lock:
+        reserved_filenames.discard(final_filename)
 
 def safe_remove(filepath):
     """Safely remove a file with retries and proper error handling."""
@@ -230,6 +526,10 @@ def safe_remove(filepath):
 
 def safe_rename(src, dst):
     """Safely rename a file with retries and proper error handling."""
+    with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='file_move'):
+        return _rename_with_retries(src, dst)
+
+def _rename_with_retries(src, dst):
     max_attempts = 5
     for attempt in range(max_attempts):
         try:
@@ -249,9 +549,432 @@ def safe_rename(src, dst):
     print(f"Could not rename file {src} to {dst} after {max_attempts} attempts")
     return False
 
-def process_clip(filepath):
+def find_keyframe_before(filepath, target_time, start_offset=0.0, window=10.0):
+    """Find the latest video keyframe at or before target_time (seconds from the start of the file).
+
+    Only packet headers inside a small window are read, so this is cheap even for long recordings.
+    Returns the keyframe time relative to the start of the file, or None if no keyframe was found.
+    """
+    read_start = start_offset + max(0.0, target_time - window)
+    read_end = start_offset + target_time + 0.5
+    packet_probe = ffmpeg.probe(
+        filepath,
+        select_streams='v:0',
+        show_entries='packet=pts_time,flags',
+        read_intervals=f"{read_start:.3f}%{read_end:.3f}"
+    )
+
+    keyframe_time = None
+    for packet in packet_probe.get('packets', []):
+        if 'K' not in packet.get('flags', '') or 'pts_time' not in packet:
+            continue
+        packet_time = float(packet['pts_time']) - start_offset
+        # Allow for rounding in the printed timestamps
+        if packet_time <= target_time + 0.001 and (keyframe_time is None or packet_time > keyframe_time):
+            keyframe_time = packet_time
+    return keyframe_time
+
+def plan_stream_copy(filepath, probe, start_time):
+    """Decide from the probe data whether the clip can be trimmed with stream copy.
+
+    Returns a (keyframe_time, audio_codec) tuple, where audio_codec is 'copy' for AAC sources
+    and 'aac' otherwise, or None if the clip has to be re-encoded.
+    """
+    format_name = probe['format'].get('format_name', '')
+    if 'mp4' not in format_name and 'mov' not in format_name:
+        print(f"Stream copy not possible: container '{format_name}' is not MP4/MOV")
+        return None
+
+    video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
+    if video_stream is None or video_stream.get('codec_name') not in STREAM_COPY_VIDEO_CODECS:
+        codec_name = video_stream.get('codec_name') if video_stream else 'none'
+        print(f"Stream copy not possible: video codec '{codec_name}' cannot be copied")
+        return None
+
+    audio_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'audio'), None)
+    audio_codec = 'copy' if audio_stream is None or audio_stream.get('codec_name') == 'aac' else 'aac'
+
+    if start_time <= 0:
+        return 0.0, audio_codec
+
+    start_offset = float(probe['format'].get('start_time', 0) or 0)
+    keyframe_time = find_keyframe_before(filepath, start_time, start_offset)
+    if keyframe_time is None:
+        print(f"Stream copy not possible: no keyframe found before {start_time:.2f}s")
+        return None
+    if start_time - keyframe_time > STREAM_COPY_MAX_KEYFRAME_OFFSET:
+        print(f"Stream copy not possible: nearest keyframe is {start_time - keyframe_time:.2f}s before the clip start")
+        return None
+
+    return max(keyframe_time, 0.0), audio_codec
+
+def parallel_trial_plan(requested_trials):
+    """Work out how many CRF trials can run at once and how many FFmpeg threads each one gets.
+
+    The total thread budget is this job's share of the CPU threads (see job_thread_count()),
+    and every trial gets at least one thread. Returns a (trial_count, threads_per_trial) tuple.
+    """
+    cores = os.cpu_count() or 1
+    thread_budget = job_thread_count() or cores
+    trial_count = max(1, min(requested_trials, thread_budget, cores))
+    return trial_count, max(1, thread_budget // trial_count)
+
+def parallel_crf_candidates(center_crf, count):
+    """Spread count candidate CRFs evenly around center_crf, within CRF_MIN..CRF_MAX"""
+    candidates = []
+    for i in range(count):
+        crf_value = int(round(center_crf + (i - (count - 1) / 2) * PARALLEL_CRF_SPREAD))
+        crf_value = max(CRF_MIN, min(CRF_MAX, crf_value))
+        if crf_value not in candidates:
+            candidates.append(crf_value)
+    return candidates
+
+def run_parallel_crf_trials(source_path, crf_values, output_path_for, threads_per_trial, audio_path=None, extra_options=None,
+                            progress_for=None):
+    """Encode source_path at several CRF values at the same time.
+
+    Every trial is its own FFmpeg process. As soon as one trial lands inside
+    MIN_SIZE_MB..MAX_SIZE_MB the others are killed, since their results would not be used.
+    progress_for(crf) may return encode_progress() options for each trial.
+    Returns the (crf, size_mb, filepath) tuples of the trials that finished, in completion order.
+    A trial stopped early by its size projection has the projected size and a filepath of None.
+    A stop request kills every trial and raises AbortRequestedException or EncodeCancelled.
+    """
+    finished = []
+    completed = False  # False while leaving through an exception, so no trial file is left behind
+    running = {}  # crf -> FFmpeg process
+    running_lock = threading.Lock()
+    cancel_event = threading.Event()
+
+    def encode(crf_value):
+        iteration_filepath = output_path_for(crf_value)
+        with running_lock:
+            if cancel_event.is_set():
+                return crf_value, None, iteration_filepath
+            print(f"Trying CRF={crf_value} (parallel, {threads_per_trial} threads)...")
+            process = ffmpeg_runner.start(trial_output(
+                source_path,
+                iteration_filepath,
+                audio_path,
+                threads=threads_per_trial,
+                **video_codec.crf_options(crf_value, COMPRESSION_PRESET),
+                **(extra_options or {})  # Ladder filters
+            ), **(progress_for(crf_value) if progress_for else {}))
+            running[crf_value] = process
+        started = time.perf_counter()
+        ffmpeg_runner.wait(process)
+        pipeline_metrics.observe(METRIC_COMPRESSION_SECONDS, time.perf_counter() - started, kind='parallel_trial')
+        with running_lock:
+            del running[crf_value]
+        if process.cancelled and not cancel_event.is_set():
+            raise EncodeCancelled("FFmpeg was stopped")  # Killed by ffmpeg_runner.cancel_all()
+        if process.returncode != 0 and process.stopped_early is not None and not process.cancelled:
+            return crf_value, process.stopped_early.projected_bytes / (1024 * 1024), None
+        if process.returncode != 0 or cancel_event.is_set() or not os.path.exists(iteration_filepath):
+            return crf_value, None, iteration_filepath
+        return crf_value, os.path.getsize(iteration_filepath) / (1024 * 1024), iteration_filepath
+
+    def cancel_running():
+        with running_lock:
+            cancel_event.set()
+            for process in running.values():
+                ffmpeg_runner.kill(process)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(crf_values)) as pool:
+            pending = {pool.submit(encode, crf_value) for crf_value in crf_values}
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if abort_processing or global_stop_event.is_set():
+                    cancel_running()
+                    raise AbortRequestedException("Parallel CRF trials aborted due to stop request")
+                for future in done:
+                    try:
+                        crf_value, size_mb, iteration_filepath = future.result()
+                    except (AbortRequestedException, EncodeCancelled):
+                        cancel_running()
+                        raise
+                    except Exception as e:
+                        print(f"Error during parallel CRF trial: {e}")
+                        continue
+                    if iteration_filepath is None:
+                        finished.append((crf_value, size_mb, None))
+                        continue
+                    if size_mb is None:
+                        if os.path.exists(iteration_filepath):
+                            safe_remove(iteration_filepath)
+                        continue
+                    print(f"CRF={crf_value} produced: {size_mb:.2f}MB")
+                    finished.append((crf_value, size_mb, iteration_filepath))
+                    if MIN_SIZE_MB <= size_mb <= MAX_SIZE_MB and not cancel_event.is_set():
+                        print(f"CRF={crf_value} is in the target range, cancelling the remaining trials")
+                        cancel_running()
+        completed = True
+    finally:
+        # Remove whatever the cancelled or failed trials left behind (everything when aborting)
+        kept = [r[2] for r in finished] if completed else []
+        for crf_value in crf_values:
+            iteration_filepath = output_path_for(crf_value)
+            if os.path.exists(iteration_filepath) and iteration_filepath not in kept:
+                safe_remove(iteration_filepath)
+
+    return finished
+
+def run_split_crf_trials(source_path, crf_values, output_path_for, threads_per_trial, audio_path=None, video_filters=(),
+                         progress_options=None):
+    """Encode source_path at several CRF values from a single decode.
+
+    One FFmpeg process decodes the source and applies video_filters (rung_filters() of the ladder)
+    once, then a split filter hands every frame to one encoder per CRF. Unlike
+    run_parallel_crf_trials() the trials can't be stopped one by one, so all of them run to the end.
+    Returns the (crf, size_mb, filepath) tuples of the outputs, or an empty list if the encode failed.
+    A stop request raises EncodeCancelled; the unfinished outputs are removed either way.
+    """
+    source = ffmpeg.input(source_path)
+    video = source.video
+    for name, args, kwargs in video_filters:
+        video = video.filter(name, *args, **kwargs)
+    if audio_path:
+        audio, audio_options = ffmpeg.input(audio_path).audio, {'acodec': 'copy'}
+    else:
+        audio, audio_options = source['a?'], audio_encode_options()
+    split = video.split()
+    outputs = [
+        ffmpeg.output(
+            split[index],
+            audio,
+            output_path_for(crf_value),
+            threads=threads_per_trial,
+            **audio_options,
+            **video_codec.crf_options(crf_value, COMPRESSION_PRESET)
+        )
+        for index, crf_value in enumerate(crf_values)
+    ]
+
+    print(f"Trying CRF={', '.join(str(crf_value) for crf_value in crf_values)} from one decode "
+          f"({threads_per_trial} threads each)...")
+    completed = False
+    try:
+        with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='split_trials'):
+            ffmpeg_runner.run(ffmpeg.merge_outputs(*outputs), **(progress_options or {}))
+        completed = True
+    except ffmpeg.Error as e:
+        print(f"Error during split CRF trials: {e.stderr.decode('utf-8', errors='replace') if e.stderr else e}")
+        return []
+    finally:
+        if not completed:
+            # Failed or stopped: every output is partial
+            for crf_value in crf_values:
+                if os.path.exists(output_path_for(crf_value)):
+                    safe_remove(output_path_for(crf_value))
+
+    finished = []
+    for crf_value in crf_values:
+        iteration_filepath = output_path_for(crf_value)
+        if os.path.exists(iteration_filepath):
+            size_mb = os.path.getsize(iteration_filepath) / (1024 * 1024)
+            print(f"CRF={crf_value} produced: {size_mb:.2f}MB")
+            finished.append((crf_value, size_mb, iteration_filepath))
+    return finished
+
+def sample_video_bytes(filepath):
+    """Size of an encoded sample with its leading keyframe priced as an ordinary frame.
+
+    Returns (steady_bytes, first_frame_bytes): steady_bytes is the sample size if every frame cost
+    the average of the frames after the first, and first_frame_bytes is what the opening keyframe
+    actually took. Falls back to the file size if the packets can't be read.
+    """
+    try:
+        packet_probe = ffmpeg.probe(filepath, select_streams='v:0', show_entries='packet=size')
+        sizes = [int(packet['size']) for packet in packet_probe.get('packets', []) if 'size' in packet]
+    except (ffmpeg.Error, ValueError) as e:
+        print(f"Could not read sample packets, using the file size: {e}")
+        sizes = []
+    if len(sizes) < 2:
+        return os.path.getsize(filepath), 0
+    remaining = sum(sizes[1:])
+    return remaining * len(sizes) / (len(sizes) - 1), sizes[0]
+
+def estimate_crf_from_samples(source_path, clip_length, center_crf, sample_path_for, encode_options, target_mb):
+    """Estimate the CRF whose video stream hits target_mb by encoding short samples instead of the whole clip.
+
+    SAMPLE_COUNT evenly spaced slices of SAMPLE_SECONDS are encoded (video only) at each of two
+    CRFs around center_crf. Every sample opens with a forced keyframe that a full encode pays for
+    only once per GOP, so that frame is priced like the rest of the sample before the total is
+    scaled up to the clip length (see sample_video_bytes). The CRF for the target size is then
+    interpolated in log-size space. Returns an (estimated_crf, log_slope) tuple, or None if
+    sampling isn't possible.
+    """
+    if clip_length < SAMPLE_COUNT * SAMPLE_SECONDS * 2:
+        return None
+
+    sample_crfs = sorted({max(CRF_MIN, min(CRF_MAX, center_crf + offset)) for offset in SAMPLE_CRF_OFFSETS})
+    if len(sample_crfs) < 2:
+        return None
+
+    sample_starts = [clip_length * (i + 0.5) / SAMPLE_COUNT - SAMPLE_SECONDS / 2 for i in range(SAMPLE_COUNT)]
+    estimates = []  # (crf, estimated full-clip size in MB)
+    for crf_value in sample_crfs:
+        sampled_bytes = 0
+        keyframe_bytes = []
+        for index, sample_start in enumerate(sample_starts):
+            if abort_processing or global_stop_event.is_set():
+                raise AbortRequestedException("Size sampling aborted due to stop request")
+            sample_filepath = sample_path_for(crf_value, index)
+            try:
+                ffmpeg_runner.run(ffmpeg.input(source_path, ss=sample_start, t=SAMPLE_SECONDS).output(
+                    sample_filepath,
+                    an=None,  # The audio track is encoded once and its size is already known
+                    **video_codec.crf_options(crf_value, COMPRESSION_PRESET),
+                    **encode_options  # Thread limiting and ladder filters
+                ))
+                steady_bytes, first_frame_bytes = sample_video_bytes(sample_filepath)
+                sampled_bytes += steady_bytes
+                keyframe_bytes.append(first_frame_bytes)
+            finally:
+                if os.path.exists(sample_filepath):
+                    safe_remove(sample_filepath)
+        # The full encode still opens with one keyframe of its own
+        estimated_bytes = sampled_bytes / (SAMPLE_COUNT * SAMPLE_SECONDS) * clip_length + sum(keyframe_bytes) / len(keyframe_bytes)
+        estimated_mb = estimated_bytes / (1024 * 1024)
+        print(f"Samples at CRF={crf_value} extrapolate to {estimated_mb:.2f}MB of video")
+        estimates.append((crf_value, estimated_mb))
+
+    (crf_low, size_low), (crf_high, size_high) = estimates[0], estimates[-1]
+    if size_low <= 0 or size_high <= 0:
+        return None
+    slope = (math.log(size_high) - math.log(size_low)) / (crf_high - crf_low)
+    if slope >= 0:
+        # Sizes should shrink as CRF rises; noisy samples fall back to the x264 rule of thumb
+        slope = DEFAULT_LOG_SLOPE
+    estimated_crf = crf_low + (math.log(target_mb) - math.log(size_low)) / slope
+    return max(CRF_MIN, min(CRF_MAX, int(round(estimated_crf)))), slope
+
+def calculate_video_bitrate(target_size_mb, duration, audio_kbps):
+    """Work out the video bitrate (kbps) that fits a clip of the given duration into target_size_mb."""
+    total_kbits = target_size_mb * TWO_PASS_SIZE_MARGIN * 1024 * 1024 * 8 / 1000
+    video_kbps = total_kbits / max(duration, 0.1) - audio_kbps
+    return max(int(video_kbps), TWO_PASS_MIN_VIDEO_KBPS)
+
+def audio_encode_options():
+    """Output options that encode audio with the AUDIO_BITRATE_KBPS/AUDIO_CHANNELS budget"""
+    options = {'acodec': 'aac', 'b:a': f"{AUDIO_BITRATE_KBPS}k"}
+    if AUDIO_CHANNELS:
+        options['ac'] = AUDIO_CHANNELS
+    return options
+
+def encode_audio_track(source_path, audio_path):
+    """Encode the audio of source_path once, to be muxed unchanged into every video trial.
+
+    Returns the size of the track in MB.
+    """
+    print(f"Encoding audio track ({AUDIO_BITRATE_KBPS}kbps{', ' + str(AUDIO_CHANNELS) + ' channel(s)' if AUDIO_CHANNELS else ''})...")
+    with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='audio'):
+        ffmpeg_runner.run(ffmpeg.input(source_path).output(
+            audio_path,
+            vn=None,
+            **audio_encode_options()
+        ))
+    return os.path.getsize(audio_path) / (1024 * 1024)
+
+def trial_output(source_path, output_path, audio_path, **output_options):
+    """FFmpeg output that encodes the video of source_path.
+
+    With a pre-encoded audio track (see encode_audio_track()) the audio is copied in unchanged,
+    otherwise it is encoded here with the audio budget settings.
+    """
+    source = ffmpeg.input(source_path)
+    if audio_path:
+        return ffmpeg.output(source.video, ffmpeg.input(audio_path).audio, output_path, acodec='copy', **output_options)
+    return source.output(output_path, **audio_encode_options(), **output_options)
+
+def encode_two_pass(source_path, output_path, video_kbps, passlog_prefix, encode_options, run_first_pass=True,
+                    audio_path=None, progress_options=None):
+    """Encode source_path to output_path with a two-pass encode at the given video bitrate.
+
+    The first pass only writes the encoder's stats file (see VideoCodec.pass_log_files()), so a
+    second pass can be repeated at a different bitrate with run_first_pass=False. Codecs without
+    two-pass support in FFmpeg get a single bitrate-targeted pass. Returns the output size in MB.
+    """
+    progress_options = progress_options or {}
+
+    if not video_codec.two_pass:
+        print(f"{video_codec.label} has no two-pass mode, encoding once at video bitrate {video_kbps}kbps...")
+        ffmpeg_runner.run(trial_output(
+            source_path,
+            output_path,
+            audio_path,
+            **video_codec.bitrate_options(video_kbps, COMPRESSION_PRESET),
+            **encode_options  # Thread limiting and ladder filters
+        ), **progress_options)
+    else:
+        if run_first_pass:
+            print(f"Two-pass encode, pass 1 (video bitrate {video_kbps}kbps)...")
+            ffmpeg_runner.run(ffmpeg.input(source_path).output(
+                os.devnull,
+                format='null',
+                an=None,  # Audio is not needed for the analysis pass
+                **video_codec.two_pass_options(video_kbps, COMPRESSION_PRESET, 1, passlog_prefix),
+                **encode_options  # Thread limiting and ladder filters
+            ), **progress_options)
+
+            # Check for abort between the two passes
+            if abort_processing or global_stop_event.is_set():
+                raise AbortRequestedException("Processing aborted between two-pass encodes")
+
+        print(f"Two-pass encode, pass 2 (video bitrate {video_kbps}kbps)...")
+        ffmpeg_runner.run(trial_output(
+            source_path,
+            output_path,
+            audio_path,
+            **video_codec.two_pass_options(video_kbps, COMPRESSION_PRESET, 2, passlog_prefix),
+            **encode_options  # Thread limiting and ladder filters
+        ), **progress_options)
+
+    if not os.path.exists(output_path):
+        return None
+    return os.path.getsize(output_path) / (1024 * 1024)
+
+def encode_to_size(source_path, output_path, clip_length, passlog_prefix, encode_options, audio_kbps, audio_path=None,
+                   progress_name=None):
+    """Two-pass encode at the bitrate that fills TARGET_SIZE_MB next to audio_kbps of audio.
+
+    Rate control can overshoot slightly on very short or very complex clips, so pass 2 is repeated
+    once at a scaled bitrate when the output exceeds MAX_SIZE_MB - the first pass stats are still
+    valid. Returns the output size in MB, or None if no output was written.
+    """
+    video_kbps = calculate_video_bitrate(TARGET_SIZE_MB, clip_length, audio_kbps)
+    size_mb = encode_two_pass(source_path, output_path, video_kbps, passlog_prefix, encode_options, audio_path=audio_path,
+                              progress_options=encode_progress(f"{video_kbps}kbps", progress_name, clip_length))
+
+    if size_mb is not None and size_mb > MAX_SIZE_MB:
+        if abort_processing or global_stop_event.is_set():
+            raise AbortRequestedException("Processing aborted before two-pass correction")
+        corrected_kbps = max(int(video_kbps * TARGET_SIZE_MB / size_mb), TWO_PASS_MIN_VIDEO_KBPS)
+        print(f"Two-pass output ({size_mb:.2f}MB) exceeds {MAX_SIZE_MB}MB, repeating pass 2 at {corrected_kbps}kbps")
+        size_mb = encode_two_pass(source_path, output_path, corrected_kbps, passlog_prefix, encode_options,
+                                  run_first_pass=False, audio_path=audio_path,
+                                  progress_options=encode_progress(f"{corrected_kbps}kbps", progress_name, clip_length))
+    return size_mb
+
+def plan_ladder(width, height, source_fps, clip_length, audio_kbps):
+    """Work out the -vf option that steps the clip down the resolution/frame rate ladder.
+
+    Returns an (options, rung) tuple; options is empty and rung None when the source is kept.
+    """
+    if not RESOLUTION_LADDER or not source_fps:
+        return {}, None
+    budget_kbps = calculate_video_bitrate(TARGET_SIZE_MB, clip_length, audio_kbps)
+    rung = plan_rung(width, height, source_fps, budget_kbps, LADDER_MIN_BPP * video_codec.bpp_scale)
+    video_filter = rung_filter(rung, width, height, source_fps)
+    if not video_filter:
+        return {}, None
+    print(f"{budget_kbps}kbps is too little for {width}x{height}@{source_fps:.0f}fps, encoding at "
+          f"{rung.width}x{rung.height}@{rung.fps:.0f}fps ({bits_per_pixel(budget_kbps, rung):.3f} bits/pixel)")
+    return {'vf': video_filter}, rung
+
+def process_clip(filepath, clip_id=None):
     # Check if we should abort
-    global abort_processing
     if abort_processing or global_stop_event.is_set():
         print(f"Aborting processing of {filepath} due to stop request")
         return
@@ -260,20 +983,28 @@ def process_clip(filepath):
     temp_files_to_clean = []
     # Initialize results list to avoid 'referenced before assignment' error
     results = []
+    # (crf, size_mb) points produced by this clip, used to train the CRF model
+    crf_size_points = []
     # Track if we've completed processing and should send to Discord
     completed_successfully = False
+    # CRF of the file that was kept, and why processing failed, for the clip ledger
+    chosen_crf = None
+    failure_reason = "No output file was produced"
+    clip_result = 'failed'  # For the clips metric
     # Make filepath available in finally block
     normalized_path = path.normpath(filepath)
+    final_filename = None
+    final_filepath = None
     
     try:
+        if clip_id is not None:
+            clip_ledger.encode_started(clip_id)
+        
         # Extract game folder name from the file path
         game_folder_name = os.path.basename(os.path.dirname(filepath))
         
-        # Generate timestamp
-        timestamp = datetime.now().strftime("%m%d%Y-%H%M")
-        
-        # Final clip filename: GameName-Timestamp.mp4
-        final_filename = f"{game_folder_name}-{timestamp}.mp4"
+        # Final clip filename: GameName-Timestamp.mp4, kept unique across concurrent jobs
+        final_filename = reserve_output_filename(game_folder_name)
         final_filepath = os.path.join(OUTPUT_FOLDER, final_filename)
         
         # Temporary file for compression iterations
@@ -288,7 +1019,8 @@ def process_clip(filepath):
             raise AbortRequestedException("Processing aborted due to stop request")
         
         # Get video duration and original resolution
-        probe = ffmpeg.probe(filepath)
+        with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='probe'):
+            probe = ffmpeg.probe(filepath)
         duration = float(probe['format']['duration'])
         start_time = max(0, duration - CLIP_DURATION)
         
@@ -302,67 +1034,147 @@ def process_clip(filepath):
         width = int(video_stream['width'])
         height = int(video_stream['height'])
         original_bitrate = float(probe['format']['bit_rate']) / 1000 if 'bit_rate' in probe['format'] else 0
+        source_fps = parse_frame_rate(video_stream.get('avg_frame_rate')) or parse_frame_rate(video_stream.get('r_frame_rate'))
+        has_audio = any(stream['codec_type'] == 'audio' for stream in probe['streams'])
         
         print(f"Original video: {width}x{height}, duration: {duration:.2f}s, bitrate: {original_bitrate:.0f}kbps")
 
         # Configure thread count for FFmpeg
         thread_options = {}
-        if CPU_THREADS > 0:
-            thread_options = {'threads': CPU_THREADS}
-            print(f"Limiting FFmpeg to {CPU_THREADS} CPU threads")
+        ffmpeg_threads = job_thread_count()
+        if ffmpeg_threads > 0:
+            thread_options = {'threads': ffmpeg_threads}
+            print(f"Limiting FFmpeg to {ffmpeg_threads} CPU threads")
         
         # Check for abort before starting extraction
         if abort_processing or global_stop_event.is_set():
             raise AbortRequestedException("Processing aborted due to stop request")
         
-        # Trim last X seconds and save to a temporary file with high quality
-        # This will be our source for compression iterations
-        print(f"Extracting {'last ' + str(CLIP_DURATION) + ' seconds' if duration >= CLIP_DURATION else 'entire video'} with high quality...")
+        # Quick mode can trim and compress in one FFmpeg run straight from the recording,
+        # skipping the intermediate high-quality file and its extra decode/encode
+        quick_direct = COMPRESSION_METHOD == COMPRESSION_QUICK and QUICK_DIRECT_ENCODE
         
-        # Check if we should abort before continuing
-        if abort_processing or global_stop_event.is_set():
-            raise AbortRequestedException("Processing aborted due to stop request")
+        if not quick_direct:
+            # Trim last X seconds and save to a temporary file
+            # This will be our source for compression iterations
+            extract_description = 'last ' + str(CLIP_DURATION) + ' seconds' if duration >= CLIP_DURATION else 'entire video'
+        
+            # Check if we should abort before continuing
+            if abort_processing or global_stop_event.is_set():
+                raise AbortRequestedException("Processing aborted due to stop request")
+        
+            # Prefer cutting on a keyframe with stream copy - no encode generation and no quality loss
+            extracted = False
+            copy_plan = None
+            if EXTRACT_MODE == EXTRACT_STREAM_COPY:
+                try:
+                    copy_plan = plan_stream_copy(filepath, probe, start_time)
+                except Exception as e:
+                    print(f"Could not check whether stream copy is possible: {e}")
+        
+            if copy_plan:
+                keyframe_time, audio_codec = copy_plan
+                print(f"Extracting {extract_description} with stream copy from keyframe at {keyframe_time:.3f}s (audio: {'copy' if audio_codec == 'copy' else 're-encode to AAC'})...")
+                try:
+                    with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='extraction'):
+                        ffmpeg_runner.run(ffmpeg.input(filepath, ss=keyframe_time).output(
+                            temp_filepath,
+                            vcodec='copy',
+                            acodec=audio_codec,
+                            avoid_negative_ts='make_zero'
+                        ))
+                    # The clip now starts on the keyframe, slightly before the requested start
+                    start_time = keyframe_time
+                    extracted = True
+                except Exception as e:
+                    # Check if this was due to abort
+                    if abort_processing or global_stop_event.is_set():
+                        raise AbortRequestedException("FFmpeg extraction interrupted due to stop request")
+                    print(f"Stream copy extraction failed ({e}), falling back to re-encoding")
+        
+            if not extracted:
+                print(f"Extracting {extract_description} with high quality...")
             
-        # Use try-except to handle interrupted FFmpeg process
-        try:
-            ffmpeg.input(filepath, ss=start_time).output(
-                temp_filepath, 
-                vcodec='libx264', 
-                acodec='aac',
-                crf=HIGH_QUALITY_CRF,  # High quality source for our compression iterations
-                preset=EXTRACT_PRESET,
-                **thread_options  # Apply thread limiting if set
-            ).run(overwrite_output=True)
-        except Exception as e:
-            # Check if this was due to abort
+                # Use try-except to handle interrupted FFmpeg process
+                try:
+                    with pipeline_metrics.timer(METRIC_STAGE_SECONDS, stage='extraction'):
+                        ffmpeg_runner.run(ffmpeg.input(filepath, ss=start_time).output(
+                            temp_filepath, 
+                            vcodec='libx264', 
+                            acodec='aac',
+                            crf=HIGH_QUALITY_CRF,  # High quality source for our compression iterations
+                            preset=EXTRACT_PRESET,
+                            **thread_options  # Apply thread limiting if set
+                        ), **encode_progress("extracting", final_filename, duration - start_time))
+                except Exception:
+                    # Check if this was due to abort
+                    if abort_processing or global_stop_event.is_set():
+                        raise AbortRequestedException("FFmpeg extraction interrupted due to stop request")
+                    else:
+                        # Rethrow the exception if it wasn't due to abort
+                        raise
+        
+            # Check again for abort after extraction
             if abort_processing or global_stop_event.is_set():
-                raise AbortRequestedException("FFmpeg extraction interrupted due to stop request")
-            else:
-                # Rethrow the exception if it wasn't due to abort
-                raise
+                raise AbortRequestedException("Processing aborted after extraction")
         
-        # Check again for abort after extraction
-        if abort_processing or global_stop_event.is_set():
-            raise AbortRequestedException("Processing aborted after extraction")
+            # Check if the temporary file is valid
+            if not os.path.exists(temp_filepath) or os.path.getsize(temp_filepath) < 100 * 1024:
+                print(f"Error: Failed to create valid temporary file. Skipping.")
+                if os.path.exists(temp_filepath):
+                    safe_remove(temp_filepath)
+                return
         
-        # Check if the temporary file is valid
-        if not os.path.exists(temp_filepath) or os.path.getsize(temp_filepath) < 100 * 1024:
-            print(f"Error: Failed to create valid temporary file. Skipping.")
-            if os.path.exists(temp_filepath):
-                safe_remove(temp_filepath)
-            return
+            temp_size_mb = os.path.getsize(temp_filepath) / (1024 * 1024)
+            print(f"Extracted {'stream-copied' if extracted else 'high-quality'} clip: {temp_size_mb:.2f}MB")
         
-        temp_size_mb = os.path.getsize(temp_filepath) / (1024 * 1024)
-        print(f"Extracted high-quality clip: {temp_size_mb:.2f}MB")
+            # Check for abort before compression
+            if abort_processing or global_stop_event.is_set():
+                raise AbortRequestedException("Processing aborted before compression")
         
-        # Check for abort before compression
-        if abort_processing or global_stop_event.is_set():
-            raise AbortRequestedException("Processing aborted before compression")
+        # Length of the clip being compressed (a keyframe cut may start slightly early)
+        clip_length = duration - start_time
+        
+        # The size-targeted methods encode the audio once and mux it into every video encode, so
+        # each attempt only encodes video and the search aims the video stream at what is left
+        audio_path = None
+        audio_mb = AUDIO_BITRATE_KBPS * clip_length / 8 / 1024 if has_audio else 0  # Estimate until encoded
+        if COMPRESSION_METHOD != COMPRESSION_QUICK and has_audio:
+            audio_path = os.path.join(OUTPUT_FOLDER, f"audio_{os.path.splitext(final_filename)[0]}.m4a")
+            temp_files_to_clean.append(audio_path)
+            try:
+                audio_mb = encode_audio_track(temp_filepath, audio_path)
+                print(f"Audio track: {audio_mb:.2f}MB, leaving {TARGET_SIZE_MB - audio_mb:.2f}MB of the target for video")
+            except Exception as e:
+                if abort_processing or global_stop_event.is_set():
+                    raise AbortRequestedException("Audio encoding interrupted due to stop request")
+                print(f"Could not encode the audio track on its own, encoding it with every attempt instead: {e}")
+                audio_path = None
+        audio_kbps = audio_mb * 1024 * 1024 * 8 / 1000 / max(clip_length, 0.1)
+        # Video share of the size range, never below a sliver so the log-size maths stays defined
+        video_target_mb = max(TARGET_SIZE_MB - audio_mb, 0.1)
+        
+        # The size-targeted methods step down the resolution/frame rate when the size budget is
+        # too thin for the source, instead of pushing CRF until every frame is smeared
+        ladder_options, rung = {}, None
+        if COMPRESSION_METHOD != COMPRESSION_QUICK:
+            ladder_options, rung = plan_ladder(width, height, source_fps, clip_length, audio_kbps)
+        encode_options = {**thread_options, **ladder_options}
+        # The CRF model learns per output resolution, and per frame rate when that is lowered
+        model_width, model_height = (rung.width, rung.height) if rung else (width, height)
+        model_preset = video_codec.model_preset(COMPRESSION_PRESET)
+        if rung and rung.fps != source_fps:
+            model_preset += f"@{rung.fps:g}fps"
         
         # Choose the right compression method based on user setting
         if COMPRESSION_METHOD == COMPRESSION_QUICK:
             # Quick method: Just use a single pass with a moderate CRF value for faster processing
-            print(f"Using Quick compression method (single pass with CRF={QUICK_CRF})")
+            if quick_direct:
+                print(f"Using Quick compression method (trim and compress in one pass with CRF={QUICK_CRF})")
+                quick_source = ffmpeg.input(filepath, ss=start_time)
+            else:
+                print(f"Using Quick compression method (single pass with CRF={QUICK_CRF})")
+                quick_source = ffmpeg.input(temp_filepath)
             quick_filepath = os.path.join(OUTPUT_FOLDER, f"quick_{final_filename}")
             temp_files_to_clean.append(quick_filepath)
             
@@ -372,14 +1184,13 @@ def process_clip(filepath):
                 
             try:
                 # Use configurable CRF value for file size control
-                ffmpeg.input(temp_filepath).output(
-                    quick_filepath, 
-                    vcodec='libx264', 
-                    acodec='aac', 
-                    crf=QUICK_CRF,  # Use the configurable QUICK_CRF value
-                    preset=COMPRESSION_PRESET,
-                    **thread_options  # Apply thread limiting if set
-                ).run(overwrite_output=True)
+                with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='quick'):
+                    ffmpeg_runner.run(quick_source.output(
+                        quick_filepath, 
+                        **audio_encode_options(),
+                        **video_codec.crf_options(QUICK_CRF, COMPRESSION_PRESET),  # Use the configurable QUICK_CRF value
+                        **thread_options  # Apply thread limiting if set
+                    ), **encode_progress(f"CRF={QUICK_CRF}", final_filename, duration - start_time))
                 
                 # Check for abort after compression but before file operations
                 if abort_processing or global_stop_event.is_set():
@@ -388,6 +1199,8 @@ def process_clip(filepath):
                 if os.path.exists(quick_filepath):
                     final_size_mb = os.path.getsize(quick_filepath) / (1024 * 1024)
                     print(f"Quick compression complete: {final_size_mb:.2f}MB")
+                    crf_size_points.append((QUICK_CRF, final_size_mb - audio_mb))
+                    chosen_crf = QUICK_CRF
                     
                     # Rename to final filepath and clean up temp file
                     if os.path.exists(final_filepath):
@@ -399,13 +1212,14 @@ def process_clip(filepath):
                         completed_successfully = True
                 else:
                     print(f"Error: Quick compression failed to create output file.")
-                    # If the quick compression fails, just use the temp file
-                    if os.path.exists(final_filepath):
-                        safe_remove(final_filepath)
-                    safe_rename(temp_filepath, final_filepath)
-                    # Mark as complete only if we got here without aborting
-                    if not (abort_processing or global_stop_event.is_set()):
-                        completed_successfully = True
+                    # Fall back to the trimmed temp file; direct mode never creates one
+                    if os.path.exists(temp_filepath):
+                        if os.path.exists(final_filepath):
+                            safe_remove(final_filepath)
+                        safe_rename(temp_filepath, final_filepath)
+                        # Mark as complete only if we got here without aborting
+                        if not (abort_processing or global_stop_event.is_set()):
+                            completed_successfully = True
             except Exception as e:
                 # Check if this was due to abort
                 if abort_processing or global_stop_event.is_set():
@@ -422,6 +1236,59 @@ def process_clip(filepath):
                     # Mark as complete only if we got here without aborting
                     if not (abort_processing or global_stop_event.is_set()):
                         completed_successfully = True
+        elif COMPRESSION_METHOD == COMPRESSION_TWO_PASS:
+            # Two-Pass method: calculate the bitrate that fills the size budget and encode once (in two passes)
+            video_kbps = calculate_video_bitrate(TARGET_SIZE_MB, clip_length, audio_kbps)
+            print(f"Using Two-Pass compression method ({clip_length:.2f}s clip, target {TARGET_SIZE_MB}MB, video {video_kbps}kbps + audio {audio_kbps:.0f}kbps)")
+
+            two_pass_filepath = os.path.join(OUTPUT_FOLDER, f"twopass_{final_filename}")
+            passlog_prefix = os.path.join(OUTPUT_FOLDER, f"passlog_{final_filename}")
+            temp_files_to_clean.append(two_pass_filepath)
+            temp_files_to_clean.extend(video_codec.pass_log_files(passlog_prefix))
+
+            # Check for abort before compression
+            if abort_processing or global_stop_event.is_set():
+                raise AbortRequestedException("Processing aborted before two-pass compression")
+
+            try:
+                with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='two_pass'):
+                    final_size_mb = encode_to_size(temp_filepath, two_pass_filepath, clip_length, passlog_prefix, encode_options,
+                                                   audio_kbps, audio_path, final_filename)
+
+                # Check for abort after compression but before file operations
+                if abort_processing or global_stop_event.is_set():
+                    raise AbortRequestedException("Processing aborted after two-pass compression")
+
+                if final_size_mb is not None and final_size_mb > MAX_SIZE_MB:
+                    print(f"Two-pass output ({final_size_mb:.2f}MB) still exceeds {MAX_SIZE_MB}MB, not sending it.")
+                    failure_reason = f"Could not compress the clip under {MAX_SIZE_MB}MB"
+                elif final_size_mb is not None:
+                    print(f"Two-pass compression complete: {final_size_mb:.2f}MB")
+                    if os.path.exists(final_filepath):
+                        safe_remove(final_filepath)
+                    safe_rename(two_pass_filepath, final_filepath)
+                    safe_remove(temp_filepath)
+                    # Mark as complete only if we got here without aborting
+                    if not (abort_processing or global_stop_event.is_set()):
+                        completed_successfully = True
+                else:
+                    print("Error: Two-pass compression failed to create output file.")
+            except AbortRequestedException:
+                raise
+            except Exception as e:
+                # Check if this was due to abort
+                if abort_processing or global_stop_event.is_set():
+                    raise AbortRequestedException("Two-pass compression interrupted due to stop request")
+
+                print(f"Error during two-pass compression: {e}")
+                # Only fall back to the trimmed file if it fits the size limit on its own
+                if os.path.exists(temp_filepath) and temp_size_mb <= MAX_SIZE_MB:
+                    if os.path.exists(final_filepath):
+                        safe_remove(final_filepath)
+                    safe_rename(temp_filepath, final_filepath)
+                    completed_successfully = True
+                else:
+                    print(f"Trimmed clip ({temp_size_mb:.2f}MB) exceeds {MAX_SIZE_MB}MB, not sending it.")
         else:
             # Progressive method (original code)
             # Store results of our compression attempts
@@ -442,19 +1309,19 @@ def process_clip(filepath):
                     completed_successfully = True
             else:
                 # Define a simple function to try a specific CRF value and record results
-                def try_crf(crf_value, label=""):
-                    nonlocal results
+                def try_crf(crf_value, label="", size_range=None):
+                    """Encode one trial. Returns its size in MB (projected if it was stopped early), or None."""
                     iteration_filepath = os.path.join(OUTPUT_FOLDER, f"{label}{crf_value}_{final_filename}")
                     try:
                         print(f"Trying CRF={crf_value}...")
-                        ffmpeg.input(temp_filepath).output(
-                            iteration_filepath, 
-                            vcodec='libx264', 
-                            acodec='aac', 
-                            crf=crf_value,
-                            preset=COMPRESSION_PRESET,
-                            **thread_options  # Apply thread limiting if set
-                        ).run(overwrite_output=True)
+                        with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='crf_trial'):
+                            ffmpeg_runner.run(trial_output(
+                                temp_filepath,
+                                iteration_filepath,
+                                audio_path,
+                                **video_codec.crf_options(crf_value, COMPRESSION_PRESET),
+                                **encode_options  # Thread limiting and ladder filters
+                            ), **encode_progress(f"CRF={crf_value}", final_filename, clip_length, size_range))
                         
                         if os.path.exists(iteration_filepath):
                             size_mb = os.path.getsize(iteration_filepath) / (1024 * 1024)
@@ -462,93 +1329,120 @@ def process_clip(filepath):
                             results.append((crf_value, size_mb, iteration_filepath))
                             return size_mb
                         return None
+                    except EncodeStoppedEarly as e:
+                        # Not a usable file, but the projection still narrows the CRF search
+                        if os.path.exists(iteration_filepath):
+                            safe_remove(iteration_filepath)
+                        return e.progress.projected_bytes / (1024 * 1024)
+                    except (AbortRequestedException, EncodeCancelled):
+                        if os.path.exists(iteration_filepath):
+                            safe_remove(iteration_filepath)
+                        raise
                     except Exception as e:
                         print(f"Error testing CRF={crf_value}: {e}")
                         if os.path.exists(iteration_filepath):
                             safe_remove(iteration_filepath)
                         return None
                 
-                # AGGRESSIVE APPROACH USING FIXED CRF VALUES
-                # Try just a few widely spaced CRF values to quickly find the right range
-                # CRF values have a significant impact on file size, so wide jumps work well
-                
-                # Start with a middle ground CRF value
-                initial_crf = int(CRF_MAX * 0.75)  # 75% of max as starting point
-                # If source is very large, start with more aggressive compression
-                if temp_size_mb > 50:
-                    initial_crf = CRF_MAX
-                elif temp_size_mb > 25:
-                    initial_crf = int(CRF_MAX * 0.9)  # 90% of max
+                # Start where the learned model predicts the target size, if it has seen similar clips
+                prediction = None
+                search_slope = None
+                if crf_model is not None:
+                    prediction = crf_model.predict(game_folder_name, model_width, model_height, original_bitrate, model_preset,
+                                                   clip_length, video_target_mb, CRF_MIN, CRF_MAX)
+                if prediction:
+                    initial_crf, model_key, search_slope = prediction
+                    print(f"CRF model predicts CRF={initial_crf} for {video_target_mb:.2f}MB of video (learned from '{model_key}')")
+                else:
+                    # Start with a middle ground CRF value
+                    initial_crf = int(CRF_MAX * 0.75)  # 75% of max as starting point
+                    # If source is very large, start with more aggressive compression
+                    if temp_size_mb > 50:
+                        initial_crf = CRF_MAX
+                    elif temp_size_mb > 25:
+                        initial_crf = int(CRF_MAX * 0.9)  # 90% of max
                     
-                # Try initial CRF
-                print(f"Starting with CRF={initial_crf}")
-                size1 = try_crf(initial_crf, "init")
+                # Without a prediction, estimate the starting CRF from a few short samples instead of a full
+                # trial. A prediction comes from full encodes of similar clips, so it is kept as it is.
+                if SAMPLE_ESTIMATION and not prediction:
+                    def sample_path_for(crf_value, index):
+                        sample_filepath = os.path.join(OUTPUT_FOLDER, f"sample{crf_value}_{index}_{final_filename}")
+                        temp_files_to_clean.append(sample_filepath)
+                        return sample_filepath
+                    try:
+                        with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='samples'):
+                            sample_estimate = estimate_crf_from_samples(temp_filepath, clip_length, initial_crf, sample_path_for,
+                                                                        encode_options, video_target_mb)
+                        if sample_estimate is not None:
+                            initial_crf, search_slope = sample_estimate
+                            print(f"Sampled size estimation picks CRF={initial_crf} for {video_target_mb:.2f}MB of video")
+                    except AbortRequestedException:
+                        raise
+                    except Exception as e:
+                        if abort_processing or global_stop_event.is_set():
+                            raise AbortRequestedException("Size sampling interrupted due to stop request")
+                        print(f"Sampled size estimation failed, using CRF={initial_crf}: {e}")
                 
-                # Based on first result, try a dramatically different value
-                if size1 is not None:
-                    if size1 > MAX_SIZE_MB:
-                        # Too big, try much more aggressive compression
-                        # Calculate a large jump based on file size ratio
-                        size_ratio = size1 / TARGET_SIZE_MB
-                        jump_amount = min(int(size_ratio * 5), (CRF_MAX - initial_crf))  # Limit to max available range
-                        second_crf = min(initial_crf + jump_amount, CRF_MAX)  # Cap at CRF_MAX
-                        print(f"File too large ({size1:.2f}MB), making large jump to CRF={second_crf} (+{jump_amount})")
-                    else:  # size1 < MIN_SIZE_MB
-                        # Too small, try much less compression
-                        size_ratio = TARGET_SIZE_MB / max(size1, 0.1)  # Avoid division by zero
-                        
-                        # Adjust jump size based on how close we're getting to the target
-                        # Use smaller jumps when we're getting close to the target
-                        if size1 >= 6:  # If we're within 2MB of our target
-                            jump_amount = CRF_STEP  # Small increment based on configured step
-                        elif size1 >= 4:  # If we're within 4MB of our target
-                            jump_amount = CRF_STEP * 2  # Moderate increment
-                        else:
-                            # We're far away, use the original calculation with a cap
-                            jump_amount = min(int(size_ratio * 4), (initial_crf - CRF_MIN))  # Limit to available range
-                            
-                        second_crf = max(initial_crf - jump_amount, CRF_MIN)  # Lower floor to CRF_MIN
-                        print(f"File too small ({size1:.2f}MB), making {jump_amount} point jump to CRF={second_crf}")
-                    
-                    # Skip if same as initial CRF
-                    if second_crf != initial_crf:
-                        size2 = try_crf(second_crf, "jump")
-                        
-                        # Now we should have two very different CRF values, try something in middle
-                        if size2 is not None and not (MIN_SIZE_MB <= size1 <= MAX_SIZE_MB) and not (MIN_SIZE_MB <= size2 <= MAX_SIZE_MB):
-                            # Sort our CRFs for easier logic
-                            crf_low = min(initial_crf, second_crf)
-                            crf_high = max(initial_crf, second_crf)
-                            size_low = size1 if initial_crf == crf_low else size2
-                            size_high = size1 if initial_crf == crf_high else size2
-                            
-                            # Check if we've bracketed our target range (one file too big, one too small)
-                            if (size_low > MAX_SIZE_MB and size_high < MIN_SIZE_MB) or (size_high > MAX_SIZE_MB and size_low < MIN_SIZE_MB):
-                                # We need to "invert" the values to ensure proper bracketing
-                                if size_low > MAX_SIZE_MB:  # Low CRF = larger file
-                                    crf_low, crf_high = crf_high, crf_low
-                                    size_low, size_high = size_high, size_low
-                                    
-                                # Now crf_low gives file < MIN_SIZE_MB and crf_high gives file > MAX_SIZE_MB
-                                # Try a third CRF in the middle with a logarithmic scale to account for CRF's non-linear effect
-                                # Use weighted interpolation rather than simple midpoint
-                                # This gives us a better chance of hitting the target range
-                                
-                                weight = (TARGET_SIZE_MB - size_low) / (size_high - size_low)
-                                # Apply logarithmic interpolation (CRF effect is roughly logarithmic)
-                                third_crf = int(crf_low + (crf_high - crf_low) * weight * 0.7)  # 0.7 factor to bias toward quality
-                                
-                                # Ensure it's different from both previous values
-                                if third_crf == crf_low:
-                                    third_crf += 1
-                                elif third_crf == crf_high:
-                                    third_crf -= 1
-                                    
-                                print(f"Trying interpolated CRF={third_crf} (between {crf_low} and {crf_high})")
-                                try_crf(third_crf, "mid")
-
-                # After all attempts, select the best result (closest to our target size)
-                if results:
+                # Bounded secant/bisection search over integer CRF, never repeating a CRF. The audio
+                # track is the same in every attempt, so the search works on the video share alone,
+                # where log size is close to linear in CRF.
+                search = CrfSearch(CRF_MIN, CRF_MAX, MIN_SIZE_MB - audio_mb, MAX_SIZE_MB - audio_mb, video_target_mb,
+                                   MAX_COMPRESSION_ATTEMPTS, initial_crf, log_slope=search_slope, crf_step=CRF_STEP)
+                
+                trial_count, threads_per_trial = parallel_trial_plan(PARALLEL_CRF_TRIALS)
+                if trial_count > 1:
+                    # Encode several candidates around the starting CRF at the same time
+                    candidates = parallel_crf_candidates(initial_crf, trial_count)
+                    if SPLIT_CRF_TRIALS:
+                        # Decode (and scale) the clip once and encode every candidate from the same frames
+                        print(f"Starting with {len(candidates)} CRF trials from one decode: {candidates}")
+                        trials = run_split_crf_trials(
+                            temp_filepath,
+                            candidates,
+                            lambda crf_value: os.path.join(OUTPUT_FOLDER, f"split{crf_value}_{final_filename}"),
+                            threads_per_trial,
+                            audio_path,
+                            rung_filters(rung, width, height, source_fps) if rung else (),
+                            encode_progress(f"CRF={'/'.join(str(crf_value) for crf_value in candidates)}",
+                                            final_filename, clip_length)
+                        )
+                    else:
+                        print(f"Starting with {len(candidates)} parallel CRF trials: {candidates}")
+                        trials = run_parallel_crf_trials(
+                            temp_filepath,
+                            candidates,
+                            lambda crf_value: os.path.join(OUTPUT_FOLDER, f"par{crf_value}_{final_filename}"),
+                            threads_per_trial,
+                            audio_path,
+                            ladder_options,
+                            lambda crf_value: encode_progress(f"CRF={crf_value}", final_filename, clip_length,
+                                                              (MIN_SIZE_MB, MAX_SIZE_MB))
+                        )
+                    for crf_value, size_mb, iteration_filepath in trials:
+                        if iteration_filepath is not None:
+                            results.append((crf_value, size_mb, iteration_filepath))
+                        search.record(crf_value, size_mb - audio_mb)
+                else:
+                    print(f"Starting with CRF={initial_crf}")
+                
+                while True:
+                    crf_value = search.next_crf()
+                    if crf_value is None:
+                        break
+                    if abort_processing or global_stop_event.is_set():
+                        raise AbortRequestedException("Processing aborted during CRF search")
+                    print(f"CRF search attempt {search.attempts + 1}/{MAX_COMPRESSION_ATTEMPTS}")
+                    # A too-small result is still worth keeping from the last attempt, so only stop it early
+                    # for being too small while there are attempts left to follow it up
+                    last_attempt = search.attempts + 1 >= MAX_COMPRESSION_ATTEMPTS
+                    size_mb = try_crf(crf_value, "try", (0 if last_attempt else MIN_SIZE_MB, MAX_SIZE_MB))
+                    if size_mb is None:
+                        break
+                    search.record(crf_value, size_mb - audio_mb)
+
+                # After all attempts, select the best result (closest to our target size). Trials stopped
+                # early leave no file, only a projected size in the search.
+                if results or search.points:
                     # Filter results that are under our max size limit (we don't want to exceed 10MB)
                     valid_results = [r for r in results if r[1] <= MAX_SIZE_MB]
                     
@@ -561,199 +1455,65 @@ def process_clip(filepath):
                             best_result = min(target_results, key=lambda r: abs(r[1] - TARGET_SIZE_MB))
                             print(f"Found file in target range! Using it: CRF={best_result[0]}, size={best_result[1]:.2f}MB")
                         else:
-                            # No file is in our target range
-                            print(f"No file in target range ({MIN_SIZE_MB}-{MAX_SIZE_MB}MB). Starting dedicated fine-tuning phase.")
-                            
-                            # Sort all results by file size for easier analysis
-                            all_results_sorted = sorted(results, key=lambda r: r[1])
-                            
-                            # Find the file closest to but under MIN_SIZE_MB (our starting point for increasing quality)
-                            files_below_min = [r for r in valid_results if r[1] < MIN_SIZE_MB]
-                            
-                            if files_below_min:
-                                # Start with the largest file under MIN_SIZE_MB
-                                current_best = max(files_below_min, key=lambda r: r[1])
-                                current_crf, current_size, current_path = current_best
-                                
-                                print(f"Starting fine-tuning from CRF={current_crf}, size={current_size:.2f}MB")
-                                
-                                # Try up to MAX_COMPRESSION_ATTEMPTS (or remaining attempts) to reach target range
-                                used_crfs = [r[0] for r in results]  # Track CRF values we've already tried
-                                attempts_left = MAX_COMPRESSION_ATTEMPTS - min(len(results), MAX_COMPRESSION_ATTEMPTS)
-                                attempts_limit = min(attempts_left + 2, 5)  # Cap at 5 but ensure at least 2 attempts
-                                
-                                for i in range(attempts_limit):
-                                    # Calculate how far we are from target range as a percentage
-                                    distance_pct = (MIN_SIZE_MB - current_size) / MIN_SIZE_MB
-                                    
-                                    # Adjust CRF based on how far we are from target
-                                    if distance_pct > 0.5:  # Very far below (< 50% of min)
-                                        crf_change = min(current_crf - CRF_MIN, 6)  # Aggressive change
-                                        print(f"Very far from target ({distance_pct*100:.1f}% below). Making large CRF change: {crf_change}")
-                                    elif distance_pct > 0.3:  # Significantly below
-                                        crf_change = min(current_crf - CRF_MIN, 4)  # Moderate change
-                                        print(f"Far from target ({distance_pct*100:.1f}% below). Making moderate CRF change: {crf_change}")
-                                    elif distance_pct > 0.1:  # Somewhat below
-                                        crf_change = min(current_crf - CRF_MIN, 2)  # Small change
-                                        print(f"Approaching target ({distance_pct*100:.1f}% below). Making small CRF change: {crf_change}")
-                                    else:  # Very close
-                                        crf_change = 1  # Minimal change
-                                        print(f"Very close to target ({distance_pct*100:.1f}% below). Making minimal CRF change: {crf_change}")
-                                    
-                                    # Calculate new CRF value (lower CRF = higher quality, larger file)
-                                    new_crf = max(current_crf - crf_change, CRF_MIN)
-                                    
-                                    # Skip if we've already tried this value
-                                    if new_crf in used_crfs:
-                                        print(f"Already tried CRF={new_crf}, looking for alternate value")
-                                        
-                                        # Try to find an untried CRF value between current and minimum
-                                        found_new_crf = False
-                                        for test_crf in range(current_crf - 1, CRF_MIN - 1, -1):
-                                            if test_crf not in used_crfs:
-                                                new_crf = test_crf
-                                                found_new_crf = True
-                                                print(f"Selected alternate CRF={new_crf}")
-                                                break
-                                        
-                                        if not found_new_crf:
-                                            print(f"No untried CRF values left. Using best available result.")
-                                            break  # Exit the loop if we can't find a new value
-                                    
-                                    print(f"Fine-tuning attempt {i+1}/{attempts_limit}: Trying CRF={new_crf} (target: {MIN_SIZE_MB}-{MAX_SIZE_MB}MB)")
-                                    fine_tune_filepath = os.path.join(OUTPUT_FOLDER, f"finetune{i}_{final_filename}")
-                                    
-                                    try:
-                                        ffmpeg.input(temp_filepath).output(
-                                            fine_tune_filepath, 
-                                            vcodec='libx264', 
-                                            acodec='aac', 
-                                            crf=new_crf,
-                                            preset=COMPRESSION_PRESET,
-                                            **thread_options  # Apply thread limiting if set
-                                        ).run(overwrite_output=True)
-                                        
-                                        used_crfs.append(new_crf)  # Mark this CRF as tried
-                                        
-                                        if os.path.exists(fine_tune_filepath):
-                                            fine_tune_size = os.path.getsize(fine_tune_filepath) / (1024 * 1024)
-                                            print(f"Fine-tune attempt {i+1} produced: {fine_tune_size:.2f}MB")
-                                            
-                                            # Add to our results
-                                            results.append((new_crf, fine_tune_size, fine_tune_filepath))
-                                            
-                                            # If we've reached target range, we can stop
-                                            if MIN_SIZE_MB <= fine_tune_size <= MAX_SIZE_MB:
-                                                print(f"Found file in target range! CRF={new_crf}, size={fine_tune_size:.2f}MB")
-                                                best_result = (new_crf, fine_tune_size, fine_tune_filepath)
-                                                break
-                                            
-                                            # If we're over max size, we need to back up
-                                            if fine_tune_size > MAX_SIZE_MB:
-                                                print(f"Exceeded maximum size. Need to back up.")
-                                                # On next iteration, we'll increase CRF to reduce size
-                                                # Find a value between the last working CRF and this one
-                                                current_crf = int((current_crf + new_crf) / 2)
-                                                current_size = fine_tune_size
-                                                continue
-                                                
-                                            # Update current values for next iteration
-                                            if fine_tune_size > current_size:
-                                                current_crf = new_crf
-                                                current_size = fine_tune_size
-                                                current_path = fine_tune_filepath
-                                                
-                                                # If we're getting close to MIN_SIZE_MB, make smaller adjustments
-                                                if fine_tune_size > MIN_SIZE_MB * 0.8:
-                                                    print(f"Getting close to target range. Decreasing step size.")
-                                        else:
-                                            print(f"Error: Fine-tune attempt didn't produce a file")
-                                            break
-                                    except Exception as e:
-                                        print(f"Error during fine-tune attempt {i+1}: {e}")
-                                        if os.path.exists(fine_tune_filepath):
-                                            safe_remove(fine_tune_filepath)
-                                        break
-                                
-                                # After all fine-tuning attempts, select the best result
-                                if 'best_result' not in locals():
-                                    # Update our valid_results to include any new fine-tuning results
-                                    valid_results = [r for r in results if r[1] <= MAX_SIZE_MB]
-                                    target_results = [r for r in valid_results if r[1] >= MIN_SIZE_MB]
-                                    
-                                    if target_results:
-                                        # We got something in range through fine-tuning
-                                        best_result = min(target_results, key=lambda r: abs(r[1] - TARGET_SIZE_MB))
-                                        print(f"Fine-tuning got us to target range! Using CRF={best_result[0]}, size={best_result[1]:.2f}MB")
-                                    else:
-                                        # Still didn't get in range, use best available
-                                        best_result = max(valid_results, key=lambda r: r[1])
-                                        print(f"Fine-tuning complete. Using best available: CRF={best_result[0]}, size={best_result[1]:.2f}MB")
-                            else:
-                                # No files below MIN_SIZE_MB, must all be above MAX_SIZE_MB
-                                # We'll have to use the smallest file we found
-                                smallest_valid = min(valid_results, key=lambda r: r[1])
-                                best_result = smallest_valid
-                                print(f"All files too large. Using smallest: CRF={best_result[0]}, size={best_result[1]:.2f}MB")
+                            # Everything under the limit is below MIN_SIZE_MB - use the largest (best quality) one
+                            best_result = max(valid_results, key=lambda r: r[1])
+                            print(f"No file in target range ({MIN_SIZE_MB}-{MAX_SIZE_MB}MB) after {search.attempts} attempts.")
                         
                         best_crf, best_size, best_filepath = best_result
+                        chosen_crf = best_crf
                         print(f"Using best available result: CRF={best_crf}, size={best_size:.2f}MB")
                         
                         # Rename the best file to our final filename
                         if os.path.exists(final_filepath):
                             safe_remove(final_filepath)
                         safe_rename(best_filepath, final_filepath)
+                        # Mark as complete only if we got here without aborting
+                        if not (abort_processing or global_stop_event.is_set()):
+                            completed_successfully = True
                     else:
-                        # All results are too large, use the smallest result but compress it further
-                        smallest_result = min(results, key=lambda r: r[1])
-                        crf, size, filepath = smallest_result
-                        
-                        # If this is still way too large, try one more aggressive compression
-                        if size > MAX_SIZE_MB * 1.5:  # If it's more than 15MB
-                            print(f"All results too large, trying one final aggressive compression (CRF={CRF_MAX})")
-                            final_filepath_temp = os.path.join(OUTPUT_FOLDER, f"final_compressed_{final_filename}")
-                            
-                            try:
-                                ffmpeg.input(filepath).output(
-                                    final_filepath_temp, 
-                                    vcodec='libx264', 
-                                    acodec='aac', 
-                                    crf=CRF_MAX,  # Very aggressive compression
-                                    preset=COMPRESSION_PRESET,
-                                    **thread_options  # Apply thread limiting if set
-                                ).run(overwrite_output=True)
-                                
-                                if os.path.exists(final_filepath_temp):
-                                    final_size = os.path.getsize(final_filepath_temp) / (1024 * 1024)
-                                    if final_size <= MAX_SIZE_MB:
-                                        print(f"Final aggressive compression successful: {final_size:.2f}MB")
-                                        if os.path.exists(final_filepath):
-                                            safe_remove(final_filepath)
-                                        safe_rename(final_filepath_temp, final_filepath)
-                                    else:
-                                        print(f"Even aggressive compression ({final_size:.2f}MB) exceeds limit. Using original trimmed file.")
-                                        safe_remove(final_filepath_temp)
-                                        if os.path.exists(final_filepath):
-                                            safe_remove(final_filepath)
-                                        safe_rename(temp_filepath, final_filepath)
-                                    # We're keeping the temp file so don't try to delete it later
-                                    temp_filepath = None
-                            except Exception as e:
-                                print(f"Error during final aggressive compression: {e}")
-                                if os.path.exists(final_filepath_temp):
-                                    safe_remove(final_filepath_temp)
-                                if os.path.exists(final_filepath):
-                                    safe_remove(final_filepath)
-                                safe_rename(temp_filepath, final_filepath)
-                                temp_filepath = None
+                        # No trial left a file under the limit (too large, or stopped early on its projected
+                        # size). Stop searching CRF and let rate control
+                        # hit the size directly - the oversized trimmed file is never sent.
+                        if results:
+                            reason = f"All finished trials exceed {MAX_SIZE_MB}MB"
+                        elif all(size_mb > search.max_size_mb for size_mb in search.points.values()):
+                            reason = f"Every trial was stopped early, projected over {MAX_SIZE_MB}MB"
                         else:
-                            # Not drastically large, use original trimmed file
-                            print("All results exceed size limit. Using original trimmed file.")
+                            reason = "No usable trial in range (trials were stopped early for projected sizes outside it)"
+                        print(f"{reason}, encoding at the bitrate that fits {TARGET_SIZE_MB}MB instead")
+                        fit_filepath = os.path.join(OUTPUT_FOLDER, f"fit_{final_filename}")
+                        passlog_prefix = os.path.join(OUTPUT_FOLDER, f"passlog_{final_filename}")
+                        temp_files_to_clean.append(fit_filepath)
+                        temp_files_to_clean.extend(video_codec.pass_log_files(passlog_prefix))
+                        try:
+                            with pipeline_metrics.timer(METRIC_COMPRESSION_SECONDS, kind='bitrate_fit'):
+                                fit_size_mb = encode_to_size(temp_filepath, fit_filepath, clip_length, passlog_prefix, encode_options,
+                                                     audio_kbps, audio_path, final_filename)
+                        except AbortRequestedException:
+                            raise
+                        except Exception as e:
+                            if abort_processing or global_stop_event.is_set():
+                                raise AbortRequestedException("Bitrate-targeted compression interrupted due to stop request")
+                            print(f"Error during bitrate-targeted compression: {e}")
+                            fit_size_mb = None
+                        
+                        if fit_size_mb is not None and fit_size_mb <= MAX_SIZE_MB:
+                            print(f"Bitrate-targeted compression complete: {fit_size_mb:.2f}MB")
                             if os.path.exists(final_filepath):
                                 safe_remove(final_filepath)
-                            safe_rename(temp_filepath, final_filepath)
-                        # We're keeping the temp file so don't try to delete it later
-                        temp_filepath = None
+                            safe_rename(fit_filepath, final_filepath)
+                            # Mark as complete only if we got here without aborting
+                            if not (abort_processing or global_stop_event.is_set()):
+                                completed_successfully = True
+                        else:
+                            print(f"Could not compress the clip under {MAX_SIZE_MB}MB, not sending it.")
+                            failure_reason = f"Could not compress the clip under {MAX_SIZE_MB}MB"
+        
+        # Teach the CRF model what this clip produced (video sizes, without the audio track), so the next similar clip starts closer
+        crf_size_points.extend((r[0], r[1] - audio_mb) for r in results)
+        if crf_model is not None and crf_size_points:
+            crf_model.record(game_folder_name, model_width, model_height, original_bitrate, model_preset,
+                             clip_length, crf_size_points)
         
         # Final check for abort before sending to webhook
         if abort_processing or global_stop_event.is_set():
@@ -761,43 +1521,54 @@ def process_clip(filepath):
         
         # This block only runs if we completed successfully
         if completed_successfully:
-            # Get processing time
-            if normalized_path in file_detection_times:
-                detection_time = file_detection_times[normalized_path]
-                processing_time = datetime.now() - detection_time
-                print(f"Total processing time: {processing_time.total_seconds():.2f} seconds")
-                
-                # Send to Discord with processing time
-                if os.path.exists(final_filepath):
-                    final_size_mb = os.path.getsize(final_filepath) / (1024 * 1024)
-                    send_to_webhook(final_filepath, game_folder_name, final_size_mb, processing_time)
-                else:
-                    print(f"Error: Could not find final output file to send to webhook")
+            if os.path.exists(final_filepath):
+                detection_time = file_detection_times.get(normalized_path)
+                if detection_time is None:
+                    print(f"Warning: Could not find detection time for {normalized_path}")
+                final_size_mb = os.path.getsize(final_filepath) / (1024 * 1024)
+                targets = WEBHOOK_URLS
+                if clip_id is not None:
+                    clip_ledger.encoded(clip_id, final_filepath, final_size_mb, chosen_crf, WEBHOOK_URLS)
+                    failure_reason = None
+                    # A retried clip isn't sent again to the webhooks an earlier attempt reached
+                    targets = clip_ledger.pending_targets(clip_id)
+                # Hand the clip to the uploaders so this worker can start encoding the next one
+                queue_upload(final_filepath, game_folder_name, final_size_mb, detection_time, clip_id, targets)
+                clip_result = 'encoded'
+                print(f"Added {final_filepath} to upload queue")
             else:
-                print(f"Warning: Could not find detection time for {normalized_path}")
-                print(f"Available keys: {list(file_detection_times.keys())}")
-                
-                # Send to Discord without processing time
-                if os.path.exists(final_filepath):
-                    final_size_mb = os.path.getsize(final_filepath) / (1024 * 1024)
-                    send_to_webhook(final_filepath, game_folder_name, final_size_mb)
-                else:
-                    print(f"Error: Could not find final output file to send to webhook")
+                print("Error: Could not find final output file to send to webhook")
+        elif abort_processing or global_stop_event.is_set():
+            raise AbortRequestedException(f"Processing for {normalized_path} was aborted, not sending to webhook.")
         else:
-            print(f"Processing for {normalized_path} was aborted, not sending to webhook.")
-        
-        # Clean up any remaining iteration files
-        for _, _, filepath in results:
-            if filepath != final_filepath and os.path.exists(filepath):
-                safe_remove(filepath)
+            print(f"Processing for {normalized_path} failed ({failure_reason}), not sending to webhook.")
     
-    except AbortRequestedException as e:
+    except (AbortRequestedException, EncodeCancelled) as e:
         print(str(e))
+        # Leave the clip pending so the next run encodes it again
+        failure_reason = None
+        clip_result = 'aborted'
+        if clip_id is not None:
+            clip_ledger.requeue(clip_id)
         # Will clean up files in the finally block
     except Exception as e:
         print(f"Error processing clip {filepath}: {e}")
         traceback.print_exc()
+        failure_reason = str(e)
     finally:
+        if clip_id is not None and failure_reason:
+            clip_ledger.failed(clip_id, failure_reason)
+        pipeline_metrics.inc(METRIC_CLIPS, result=clip_result)
+        
+        # Clean up the compression attempts that were not kept, and on abort the output file that
+        # was never handed to the uploaders (the clip is encoded again under a new name on resume)
+        for _, _, trial_filepath in results:
+            if trial_filepath != final_filepath and os.path.exists(trial_filepath):
+                safe_remove(trial_filepath)
+        if clip_result == 'aborted' and final_filepath and os.path.exists(final_filepath):
+            print(f"Removing unsent output file: {final_filepath}")
+            safe_remove(final_filepath)
+        
         # Clean up any temporary files
         for tmp_file in temp_files_to_clean:
             if os.path.exists(tmp_file):
@@ -805,81 +1576,213 @@ def process_clip(filepath):
                 safe_remove(tmp_file)
         
         # Remove entry from file_detection_times to prevent stale entries
-        if normalized_path in file_detection_times:
-            del file_detection_times[normalized_path]
+        if file_detection_times.pop(normalized_path, None) is not None:
             print(f"Removed {normalized_path} from detection times tracking")
+        
+        if final_filename:
+            release_output_filename(final_filename)
+
+def encode_progress(description, filename, duration, size_range=None):
+    """ffmpeg_runner options that report an encode as throttled 'Encode progress:' lines.
+
+    The lines carry the percentage, encoding speed, ETA and the output size projected from the
+    bytes written so far; the GUI turns them into a progress bar. With size_range (min_mb, max_mb)
+    the encode is stopped once its projected size is more than EARLY_ABORT_MARGIN outside it.
+    """
+    last_printed = [0.0]
+
+    def report(progress):
+        if progress.fraction is None:
+            return None
+        if size_range and EARLY_ABORT_MARGIN > 0 and not progress.finished and progress.projected_bytes \
+                and progress.fraction >= EARLY_ABORT_MIN_PROGRESS:
+            projected_mb = progress.projected_bytes / (1024 * 1024)
+            min_mb, max_mb = size_range
+            if projected_mb > max_mb * (1 + EARLY_ABORT_MARGIN) or projected_mb < min_mb * (1 - EARLY_ABORT_MARGIN):
+                print(f"{description} is heading for ~{projected_mb:.2f}MB at {int(progress.fraction * 100)}%, "
+                      f"stopping it early - {filename}")
+                return True
+        now = time.monotonic()
+        if not progress.finished and now - last_printed[0] < ENCODE_PROGRESS_INTERVAL:
+            return None
+        last_printed[0] = now
+        details = [description]
+        if progress.speed:
+            details.append(f"{progress.speed:.2f}x")
+        if progress.eta_seconds is not None and not progress.finished:
+            details.append(f"ETA {progress.eta_seconds:.0f}s")
+        if progress.projected_bytes:
+            details.append(f"~{progress.projected_bytes / (1024 * 1024):.2f}MB")
+        print(f"Encode progress: {int(progress.fraction * 100)}% ({', '.join(details)}) - {filename}")
+        return None
+
+    return {'progress_callback': report, 'duration': duration}
 
-def send_to_webhook(file_path, game_name, file_size_mb=None, processing_time=None):
-    """Send a file to Discord using a webhook."""
+def print_upload_progress(filename, bytes_sent, total_bytes, elapsed_seconds):
+    """Log upload progress in the 'Upload progress:' format the GUI turns into a progress bar"""
+    percent = int(bytes_sent * 100 / total_bytes) if total_bytes else 100
+    kbps = bytes_sent / 1024 / elapsed_seconds if elapsed_seconds > 0 else 0
+    print(f"Upload progress: {percent}% ({bytes_sent / (1024 * 1024):.2f}/{total_bytes / (1024 * 1024):.2f}MB "
+          f"at {kbps:.0f}KB/s) - {filename}")
+
+def send_to_webhook(file_path, game_name, file_size_mb=None, processing_time=None, webhook_url=None,
+                    content_hash=None, cached_url=None, stop_event=None):
+    """Send a file to Discord using a webhook (the first configured one by default).
+
+    With cached_url (an attachment link from an earlier upload of the same clip) the link is posted
+    instead of the file. content_hash is the re-share cache key an uploaded file's link is saved under.
+
+    Returns True if Discord accepted it. Raises UploadCancelled if stop_event (monitoring's by
+    default) was set first.
+    """
+    webhook_url = webhook_url or WEBHOOK_URLS[0]
+    stop_event = stop_event or global_stop_event
+    label = webhook_label(webhook_url)
     try:
         # Get just the filename from the path
         filename = os.path.basename(file_path)
         
-        # Create a multipart form data payload
-        with open(file_path, 'rb') as f:
-            files = {
-                'file': (filename, f, 'video/mp4')
-            }
+        # Create a more informative message
+        message = []
+        
+        # Add user name if configured
+        if USER_NAME:
+            message.append(f"**{USER_NAME}** shared a clip from **{game_name}**")
+        else:
+            message.append(f"New clip from **{game_name}**")
             
-            # Create a more informative message
-            message = []
+        # Add file size if available
+        if file_size_mb is not None:
+            message.append(f"**Size:** {file_size_mb:.2f}MB")
             
-            # Add user name if configured
-            if USER_NAME:
-                message.append(f"**{USER_NAME}** shared a clip from **{game_name}**")
+        # Add processing time if available
+        if processing_time is not None:
+            # Format processing time nicely
+            seconds = processing_time.total_seconds()
+            if seconds < 60:
+                time_str = f"{seconds:.1f} seconds"
             else:
-                message.append(f"New clip from **{game_name}**")
-                
-            # Add file size if available
-            if file_size_mb is not None:
-                message.append(f"**Size:** {file_size_mb:.2f}MB")
-                
-            # Add processing time if available
-            if processing_time is not None:
-                # Format processing time nicely
-                seconds = processing_time.total_seconds()
-                if seconds < 60:
-                    time_str = f"{seconds:.1f} seconds"
-                else:
-                    minutes = int(seconds // 60)
-                    remaining_seconds = seconds % 60
-                    time_str = f"{minutes} minute{'s' if minutes != 1 else ''} {remaining_seconds:.1f} seconds"
-                message.append(f"**Processing time:** {time_str}")
-                print(f"Adding processing time to Discord message: {time_str}")
-            else:
-                print("No processing time available to add to Discord message")
-                
-            # Join all parts with line breaks
-            content = "\n".join(message)
-            
-            # You can add a message with the file
-            data = {
-                'content': content
-            }
-            
-            # Send the request to the webhook URL
-            response = requests.post(WEBHOOK_URL, files=files, data=data)
+                minutes = int(seconds // 60)
+                remaining_seconds = seconds % 60
+                time_str = f"{minutes} minute{'s' if minutes != 1 else ''} {remaining_seconds:.1f} seconds"
+            message.append(f"**Processing time:** {time_str}")
+            print(f"Adding processing time to Discord message: {time_str}")
+        else:
+            print("No processing time available to add to Discord message")
             
-            # Check if the request was successful
-            if response.status_code == 204 or response.status_code == 200:
-                print(f"Successfully sent clip to Discord webhook: {file_path}")
-            else:
-                print(f"Error sending clip to Discord webhook: HTTP {response.status_code}")
-                print(f"Response content: {response.text}")
+        # Join all parts with line breaks
+        content = "\n".join(message)
+        
+        # A clip that was already uploaded before is posted as its attachment link instead
+        if cached_url:
+            discord_uploader.send_message(webhook_url, f"{content}\n{cached_url}", stop_event=stop_event)
+            print(f"Successfully sent clip to {label} as a link to the earlier upload: {file_path}")
+            pipeline_metrics.inc(METRIC_UPLOADS, result='linked')
+            return True
+        
+        # Stream the file as multipart form data, retrying transient failures and waiting out rate limits
+        progress_name = f"{filename} to {label}"
+        response = discord_uploader.send_file(
+            with_wait(webhook_url) if content_hash is not None else webhook_url, file_path, filename, content,
+            stop_event=stop_event,
+            progress_callback=lambda sent, total, elapsed: print_upload_progress(progress_name, sent, total, elapsed)
+        )
+        print(f"Successfully sent clip to {label}: {file_path}")
+        pipeline_metrics.inc(METRIC_UPLOADS, result='uploaded')
+        pipeline_metrics.inc(METRIC_UPLOADED_BYTES, os.path.getsize(file_path))
+        
+        if content_hash is not None and reshare_cache is not None:
+            # Targets of the same clip upload side by side, the first link to come back is kept
+            uploaded_url = attachment_url(response)
+            if uploaded_url:
+                reshare_cache.put_first(content_hash, uploaded_url)
+        return True
+    except UploadCancelled:
+        pipeline_metrics.inc(METRIC_UPLOADS, result='cancelled')
+        raise
+    except UploadError as e:
+        print(f"Error sending clip to {label}: {e}")
+        pipeline_metrics.inc(METRIC_UPLOADS, result='failed')
+        return False
     except Exception as e:
-        print(f"Error sending clip to Discord webhook: {e}")
+        print(f"Error sending clip to {label}: {e}")
+        pipeline_metrics.inc(METRIC_UPLOADS, result='failed')
+        return False
+
+def clip_game_name(file_path):
+    """Game name of a finished clip, from its GameName-Timestamp.mp4 output filename"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return re.sub(r'-\d{8}-\d{4}(-\d+)?$', '', stem)
+
+def resend_clip(file_path, game_name=None, stop_event=None):
+    """Send a finished clip to every configured webhook again, e.g. to share it with a new channel.
+
+    The clip is looked up in the re-share cache before anything is uploaded: if the same contents
+    were uploaded within RESHARE_CACHE_MAX_AGE_HOURS, the link to that upload is posted instead.
+    When monitoring isn't running the webhooks and upload settings are read from the config, and
+    only stop_event cancels the upload.
+
+    Returns the webhook URLs the clip could not be sent to, or None if no webhook is configured.
+    """
+    global CONFIG, WEBHOOK_URLS, WEBHOOK_URL, USER_NAME, discord_uploader, reshare_cache
+    monitoring = global_stop_event is not None and not global_stop_event.is_set()
+    if monitoring:
+        stop_event = global_stop_event
+    else:
+        stop_event = stop_event or threading.Event()
+        CONFIG = load_config()
+        WEBHOOK_URLS = webhook_targets(CONFIG)
+        WEBHOOK_URL = WEBHOOK_URLS[0] if WEBHOOK_URLS else None
+        USER_NAME = CONFIG.get('USER_NAME', '')
+        set_upload_limit(CONFIG.get('UPLOAD_LIMIT_KBPS', 0))
+        reshare_cache = None
+        if CONFIG.get('RESHARE_CACHE', True):
+            reshare_cache = ReshareCache(max_age_hours=CONFIG.get('RESHARE_CACHE_MAX_AGE_HOURS', 20))
+        if discord_uploader is None:
+            discord_uploader = DiscordUploader()
+    if not WEBHOOK_URLS:
+        print("No webhook URL configured. Please set it in the application settings.")
+        return None
+    
+    content_hash = cached_url = None
+    if reshare_cache is not None:
+        content_hash = file_sha256(file_path)
+        cached_url = reshare_cache.get(content_hash)
+    game_name = game_name or clip_game_name(file_path)
+    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    
+    failed = []
+    for webhook_url in WEBHOOK_URLS:
+        try:
+            sent = send_to_webhook(file_path, game_name, file_size_mb, None, webhook_url, content_hash, cached_url,
+                                   stop_event)
+        except UploadCancelled as e:
+            print(f"{e}: {file_path} was not sent to {webhook_label(webhook_url)}")
+            sent = False
+        if not sent:
+            failed.append(webhook_url)
+        elif cached_url is None and reshare_cache is not None:
+            # The remaining targets can post the link of the upload that just finished
+            cached_url = reshare_cache.get(content_hash)
+    return failed
 
 def run(stop_event=None):
     """Main function to start the monitoring process that can be called from another module"""
     global global_observer, global_stop_event, CONFIG, WEBHOOK_URL, SHADOWPLAY_FOLDER, OUTPUT_FOLDER
     global MIN_SIZE_MB, MAX_SIZE_MB, TARGET_SIZE_MB, MAX_COMPRESSION_ATTEMPTS
-    global CRF_MIN, CRF_MAX, CRF_STEP, EXTRACT_PRESET, COMPRESSION_PRESET
-    global CLIP_DURATION, HIGH_QUALITY_CRF, CLOSE_THRESHOLD, MEDIUM_THRESHOLD, FAR_THRESHOLD
-    global COMPRESSION_METHOD, QUICK_CRF, CPU_THREADS, USER_NAME, file_detection_times
+    global CRF_MIN, CRF_MAX, CRF_STEP, EXTRACT_PRESET, EXTRACT_MODE, COMPRESSION_PRESET, VIDEO_CODEC, video_codec
+    global CLIP_DURATION, HIGH_QUALITY_CRF
+    global COMPRESSION_METHOD, QUICK_CRF, QUICK_DIRECT_ENCODE, CPU_THREADS, USER_NAME, AUDIO_BITRATE_KBPS, AUDIO_CHANNELS, file_detection_times
+    global MAX_CONCURRENT_JOBS, READY_STABLE_SECONDS, READY_TIMEOUT_SECONDS, readiness_checker, clip_ledger
+    global discord_uploader, UPLOAD_LIMIT_KBPS, WEBHOOK_URLS
+    global RESHARE_CACHE, RESHARE_CACHE_MAX_AGE_HOURS, reshare_cache
+    global CRF_PREDICTOR, crf_model, PARALLEL_CRF_TRIALS, SAMPLE_ESTIMATION, RESOLUTION_LADDER, LADDER_MIN_BPP
+    global EARLY_ABORT_MARGIN, SPLIT_CRF_TRIALS, METRICS_PORT
     global abort_processing
     
     # Reset abort flag
     abort_processing = False
+    ffmpeg_runner.reset()
     active_processing_event.clear()
     
     # Clear the file detection times dictionary when starting
@@ -923,10 +1826,14 @@ def run(stop_event=None):
         return False
 
     # Get webhook URL from config
-    WEBHOOK_URL = CONFIG.get('WEBHOOK_URL', '')
-    if not WEBHOOK_URL:
+    WEBHOOK_URLS = webhook_targets(CONFIG)
+    if not WEBHOOK_URLS:
         print("No webhook URL configured. Please set it in the application settings.")
         return False
+    WEBHOOK_URL = WEBHOOK_URLS[0]
+    upload_queues.clear()
+    for webhook_url in WEBHOOK_URLS:
+        upload_queues[webhook_url] = queue.Queue()
 
     # Other configuration values
     SHADOWPLAY_FOLDER = CONFIG.get('SHADOWPLAY_FOLDER', '')
@@ -939,23 +1846,57 @@ def run(stop_event=None):
     CRF_MAX = CONFIG.get('CRF_MAX', 30)
     CRF_STEP = CONFIG.get('CRF_STEP', 1)
     EXTRACT_PRESET = CONFIG.get('EXTRACT_PRESET', 'fast')
+    EXTRACT_MODE = CONFIG.get('EXTRACT_MODE', EXTRACT_STREAM_COPY)
     COMPRESSION_PRESET = CONFIG.get('COMPRESSION_PRESET', 'medium')
+    VIDEO_CODEC = CONFIG.get('VIDEO_CODEC', CODEC_X264)
+    video_codec = get_codec(VIDEO_CODEC)
     CLIP_DURATION = CONFIG.get('CLIP_DURATION', 15)
     HIGH_QUALITY_CRF = CONFIG.get('HIGH_QUALITY_CRF', 18)
-    CLOSE_THRESHOLD = CONFIG.get('CLOSE_THRESHOLD', 0.9)
-    MEDIUM_THRESHOLD = CONFIG.get('MEDIUM_THRESHOLD', 0.75)
-    FAR_THRESHOLD = CONFIG.get('FAR_THRESHOLD', 0.5)
     COMPRESSION_METHOD = CONFIG.get('COMPRESSION_METHOD', COMPRESSION_QUICK)
     QUICK_CRF = CONFIG.get('QUICK_CRF', 40)
+    QUICK_DIRECT_ENCODE = CONFIG.get('QUICK_DIRECT_ENCODE', True)
     CPU_THREADS = CONFIG.get('CPU_THREADS', 0)  # Get CPU thread setting, default to 0 (auto)
+    MAX_CONCURRENT_JOBS = max(1, CONFIG.get('MAX_CONCURRENT_JOBS', 1))
+    READY_STABLE_SECONDS = CONFIG.get('READY_STABLE_SECONDS', 2.0)
+    READY_TIMEOUT_SECONDS = CONFIG.get('READY_TIMEOUT_SECONDS', 120)
     USER_NAME = CONFIG.get('USER_NAME', '')     # Get user name setting
+    UPLOAD_LIMIT_KBPS = CONFIG.get('UPLOAD_LIMIT_KBPS', 0)
+    set_upload_limit(UPLOAD_LIMIT_KBPS)
+    RESHARE_CACHE = CONFIG.get('RESHARE_CACHE', True)
+    RESHARE_CACHE_MAX_AGE_HOURS = CONFIG.get('RESHARE_CACHE_MAX_AGE_HOURS', 20)
+    reshare_cache = ReshareCache(max_age_hours=RESHARE_CACHE_MAX_AGE_HOURS) if RESHARE_CACHE else None
+    AUDIO_BITRATE_KBPS = CONFIG.get('AUDIO_BITRATE_KBPS', 128)
+    AUDIO_CHANNELS = CONFIG.get('AUDIO_CHANNELS', 0)
+    CRF_PREDICTOR = CONFIG.get('CRF_PREDICTOR', True)
+    crf_model = CrfSizeModel() if CRF_PREDICTOR else None
+    PARALLEL_CRF_TRIALS = CONFIG.get('PARALLEL_CRF_TRIALS', 1)
+    SPLIT_CRF_TRIALS = CONFIG.get('SPLIT_CRF_TRIALS', False)
+    SAMPLE_ESTIMATION = CONFIG.get('SAMPLE_ESTIMATION', True)
+    RESOLUTION_LADDER = CONFIG.get('RESOLUTION_LADDER', True)
+    LADDER_MIN_BPP = CONFIG.get('LADDER_MIN_BPP', 0.06)
+    EARLY_ABORT_MARGIN = CONFIG.get('EARLY_ABORT_MARGIN', 0.25)
+    METRICS_PORT = CONFIG.get('METRICS_PORT', 0)
 
     # Display condensed settings
     print(f"Monitoring folders: {SHADOWPLAY_FOLDER} → {OUTPUT_FOLDER}")
-    print(f"Using '{COMPRESSION_METHOD}' compression method with CRF={QUICK_CRF if COMPRESSION_METHOD == COMPRESSION_QUICK else 'variable'}")
+    if COMPRESSION_METHOD == COMPRESSION_TWO_PASS:
+        print(f"Using '{COMPRESSION_METHOD}' compression method targeting {TARGET_SIZE_MB}MB (audio: {AUDIO_BITRATE_KBPS}kbps)")
+    else:
+        print(f"Using '{COMPRESSION_METHOD}' compression method with CRF={QUICK_CRF if COMPRESSION_METHOD == COMPRESSION_QUICK else 'variable'}")
+    print(f"Extraction mode: {EXTRACT_MODE}")
+    print(f"Video codec: {video_codec.label} (CRF values use the x264 0-51 scale)")
+    if COMPRESSION_METHOD == COMPRESSION_PROGRESSIVE and PARALLEL_CRF_TRIALS > 1:
+        print(f"Progressive CRF trials: up to {parallel_trial_plan(PARALLEL_CRF_TRIALS)[0]} at once"
+              f"{' from one decode' if SPLIT_CRF_TRIALS else ''}")
     print(f"CPU Threads: {CPU_THREADS if CPU_THREADS > 0 else 'Auto (using all available)'}")
+    if MAX_CONCURRENT_JOBS > 1:
+        print(f"Processing up to {MAX_CONCURRENT_JOBS} clips at once ({job_thread_count()} FFmpeg threads each)")
     if USER_NAME:
         print(f"Clips will be sent as: {USER_NAME}")
+    if len(WEBHOOK_URLS) > 1:
+        print(f"Sending clips to {len(WEBHOOK_URLS)} webhooks")
+    if UPLOAD_LIMIT_KBPS > 0:
+        print(f"Upload bandwidth limited to {UPLOAD_LIMIT_KBPS}KB/s")
     
     # Make sure the folders exist
     if not os.path.isdir(SHADOWPLAY_FOLDER):
@@ -970,36 +1911,36 @@ def run(stop_event=None):
             print(f"ERROR: Could not create output folder: {e}")
             return False
     
+    if clip_ledger is None:
+        clip_ledger = ClipLedger()
+    if discord_uploader is None:
+        discord_uploader = DiscordUploader()
+    resume_unfinished_jobs()
+    readiness_checker = ReadinessChecker(queue_finished_recording, global_stop_event,
+                                         READY_STABLE_SECONDS, READY_TIMEOUT_SECONDS)
     event_handler = ClipHandler()
     observer = Observer()
     global_observer = observer
     
-    # Create a list to store all the game folders we want to monitor
-    monitor_folders = []
-    folder_count = 0
-    
-    # Add game-specific folders to monitor, excluding output folder
     try:
+        # Count the game folders for the log, excluding the output folder
+        folder_count = 0
         for item in os.listdir(SHADOWPLAY_FOLDER):
             folder_path = os.path.join(SHADOWPLAY_FOLDER, item)
-            # Make sure we're not monitoring the output folder or any subfolders
-            if os.path.isdir(folder_path) and not folder_path.lower() == OUTPUT_FOLDER.lower():
-                # Check if this is a game folder (not the output folder)
-                if ntpath.basename(folder_path).lower() != "auto-clips":
-                    monitor_folders.append(folder_path)
-                    folder_count += 1
+            if (os.path.isdir(folder_path) and not is_inside_folder(folder_path, OUTPUT_FOLDER)
+                    and item.lower() != "auto-clips"):
+                folder_count += 1
         
         print(f"Monitoring {folder_count} game folders plus main folder")
         
-        # Monitor each game folder individually (not recursively)
-        for folder in monitor_folders:
-            observer.schedule(event_handler, folder, recursive=False)
-        
-        # Also monitor the main Shadowplay folder for recordings saved directly there
-        # but make sure not to monitor the output folder
-        observer.schedule(event_handler, SHADOWPLAY_FOLDER, recursive=False)
+        # One recursive watch covers the main folder, every game folder and any game folder
+        # created later. ClipHandler ignores the output folder and anything nested deeper.
+        observer.schedule(event_handler, SHADOWPLAY_FOLDER, recursive=True)
         
         observer.start()
+        readiness_checker.start()
+        start_workers()
+        start_metrics_server()
         
         print("Clip monitoring started successfully - waiting for new recordings...")
         
@@ -1013,28 +1954,101 @@ def run(stop_event=None):
         observer.join()
         print("Clip monitoring stopped.")
         
-        # Clear any existing queue and reset processing state
-        while not processing_queue.empty():
-            try:
-                processing_queue.get_nowait()
-                processing_queue.task_done()
-            except queue.Empty:
-                break
+        # Clear any existing queues and let the workers finish their current poll
+        drop_pending_jobs()
         
-        global is_processing
-        with processing_lock:
-            is_processing = False
+        for worker in worker_threads + uploader_threads:
+            worker.join(timeout=2.0)
+        stop_metrics_server()
         
         return True
         
     except Exception as e:
         print(f"Error starting clip processor: {e}")
         traceback.print_exc()
+        stop_metrics_server()
         return False
 
+def start_metrics_server():
+    """Serve pipeline_metrics on localhost when METRICS_PORT is set"""
+    global metrics_server
+    if not METRICS_PORT or metrics_server is not None:
+        return
+    try:
+        server = MetricsServer(pipeline_metrics, METRICS_PORT)
+        server.start()
+    except OSError as e:
+        print(f"Could not start the metrics endpoint on port {METRICS_PORT}: {e}")
+        return
+    metrics_server = server
+    print(f"Metrics available at http://127.0.0.1:{METRICS_PORT}/metrics (JSON: /metrics.json)")
+
+def stop_metrics_server():
+    global metrics_server
+    if metrics_server is None:
+        return
+    try:
+        metrics_server.stop()
+    except Exception as e:
+        print(f"Error stopping the metrics endpoint: {e}")
+    metrics_server = None
+
+def drain_queue(pending_queue):
+    """Discard everything waiting in a queue, returning the dropped items"""
+    dropped = []
+    while True:
+        try:
+            dropped.append(pending_queue.get_nowait())
+            pending_queue.task_done()
+        except queue.Empty:
+            return dropped
+
+def drop_pending_jobs():
+    """Empty the in-memory processing and upload queues.
+
+    The clip ledger still holds every dropped job in its pending or encoded state, so the next
+    run picks them up again. Returns the number of (encodes, uploads) dropped.
+    """
+    dropped_uploads = sum(len(drain_queue(target_queue)) for target_queue in upload_queues.values())
+    return len(drain_queue(processing_queue)), dropped_uploads
+
+def queue_pending_uploads(job):
+    """Queue an encoded clip for the webhooks the ledger still has it pending for.
+
+    Targets that are no longer configured are recorded as failed. Returns True if anything was queued.
+    """
+    targets = []
+    for webhook_url in clip_ledger.pending_targets(job['id']):
+        if webhook_url in upload_queues:
+            targets.append(webhook_url)
+        else:
+            clip_ledger.upload_finished(job['id'], webhook_url, False, "Webhook removed from the configuration")
+    if targets:
+        queue_upload(job['output_path'], job['game'], job['output_size_mb'], None, job['id'], targets)
+    return bool(targets)
+
+def resume_unfinished_jobs():
+    """Queue the clips a previous run left unfinished, continuing from their last finished stage"""
+    resumed_encodes = resumed_uploads = 0
+    for job in clip_ledger.resumable_jobs():
+        if job['status'] in (STATUS_ENCODED, STATUS_UPLOADING) and job['output_path'] and os.path.exists(job['output_path']):
+            # Already encoded - only the uploads to the webhooks it hasn't reached yet are left
+            if queue_pending_uploads(job):
+                resumed_uploads += 1
+        elif clip_ledger.source_unchanged(job):
+            clip_ledger.requeue(job['id'])
+            processing_queue.put((job['source_path'], job['id']))
+            resumed_encodes += 1
+        else:
+            print(f"Not resuming {job['source_path']}: the recording was changed or removed")
+            clip_ledger.failed(job['id'], "Recording changed or removed before it was processed")
+    
+    if resumed_encodes or resumed_uploads:
+        print(f"Resuming unfinished clips from the last session: {resumed_encodes} to encode, {resumed_uploads} to upload")
+
 def stop():
     """Stop the monitoring process"""
-    global global_observer, global_stop_event, processing_queue, is_processing, abort_processing, file_detection_times
+    global global_observer, global_stop_event, processing_queue, abort_processing, file_detection_times
     
     # Check if we've already been signaled to stop
     if global_stop_event and global_stop_event.is_set():
@@ -1050,9 +2064,14 @@ def stop():
     # Signal any active processing to abort
     abort_processing = True
     
-    # Check if we're actively processing something
+    # Kill the running encodes instead of waiting for them to finish
+    killed = ffmpeg_runner.cancel_all()
+    if killed:
+        print(f"Stopped {killed} running FFmpeg process(es)")
+    
+    # Check if any worker is actively processing something
     if active_processing_event.is_set():
-        print("Waiting for active processing to abort (max 5 seconds)...")
+        print(f"Waiting for {active_jobs} active job(s) to abort (max 5 seconds)...")
         # Wait up to 5 seconds for processing to stop
         abort_wait_start = time.time()
         while active_processing_event.is_set() and (time.time() - abort_wait_start) < 5.0:
@@ -1063,24 +2082,15 @@ def stop():
         else:
             print("Active processing aborted successfully")
     
-    # Clear the processing queue
-    if processing_queue:
-        print("Clearing processing queue...")
-        try:
-            # Empty the queue without processing the items
-            while not processing_queue.empty():
-                try:
-                    processing_queue.get_nowait()
-                    processing_queue.task_done()
-                except queue.Empty:
-                    break
-            print(f"Processing queue cleared")
-        except Exception as e:
-            print(f"Error clearing processing queue: {e}")
-    
-    # Reset processing flag
-    with processing_lock:
-        is_processing = False
+    # Clear the processing and upload queues without processing the items
+    print("Clearing processing and upload queues...")
+    try:
+        dropped_encodes, dropped_uploads = drop_pending_jobs()
+        if dropped_encodes or dropped_uploads:
+            print(f"{dropped_encodes} clip(s) waiting to encode and {dropped_uploads} waiting to upload will resume on the next start")
+        print(f"Processing queues cleared")
+    except Exception as e:
+        print(f"Error clearing processing queues: {e}")
     
     # Clear the file detection times to prevent processing continued files
     file_detection_times.clear()
@@ -1098,6 +2108,12 @@ def stop():
 
 # Only run initialization if the module is run directly, not when imported
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == '--resend':
+        # clip_processor.py --resend <clip> [game name]: send a finished clip to the webhooks again
+        game = sys.argv[3] if len(sys.argv) > 3 else None
+        failed = resend_clip(sys.argv[2], game)
+        sys.exit(1 if failed is None or failed else 0)
+    
     # If run directly, create our own stop_event
     stop_event = threading.Event()
     
@@ -0,0 +1,122 @@
+"""
+Compare the video codecs on your own clips.
+
+Every clip is encoded with each codec and the script reports the output size, the SSIM against the
+source and the encode time. By default every codec encodes at the same x264-scale CRF. With
+--size-range the CRF search used by Progressive compression finds a CRF that lands in that range for
+each codec instead, which shows the quality each codec delivers at the size Discord allows.
+
+Usage:
+    python codec_benchmark.py clip.mp4 [clip2.mp4 ...] [--crf 30] [--preset medium]
+                              [--codecs libx264,libx265] [--seconds 15] [--size-range 8 10]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+import ffmpeg
+
+from crf_search import CrfSearch
+from video_codecs import VIDEO_CODECS, get_codec
+
+SSIM_PATTERN = re.compile(r'All:([0-9.]+)')
+
+
+def encode(codec, source_path, start, seconds, crf, preset, output_path):
+    """Encode the clip section at an x264-scale CRF. Returns (size_mb, seconds taken)."""
+    started = time.perf_counter()
+    ffmpeg.input(source_path, ss=start, t=seconds).output(
+        output_path,
+        acodec='aac',
+        **codec.crf_options(crf, preset)
+    ).run(overwrite_output=True, quiet=True)
+    return os.path.getsize(output_path) / (1024 * 1024), time.perf_counter() - started
+
+
+def measure_ssim(encoded_path, source_path, start, seconds):
+    """Average SSIM of the encoded clip against the same section of the source"""
+    encoded = ffmpeg.input(encoded_path).video
+    reference = ffmpeg.input(source_path, ss=start, t=seconds).video
+    _, stderr = ffmpeg.filter([encoded, reference], 'ssim').output('-', format='null').run(
+        capture_stdout=True, capture_stderr=True
+    )
+    matches = SSIM_PATTERN.findall(stderr.decode('utf-8', errors='replace'))
+    return float(matches[-1]) if matches else None
+
+
+def benchmark_codec(codec, source_path, start, seconds, args, work_dir):
+    """Returns (crf, size_mb, ssim, encode_seconds) for one codec, the time summed over all attempts"""
+    output_path = os.path.join(work_dir, f"{codec.name}.mp4")
+    if not args.size_range:
+        size_mb, encode_seconds = encode(codec, source_path, start, seconds, args.crf, args.preset, output_path)
+        return args.crf, size_mb, measure_ssim(output_path, source_path, start, seconds), encode_seconds
+
+    min_mb, max_mb = args.size_range
+    search = CrfSearch(1, 51, min_mb, max_mb, (min_mb + max_mb) / 2, args.attempts, args.crf)
+    best = None  # (crf, size_mb) of the largest result that fits under max_mb
+    total_seconds = 0.0
+    last_crf = None
+    while True:
+        crf = search.next_crf()
+        if crf is None:
+            break
+        last_crf = crf
+        size_mb, encode_seconds = encode(codec, source_path, start, seconds, crf, args.preset, output_path)
+        total_seconds += encode_seconds
+        search.record(crf, size_mb)
+        if size_mb <= max_mb and (best is None or size_mb > best[1]):
+            best = (crf, size_mb)
+
+    if best is None:
+        return None, None, None, total_seconds
+    crf, size_mb = best
+    if crf != last_crf:
+        # The kept result was not the last encode, so produce it again for the SSIM measurement
+        encode(codec, source_path, start, seconds, crf, args.preset, output_path)
+    return crf, size_mb, measure_ssim(output_path, source_path, start, seconds), total_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare size, quality (SSIM) and encode time of the video codecs")
+    parser.add_argument('clips', nargs='+', help="Recordings to benchmark")
+    parser.add_argument('--codecs', default=','.join(VIDEO_CODECS), help="Comma separated codec names")
+    parser.add_argument('--crf', type=int, default=30, help="CRF on the x264 0-51 scale (start of the search with --size-range)")
+    parser.add_argument('--preset', default='medium', help="x264 preset name, mapped for the other codecs")
+    parser.add_argument('--seconds', type=float, default=15, help="Benchmark the last this many seconds of each clip")
+    parser.add_argument('--size-range', type=float, nargs=2, metavar=('MIN_MB', 'MAX_MB'),
+                        help="Search each codec's CRF until the clip lands in this size range")
+    parser.add_argument('--attempts', type=int, default=6, help="Most encodes per codec with --size-range")
+    args = parser.parse_args()
+
+    codecs = [get_codec(name.strip()) for name in args.codecs.split(',') if name.strip()]
+    print(f"{'Clip':<30}{'Codec':<14}{'CRF':>5}{'Size MB':>9}{'SSIM':>8}{'Encode s':>10}")
+    with tempfile.TemporaryDirectory(prefix='codec_benchmark_') as work_dir:
+        for source_path in args.clips:
+            try:
+                duration = float(ffmpeg.probe(source_path)['format']['duration'])
+            except ffmpeg.Error as e:
+                print(f"Could not probe {source_path}: {e.stderr.decode('utf-8', errors='replace') if e.stderr else e}")
+                continue
+            start = max(0.0, duration - args.seconds)
+            seconds = duration - start
+            clip_name = os.path.basename(source_path)[:29]
+            for codec in codecs:
+                try:
+                    crf, size_mb, ssim, encode_seconds = benchmark_codec(codec, source_path, start, seconds, args, work_dir)
+                except ffmpeg.Error as e:
+                    error = e.stderr.decode('utf-8', errors='replace').strip().splitlines()[-1:] if e.stderr else [str(e)]
+                    print(f"{clip_name:<30}{codec.name:<14} failed: {' '.join(error)}")
+                    continue
+                if crf is None:
+                    print(f"{clip_name:<30}{codec.name:<14} no CRF fits under {args.size_range[1]}MB ({encode_seconds:.1f}s)")
+                    continue
+                ssim_text = f"{ssim:.4f}" if ssim is not None else '-'
+                print(f"{clip_name:<30}{codec.name:<14}{crf:>5}{size_mb:>9.2f}{ssim_text:>8}{encode_seconds:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
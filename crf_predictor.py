@@ -0,0 +1,122 @@
+"""
+Learned CRF -> file size model used to pick the starting CRF for Progressive compression.
+
+Every finished job records the (CRF, size) points it produced. Sizes are stored as MB per second
+of clip so clips of different lengths can share a model. For x264 the log of the file size is close
+to linear in CRF, so each key is fitted with a weighted least squares line in log-size space.
+"""
+import os
+import json
+import math
+import time
+import threading
+
+import config_helper
+from crf_search import DEFAULT_LOG_SLOPE
+
+MODEL_FILE = 'crf_model.json'
+
+# Fitted slopes outside this range come from noisy points and are clamped
+MIN_LOG_SLOPE = -0.5
+MAX_LOG_SLOPE = -0.02
+# Only the most recent points are kept for each key
+MAX_POINTS_PER_KEY = 40
+# Weight of a point halves for every this many newer points recorded after it
+RECENCY_HALF_LIFE = 10
+
+
+def bitrate_bucket(source_kbps):
+    """Group source bitrates by doubling (e.g. 16-32Mbps share a bucket)"""
+    return int(round(math.log2(max(source_kbps, 1))))
+
+
+class CrfSizeModel:
+    """Persisted per-game model that predicts which CRF lands nearest a target size"""
+
+    def __init__(self, filename=MODEL_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.points = self._load()
+
+    def _load(self):
+        model_path = config_helper.get_config_file_path(self.filename)
+        if not os.path.exists(model_path):
+            return {}
+        try:
+            with open(model_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('points', {})
+        except Exception as e:
+            print(f"Error loading CRF model {self.filename}, starting a new one: {e}")
+            return {}
+
+    def _save(self):
+        model_path = config_helper.get_config_file_path(self.filename)
+        temp_path = model_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'points': self.points}, f)
+            os.replace(temp_path, model_path)
+        except Exception as e:
+            print(f"Error saving CRF model {self.filename}: {e}")
+
+    @staticmethod
+    def make_keys(game, width, height, source_kbps, preset):
+        """Keys from most to least specific - predictions fall back to broader keys with more data"""
+        resolution = f"{width}x{height}"
+        return [
+            f"{game}|{resolution}|{preset}|{bitrate_bucket(source_kbps)}",
+            f"{game}|{resolution}|{preset}",
+            f"*|{resolution}|{preset}",
+        ]
+
+    def record(self, game, width, height, source_kbps, preset, clip_seconds, crf_sizes):
+        """Record the (crf, size_mb) points produced while compressing one clip"""
+        if not crf_sizes or clip_seconds <= 0:
+            return
+        now = time.time()
+        new_points = [[crf, size_mb / clip_seconds, now] for crf, size_mb in crf_sizes if size_mb > 0]
+        with self.lock:
+            for key in self.make_keys(game, width, height, source_kbps, preset):
+                key_points = self.points.setdefault(key, [])
+                key_points.extend(new_points)
+                del key_points[:-MAX_POINTS_PER_KEY]
+            self._save()
+
+    def predict(self, game, width, height, source_kbps, preset, clip_seconds, target_size_mb, crf_min, crf_max):
+        """Predict the CRF that lands nearest target_size_mb.
+
+        Returns a (crf, key, log_slope) tuple, where log_slope is the fitted change in log size per
+        CRF step, or None if nothing has been learned for this kind of clip yet.
+        """
+        with self.lock:
+            for key in self.make_keys(game, width, height, source_kbps, preset):
+                key_points = self.points.get(key)
+                if not key_points:
+                    continue
+                intercept, slope = self._fit(key_points)
+                target_rate = target_size_mb / max(clip_seconds, 0.1)
+                crf = (math.log(target_rate) - intercept) / slope
+                return max(crf_min, min(crf_max, int(round(crf)))), key, slope
+        return None
+
+    @staticmethod
+    def _fit(key_points):
+        """Weighted least squares fit of log(MB per second) against CRF, favouring recent points"""
+        count = len(key_points)
+        weights = [0.5 ** ((count - 1 - i) / RECENCY_HALF_LIFE) for i in range(count)]
+        xs = [point[0] for point in key_points]
+        ys = [math.log(point[1]) for point in key_points]
+
+        total_weight = sum(weights)
+        mean_x = sum(w * x for w, x in zip(weights, xs)) / total_weight
+        mean_y = sum(w * y for w, y in zip(weights, ys)) / total_weight
+        variance = sum(w * (x - mean_x) ** 2 for w, x in zip(weights, xs))
+
+        if variance < 1e-6:
+            # All points at one CRF - use the rule-of-thumb slope through them
+            slope = DEFAULT_LOG_SLOPE
+        else:
+            covariance = sum(w * (x - mean_x) * (y - mean_y) for w, x, y in zip(weights, xs, ys))
+            slope = max(MIN_LOG_SLOPE, min(MAX_LOG_SLOPE, covariance / variance))
+
+        return mean_y - slope * mean_x, slope
@@ -0,0 +1,104 @@
+"""
+Bounded CRF search used by Progressive compression.
+
+Output size falls monotonically (and roughly exponentially) as CRF rises, so the search works on
+integer CRFs in log-size space. Every result narrows a bracket: a CRF whose output is too large
+rules out every lower CRF, and a CRF whose output is too small rules out every higher one. The next
+CRF is a secant step towards the target size inside that bracket, falling back to bisection when
+the secant step stops shrinking the bracket quickly. No CRF is ever tried twice and the search
+stops after max_attempts results.
+"""
+import math
+
+# x264 rule of thumb: raising CRF by 6 roughly halves the file size
+DEFAULT_LOG_SLOPE = -math.log(2) / 6
+
+
+class CrfSearch:
+    """Picks the next CRF to try until one lands in min_size_mb..max_size_mb"""
+
+    def __init__(self, crf_min, crf_max, min_size_mb, max_size_mb, target_size_mb, max_attempts,
+                 initial_crf, log_slope=None, crf_step=1):
+        self.crf_min = crf_min
+        self.crf_max = crf_max
+        self.min_size_mb = min_size_mb
+        self.max_size_mb = max_size_mb
+        self.target_size_mb = target_size_mb
+        self.max_attempts = max_attempts
+        self.initial_crf = initial_crf
+        self.log_slope = log_slope if log_slope is not None and log_slope < 0 else DEFAULT_LOG_SLOPE
+        self.crf_step = max(1, crf_step)
+        self.points = {}  # crf -> size_mb
+        self.attempts = 0
+        self._last_two_sided_width = None
+
+    def record(self, crf, size_mb):
+        """Record the size a CRF produced"""
+        self.points[crf] = max(size_mb, 1e-6)
+        self.attempts += 1
+
+    def in_range(self, size_mb):
+        return self.min_size_mb <= size_mb <= self.max_size_mb
+
+    def found(self):
+        """True once any recorded CRF landed in the target range"""
+        return any(self.in_range(size_mb) for size_mb in self.points.values())
+
+    def bracket(self):
+        """Open CRF interval (low, high) that must contain the answer, given the results so far"""
+        too_large = [crf for crf, size_mb in self.points.items() if size_mb > self.max_size_mb]
+        too_small = [crf for crf, size_mb in self.points.items() if size_mb < self.min_size_mb]
+        low = max(too_large) if too_large else self.crf_min - 1
+        high = min(too_small) if too_small else self.crf_max + 1
+        return low, high
+
+    def candidates(self):
+        """Untried CRFs on the crf_step grid that are still inside the bracket"""
+        low, high = self.bracket()
+        return [crf for crf in range(self.crf_min, self.crf_max + 1, self.crf_step)
+                if low < crf < high and crf not in self.points]
+
+    def next_crf(self):
+        """Return the next CRF to try, or None when the search is finished"""
+        if self.found() or self.attempts >= self.max_attempts:
+            return None
+        candidates = self.candidates()
+        if not candidates:
+            return None
+
+        low, high = self.bracket()
+        two_sided = low >= self.crf_min and high <= self.crf_max
+        guess = self._secant_guess()
+        if two_sided:
+            width = high - low
+            # Bisect when the last step did not at least halve the bracket (keeps the worst case logarithmic)
+            if self._last_two_sided_width is not None and width > self._last_two_sided_width / 2:
+                guess = (low + high) / 2
+            self._last_two_sided_width = width
+
+        # Snap to the nearest untried candidate
+        return min(candidates, key=lambda crf: (abs(crf - guess), crf))
+
+    def _secant_guess(self):
+        """CRF predicted to produce target_size_mb from the two most useful points"""
+        if not self.points:
+            return self.initial_crf
+
+        target_log = math.log(self.target_size_mb)
+        low, high = self.bracket()
+        if low in self.points and high in self.points:
+            # Interpolate between the two ends of the bracket
+            pair = [(low, self.points[low]), (high, self.points[high])]
+        else:
+            # Extrapolate from the points closest to the target size
+            pair = sorted(self.points.items(), key=lambda point: abs(math.log(point[1]) - target_log))[:2]
+
+        crf_a, size_a = pair[0]
+        slope = self.log_slope
+        if len(pair) == 2:
+            crf_b, size_b = pair[1]
+            if crf_b != crf_a:
+                measured_slope = (math.log(size_b) - math.log(size_a)) / (crf_b - crf_a)
+                if measured_slope < 0:
+                    slope = measured_slope
+        return crf_a + (target_log - math.log(size_a)) / slope
@@ -0,0 +1,369 @@
+"""
+Discord webhook uploads with connection pooling, timeouts, retries and rate limiting.
+
+All uploads share one requests.Session (so connections to Discord are reused) and one
+RateLimiter, which follows the X-RateLimit-* and Retry-After headers Discord sends back. A request
+is retried with exponential backoff and jitter on connection errors, connect timeouts, HTTP 429
+and 5xx responses. A read timeout is not retried: the request already reached Discord, which has
+usually created the message, and a webhook POST would post it again. The webhook URL is always
+passed in, so the uploader can be pointed at a local stand-in server for testing.
+
+File uploads are streamed from disk as a multipart body rather than loaded into memory. The body
+is read in chunks through a token bucket shared by all uploads, so the total upload bandwidth can
+be capped, and it reports its progress while Discord receives it.
+"""
+import os
+import time
+import uuid
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CONNECT_TIMEOUT = 10  # Seconds to establish the connection
+READ_TIMEOUT = 120    # Seconds to wait for Discord's response once the upload has been sent
+MAX_RETRIES = 5       # Retries after the first attempt
+BACKOFF_BASE = 1.0    # Seconds before the first retry, doubled on every retry
+BACKOFF_MAX = 60.0    # Longest wait between two retries
+POOL_SIZE = 8         # Connections kept open per host
+CHUNK_SIZE = 64 * 1024     # Bytes read from the file at a time
+PROGRESS_INTERVAL = 0.5    # Seconds between progress reports
+
+
+class UploadError(Exception):
+    """A webhook request failed for good (retries exhausted or a non-retryable response)"""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class UploadCancelled(Exception):
+    """A webhook request was abandoned because stop_event was set - not a failure of the upload"""
+
+
+class RateLimiter:
+    """Tracks Discord rate limits so requests wait instead of getting rejected.
+
+    Limits are tracked per webhook URL (Discord rate limits each webhook separately), plus one
+    global limit for 429 responses flagged as global.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.blocked_until = {}  # webhook URL -> time.time() when requests may resume
+        self.global_blocked_until = 0.0
+
+    @staticmethod
+    def bucket(url):
+        """Rate limit key of a webhook URL - query parameters like wait=true don't change the limit"""
+        return url.split('?', 1)[0]
+
+    def delay(self, url):
+        """Seconds to wait before the next request to url"""
+        with self.lock:
+            resume_at = max(self.blocked_until.get(self.bucket(url), 0.0), self.global_blocked_until)
+        return max(0.0, resume_at - time.time())
+
+    def wait(self, url, stop_event=None):
+        """Block until a request to url is allowed. Returns False if stop_event was set meanwhile."""
+        delay = self.delay(url)
+        while delay > 0:
+            print(f"Waiting {delay:.1f}s for the Discord rate limit")
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+            delay = self.delay(url)
+        return True
+
+    def update(self, url, response):
+        """Record the rate limit state reported by a response"""
+        now = time.time()
+        resume_at = None
+
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is None:
+                try:
+                    retry_after = response.json().get('retry_after')
+                except ValueError:
+                    retry_after = None
+            resume_at = now + _seconds(retry_after, 1.0)
+            is_global = (response.headers.get('X-RateLimit-Global', '').lower() == 'true'
+                         or response.headers.get('X-RateLimit-Scope') == 'global')
+            if is_global:
+                with self.lock:
+                    self.global_blocked_until = max(self.global_blocked_until, resume_at)
+                return
+        elif response.headers.get('X-RateLimit-Remaining') == '0':
+            # The bucket is used up - the next request would be rejected until it resets
+            resume_at = now + _seconds(response.headers.get('X-RateLimit-Reset-After'), 1.0)
+
+        if resume_at is not None:
+            bucket = self.bucket(url)
+            with self.lock:
+                self.blocked_until[bucket] = max(self.blocked_until.get(bucket, 0.0), resume_at)
+
+
+def with_wait(url):
+    """Add wait=true to a webhook URL, so Discord returns the created message instead of 204"""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != 'wait']
+    query.append(('wait', 'true'))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def attachment_url(response):
+    """CDN URL of the first attachment in a ?wait=true webhook response, or None"""
+    try:
+        attachments = response.json().get('attachments') or []
+    except ValueError:
+        return None
+    return attachments[0].get('url') if attachments else None
+
+
+def _seconds(value, default):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Limits the combined upload rate of every upload sharing the bucket.
+
+    Up to one second worth of bytes can be sent in a burst. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate_kbps=0):
+        self.lock = threading.Lock()
+        self.set_rate(rate_kbps)
+
+    def set_rate(self, rate_kbps):
+        with self.lock:
+            self.rate = max(0, rate_kbps) * 1024  # Bytes per second
+            self.capacity = max(self.rate, CHUNK_SIZE)
+            self.tokens = self.capacity
+            self.updated_at = time.monotonic()
+
+    def consume(self, byte_count, stop_event=None):
+        """Block until byte_count bytes may be sent. Raises UploadCancelled if stop_event is set first."""
+        while True:
+            with self.lock:
+                if self.rate <= 0:
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= byte_count:
+                    self.tokens -= byte_count
+                    return
+                wait = (byte_count - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    raise UploadCancelled("Upload cancelled due to stop request")
+            else:
+                time.sleep(wait)
+
+
+class MultipartFileBody:
+    """multipart/form-data body that streams one file from disk.
+
+    requests sends it with the Content-Length from __len__ and pulls the data through read(),
+    so every chunk passes through the token bucket and the progress callback. Setting stop_event
+    while the bucket holds a chunk back raises UploadCancelled out of the request.
+    progress_callback(bytes_sent, total_bytes, elapsed_seconds) is called at most every
+    PROGRESS_INTERVAL seconds and once when the body has been sent completely.
+    """
+
+    def __init__(self, file_path, filename, fields, mime_type, bucket=None, progress_callback=None, stop_event=None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        safe_filename = filename.replace('"', '%22')
+
+        preamble = b''
+        for name, value in fields.items():
+            preamble += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                         f'{value}\r\n').encode('utf-8')
+        preamble += (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{safe_filename}"\r\n'
+                     f'Content-Type: {mime_type}\r\n\r\n').encode('utf-8')
+        self.preamble = preamble
+        self.epilogue = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+        self.file = open(file_path, 'rb')
+        self.length = len(self.preamble) + os.path.getsize(file_path) + len(self.epilogue)
+        self.bucket = bucket
+        self.progress_callback = progress_callback
+        self.stop_event = stop_event
+        self.position = 0
+        self.started_at = None
+        self.last_report = 0.0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = CHUNK_SIZE
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        chunk = b''
+        preamble_end = len(self.preamble)
+        file_end = self.length - len(self.epilogue)
+        if self.position < preamble_end:
+            chunk = self.preamble[self.position:self.position + size]
+        elif self.position < file_end:
+            chunk = self.file.read(min(size, file_end - self.position))
+            if not chunk:
+                raise IOError(f"{self.file.name} got shorter while it was being uploaded")
+        else:
+            offset = self.position - file_end
+            chunk = self.epilogue[offset:offset + size]
+        if not chunk:
+            return b''
+
+        if self.bucket is not None:
+            self.bucket.consume(len(chunk), self.stop_event)
+        self.position += len(chunk)
+        self._report_progress()
+        return chunk
+
+    def _report_progress(self):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        if self.position < self.length and now - self.last_report < PROGRESS_INTERVAL:
+            return
+        self.last_report = now
+        try:
+            self.progress_callback(self.position, self.length, now - self.started_at)
+        except Exception as e:
+            print(f"Error reporting upload progress: {e}")
+
+    def close(self):
+        self.file.close()
+
+
+# Shared by every uploader so all jobs respect the same limits
+GLOBAL_RATE_LIMITER = RateLimiter()
+GLOBAL_UPLOAD_BUCKET = TokenBucket()
+
+
+def set_upload_limit(rate_kbps):
+    """Cap the combined upload bandwidth of all uploads in KB/s (0 = unlimited)"""
+    GLOBAL_UPLOAD_BUCKET.set_rate(rate_kbps)
+
+
+class DiscordUploader:
+    """Sends webhook requests over a pooled session, retrying transient failures"""
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, rate_limiter=None, session=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter or GLOBAL_RATE_LIMITER
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+    def close(self):
+        self.session.close()
+
+    def backoff_delay(self, retry):
+        """Exponential backoff with jitter: half the delay is fixed, the other half random"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** retry))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def post(self, url, build_request, stop_event=None):
+        """POST to url, retrying transient failures.
+
+        build_request() returns the keyword arguments for session.post (data, files, json, ...).
+        It is called again for every attempt, so file objects are reopened each time.
+        Returns the successful response, or raises UploadError. Raises UploadCancelled if
+        stop_event is set while waiting for a retry, a rate limit or the upload bandwidth limit.
+        """
+        last_error = None
+        backoff = False
+        for attempt in range(self.max_retries + 1):
+            if backoff:
+                delay = self.backoff_delay(attempt - 1)
+                print(f"Retrying webhook request in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries + 1})")
+                if stop_event is not None:
+                    if stop_event.wait(delay):
+                        raise UploadCancelled("Upload cancelled due to stop request")
+                else:
+                    time.sleep(delay)
+            backoff = True
+
+            if not self.rate_limiter.wait(url, stop_event):
+                raise UploadCancelled("Upload cancelled due to stop request")
+
+            request_kwargs = build_request()
+            try:
+                response = self.session.post(url, timeout=self.timeout, **request_kwargs)
+            except requests.ReadTimeout as e:
+                # The request was sent and Discord has probably created the message already, and a
+                # webhook POST isn't idempotent - retrying would post the clip a second time
+                raise UploadError(f"No response from webhook within {self.timeout[1]}s, not retrying: {e}")
+            except requests.ConnectionError as e:
+                # Includes ConnectTimeout: nothing reached Discord, so the request is safe to repeat
+                last_error = UploadError(f"Connection to webhook failed: {e}")
+                print(f"Webhook request failed: {e}")
+                continue
+            finally:
+                if hasattr(request_kwargs.get('data'), 'close'):
+                    request_kwargs['data'].close()
+                for file_tuple in (request_kwargs.get('files') or {}).values():
+                    if hasattr(file_tuple[1], 'close'):
+                        file_tuple[1].close()
+
+            self.rate_limiter.update(url, response)
+            if response.status_code < 300:
+                return response
+            if response.status_code == 429:
+                # The rate limiter already knows how long to wait, so skip the backoff delay
+                print(f"Discord rate limited the webhook, waiting {self.rate_limiter.delay(url):.1f}s")
+                last_error = UploadError("Rate limited by Discord", response)
+                backoff = False
+                continue
+            if response.status_code >= 500:
+                print(f"Webhook returned HTTP {response.status_code}, will retry")
+                last_error = UploadError(f"HTTP {response.status_code}", response)
+                continue
+            # Other client errors (bad URL, file too large, ...) won't succeed on retry
+            raise UploadError(f"HTTP {response.status_code}: {response.text}", response)
+
+        raise last_error
+
+    def send_file(self, url, file_path, filename, content, mime_type='video/mp4', stop_event=None,
+                  progress_callback=None):
+        """Upload one file with a message to a webhook, streamed through the upload bandwidth limit.
+
+        progress_callback is passed on to MultipartFileBody. Returns the response or raises UploadError.
+        """
+        def build_request():
+            body = MultipartFileBody(file_path, filename, {'content': content}, mime_type,
+                                     GLOBAL_UPLOAD_BUCKET, progress_callback, stop_event)
+            return {'data': body, 'headers': {'Content-Type': body.content_type}}
+        return self.post(url, build_request, stop_event)
+
+    def send_message(self, url, content, stop_event=None):
+        """Post a text-only message to a webhook. Returns the response or raises UploadError."""
+        return self.post(url, lambda: {'json': {'content': content}}, stop_event)
@@ -0,0 +1,227 @@
+"""
+Cancellable execution of FFmpeg commands built with ffmpeg-python.
+
+ffmpeg-python's run() blocks until FFmpeg exits, so a stop request could only take effect between
+encodes. Here every FFmpeg process is registered while it runs, and cancel_all() kills all of them
+at once: the blocked run() calls return straight away with EncodeCancelled, and their callers clean
+up the partial output files as usual.
+
+With a progress_callback FFmpeg is started with -progress pipe:1, and the key=value blocks it
+writes to stdout are parsed on a reader thread into EncodeProgress snapshots (about two a second).
+A callback that returns True stops its encode, which then raises EncodeStoppedEarly.
+"""
+import time
+import subprocess
+import threading
+from collections import namedtuple
+
+import ffmpeg
+
+
+class EncodeCancelled(Exception):
+    """An FFmpeg process was killed by cancel_all() or kill()"""
+
+
+class EncodeStoppedEarly(Exception):
+    """An FFmpeg process was stopped because its progress callback returned True"""
+
+    def __init__(self, progress):
+        super().__init__("FFmpeg was stopped by its progress callback")
+        self.progress = progress  # The EncodeProgress the callback stopped on
+
+
+_lock = threading.Lock()
+_processes = set()  # FFmpeg processes that are running right now
+_stopping = False  # Set by cancel_all() so processes started afterwards are killed straight away
+
+
+class EncodeProgress(namedtuple('EncodeProgress', ['out_seconds', 'duration', 'fps', 'speed', 'total_bytes',
+                                                   'elapsed', 'finished'])):
+    """One -progress report. duration is the length of the encoded section, if the caller knew it."""
+
+    @property
+    def fraction(self):
+        if self.finished:
+            return 1.0
+        if not self.duration or self.out_seconds is None:
+            return None
+        return max(0.0, min(1.0, self.out_seconds / self.duration))
+
+    @property
+    def eta_seconds(self):
+        """Seconds until the encode finishes at the pace so far"""
+        fraction = self.fraction
+        if not fraction:
+            return None
+        return self.elapsed * (1 - fraction) / fraction
+
+    @property
+    def projected_bytes(self):
+        """Output size at the end of the encode, extrapolated from the bytes written so far"""
+        fraction = self.fraction
+        if not fraction or not self.total_bytes:
+            return None
+        return self.total_bytes / fraction
+
+
+def _number(value, suffix=''):
+    try:
+        return float(value.strip().rstrip(suffix))
+    except (AttributeError, ValueError):
+        return None  # 'N/A' before the first frame
+
+
+def _out_seconds(report):
+    for key in ('out_time_us', 'out_time_ms'):  # Both are in microseconds
+        value = _number(report.get(key))
+        if value is not None:
+            return value / 1000000
+    return None
+
+
+def _read_progress(process, duration, progress_callback, started):
+    """Parse -progress blocks from the process stdout until it closes"""
+    report = {}
+    for raw_line in process.stdout:
+        key, _, value = raw_line.decode('utf-8', errors='replace').strip().partition('=')
+        if key != 'progress':
+            report[key] = value
+            continue
+        progress = EncodeProgress(
+            out_seconds=_out_seconds(report),
+            duration=duration,
+            fps=_number(report.get('fps')),
+            speed=_number(report.get('speed'), 'x'),
+            total_bytes=_number(report.get('total_size')),
+            elapsed=time.monotonic() - started,
+            finished=value == 'end'
+        )
+        report = {}
+        try:
+            stop = progress_callback(progress)
+        except Exception as e:
+            print(f"Error in FFmpeg progress callback: {e}")
+            continue
+        if stop and not progress.finished:
+            _stop_early(process, progress)
+
+
+def _stop_early(process, progress):
+    with _lock:
+        if process.stopped_early is not None:
+            return
+        process.stopped_early = progress
+        try:
+            process.kill()
+        except OSError:
+            pass  # Already exited
+
+
+def start(stream_spec, overwrite_output=True, progress_callback=None, duration=None, **popen_options):
+    """Start FFmpeg for an ffmpeg-python stream and register the process for cancellation.
+
+    With progress_callback, it is called with an EncodeProgress for every report FFmpeg writes and
+    may return True to stop the encode; duration (seconds of media the command outputs) enables the
+    fraction, ETA and size projection.
+    """
+    args = ffmpeg.compile(stream_spec, overwrite_output=overwrite_output)
+    if progress_callback is not None:
+        args = args[:1] + ['-progress', 'pipe:1', '-nostats'] + args[1:]
+        popen_options['stdout'] = subprocess.PIPE
+    with _lock:
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, **popen_options)
+        process.cancelled = False
+        process.progress_thread = None
+        process.stopped_early = None  # EncodeProgress the progress callback stopped the encode on
+        _processes.add(process)
+        if _stopping:
+            _kill(process)
+    if progress_callback is not None:
+        process.progress_thread = threading.Thread(
+            target=_read_progress, args=(process, duration, progress_callback, time.monotonic()), daemon=True
+        )
+        process.progress_thread.start()
+    return process
+
+
+def wait(process):
+    """Wait for a process from start() to exit and unregister it. Returns (stdout, stderr)."""
+    try:
+        if process.progress_thread is not None:
+            # The reader thread owns stdout
+            err = process.stderr.read() if process.stderr else None
+            process.wait()
+            process.progress_thread.join()
+            return None, err
+        return process.communicate()
+    finally:
+        with _lock:
+            _processes.discard(process)
+
+
+def run(stream_spec, overwrite_output=True, capture_stdout=False, capture_stderr=False, progress_callback=None,
+        duration=None):
+    """Run FFmpeg like ffmpeg-python's run(), but cancellable and optionally reporting progress.
+
+    capture_stdout can't be combined with progress_callback, which reads stdout itself. Raises
+    EncodeCancelled if the process was killed, EncodeStoppedEarly if the progress callback stopped
+    it, or ffmpeg.Error if FFmpeg failed.
+    """
+    process = start(
+        stream_spec,
+        overwrite_output=overwrite_output,
+        progress_callback=progress_callback,
+        duration=duration,
+        stdout=subprocess.PIPE if capture_stdout else None,
+        stderr=subprocess.PIPE if capture_stderr else None
+    )
+    out, err = wait(process)
+    check(process, out, err)
+    return out, err
+
+
+def check(process, out=None, err=None):
+    """Raise for a finished process that was cancelled or failed"""
+    if process.cancelled:
+        raise EncodeCancelled("FFmpeg was stopped")
+    if process.returncode != 0:
+        if process.stopped_early is not None:
+            raise EncodeStoppedEarly(process.stopped_early)
+        raise ffmpeg.Error('ffmpeg', out, err)
+
+
+def _kill(process):
+    process.cancelled = True
+    try:
+        process.kill()
+    except OSError:
+        pass  # Already exited
+
+
+def kill(process):
+    """Kill one process from start(); its run()/check() raises EncodeCancelled"""
+    with _lock:
+        _kill(process)
+
+
+def cancel_all():
+    """Kill every running FFmpeg process and any started until reset(). Returns how many were killed."""
+    global _stopping
+    with _lock:
+        _stopping = True
+        running = list(_processes)
+        for process in running:
+            _kill(process)
+    return len(running)
+
+
+def reset():
+    """Allow FFmpeg processes to run again after cancel_all()"""
+    global _stopping
+    with _lock:
+        _stopping = False
+
+
+def running_count():
+    with _lock:
+        return len(_processes)
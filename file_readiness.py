@@ -0,0 +1,133 @@
+"""
+Detects when a new recording has finished being written.
+
+Recorders create the file as soon as they start writing it, so a create event does not mean the
+clip is complete. The checker polls every pending file on its own thread and reports it as ready
+once its size and modification time have not changed for stable_seconds and no other process
+holds it open. Passive readers (thumbnailers, antivirus, the search indexer) can keep a finished
+file open too, so a file that has not changed for timeout_seconds is reported as ready even if it
+is still open - FFmpeg only needs to read it.
+"""
+import os
+import time
+import threading
+import os.path as path
+
+# Seconds between checks of the pending files
+READY_POLL_INTERVAL = 0.5
+
+
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+
+    _GENERIC_READ = 0x80000000
+    _OPEN_EXISTING = 3
+    _FILE_ATTRIBUTE_NORMAL = 0x80
+    _INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.CreateFileW.restype = wintypes.HANDLE
+    _kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                      wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+    _kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+
+def can_open_exclusively(filepath):
+    """True if no other process has the file open, i.e. the recorder has released it.
+
+    On Windows the file is opened read-only with no sharing allowed, which fails with a sharing
+    violation while any other handle is open (read-only recordings work too). Other platforms have
+    no share modes, so this is always True there and the size/mtime check does all the work.
+    """
+    if os.name != 'nt':
+        return True
+    handle = _kernel32.CreateFileW(filepath, _GENERIC_READ, 0, None, _OPEN_EXISTING, _FILE_ATTRIBUTE_NORMAL, None)
+    if handle == _INVALID_HANDLE_VALUE:
+        return False
+    _kernel32.CloseHandle(handle)
+    return True
+
+
+class ReadinessChecker:
+    """Calls on_ready(filepath) once each watched file has stopped changing"""
+
+    def __init__(self, on_ready, stop_event, stable_seconds=2.0, timeout_seconds=120.0,
+                 poll_interval=READY_POLL_INTERVAL):
+        self.on_ready = on_ready
+        self.stop_event = stop_event
+        self.stable_seconds = stable_seconds
+        self.timeout_seconds = timeout_seconds
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.pending = {}  # normalized path -> {'path', 'size', 'mtime', 'changed_at'}
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name="ReadinessChecker")
+        self.thread.start()
+
+    def watch(self, filepath):
+        """Start (or restart) waiting for filepath to finish being written"""
+        with self.lock:
+            self.pending[path.normpath(filepath)] = {
+                'path': filepath, 'size': None, 'mtime': None, 'changed_at': time.time()
+            }
+
+    def touch(self, filepath):
+        """Note that a pending file changed. Files that aren't pending are ignored."""
+        with self.lock:
+            entry = self.pending.get(path.normpath(filepath))
+            if entry is not None:
+                entry['changed_at'] = time.time()
+
+    def forget(self, filepath):
+        """Stop waiting for filepath. Returns True if it was pending."""
+        with self.lock:
+            return self.pending.pop(path.normpath(filepath), None) is not None
+
+    def is_pending(self, filepath):
+        with self.lock:
+            return path.normpath(filepath) in self.pending
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            for filepath in self._poll():
+                try:
+                    self.on_ready(filepath)
+                except Exception as e:
+                    print(f"Error handling finished recording {filepath}: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+    def _poll(self):
+        """Check every pending file once, returning the ones that are ready"""
+        now = time.time()
+        ready = []
+        with self.lock:
+            for key, entry in list(self.pending.items()):
+                try:
+                    stat = os.stat(entry['path'])
+                except OSError:
+                    # Deleted or renamed away before it finished - a move event follows a rename
+                    del self.pending[key]
+                    continue
+
+                if stat.st_size != entry['size'] or stat.st_mtime != entry['mtime']:
+                    entry['size'] = stat.st_size
+                    entry['mtime'] = stat.st_mtime
+                    entry['changed_at'] = now
+                    continue
+
+                quiet_seconds = now - entry['changed_at']
+                if stat.st_size == 0 or quiet_seconds < self.stable_seconds:
+                    continue
+
+                if can_open_exclusively(entry['path']):
+                    del self.pending[key]
+                    ready.append(entry['path'])
+                elif quiet_seconds > self.timeout_seconds:
+                    print(f"{entry['path']} is still open in another process but hasn't changed for "
+                          f"{quiet_seconds:.0f}s, treating it as finished")
+                    del self.pending[key]
+                    ready.append(entry['path'])
+        return ready
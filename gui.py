@@ -1,12 +1,14 @@
 import sys
 import os
 import json
+import re
 import threading
 import importlib.util
 from datetime import datetime
 
 # Import our config helper for proper path handling
 import config_helper
+from video_codecs import VIDEO_CODECS
 
 # Get proper application and config paths
 APP_DIR = config_helper.get_application_path()
@@ -26,7 +28,7 @@ if getattr(sys, 'frozen', False):
         print(f"Added ffmpeg directory to PATH: {ffmpeg_dir}")
 
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTabWidget, QSpinBox, QDoubleSpinBox, QComboBox, QTextEdit, QFileDialog, QMessageBox, QSplitter
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTabWidget, QSpinBox, QDoubleSpinBox, QComboBox, QCheckBox, QTextEdit, QPlainTextEdit, QFileDialog, QMessageBox, QSplitter, QProgressBar
 )
 from PyQt5.QtCore import Qt, QProcess, pyqtSignal, QObject, QProcessEnvironment, QSize
 from PyQt5.QtGui import QFont, QPalette, QColor, QTextCursor, QIcon, QPixmap
@@ -53,17 +55,34 @@ DEFAULT_CONFIG = {
     'CRF_MAX': 30,
     'CRF_STEP': 1,
     'EXTRACT_PRESET': "fast",
+    'EXTRACT_MODE': "Stream Copy",
     'COMPRESSION_PRESET': "medium",
+    'VIDEO_CODEC': "libx264",  # Encoder for the final clip: libx264, libx265, libsvtav1 or libvpx-vp9
     'COMPRESSION_METHOD': "Quick",
     'QUICK_CRF': 40,
+    'QUICK_DIRECT_ENCODE': True,
     'CLIP_DURATION': 15,
     'HIGH_QUALITY_CRF': 18,
-    'CLOSE_THRESHOLD': 0.9,
-    'MEDIUM_THRESHOLD': 0.75,
-    'FAR_THRESHOLD': 0.5,
     'WEBHOOK_URL': "",
+    'WEBHOOK_URLS': [],  # Send every clip to all of these webhooks (WEBHOOK_URL is used when empty)
     'CPU_THREADS': 0,  # 0 means auto/all threads, otherwise limits threads used by FFmpeg
-    'USER_NAME': ""    # User's name to display in Discord messages
+    'MAX_CONCURRENT_JOBS': 1,  # Number of clips processed at the same time, sharing the CPU threads
+    'READY_STABLE_SECONDS': 2.0,  # A recording is complete once its size and mtime stop changing for this long
+    'READY_TIMEOUT_SECONDS': 120,  # Process a recording that stays open this long without changing anyway
+    'USER_NAME': "",   # User's name to display in Discord messages
+    'UPLOAD_LIMIT_KBPS': 0,  # Upload bandwidth cap in KB/s shared by all uploads, 0 = unlimited
+    'RESHARE_CACHE': True,  # Post the link of an earlier upload instead of uploading the same clip again
+    'RESHARE_CACHE_MAX_AGE_HOURS': 20,  # Discord attachment links expire, so cached links are only reused this long
+    'AUDIO_BITRATE_KBPS': 128,  # AAC bitrate of compressed clips, reserved inside the size target
+    'AUDIO_CHANNELS': 0,  # 0 keeps the recording's channels, 1 = mono, 2 = stereo downmix
+    'CRF_PREDICTOR': True,  # Learn which CRF hits the target size per game and start Progressive there
+    'PARALLEL_CRF_TRIALS': 1,  # Number of Progressive CRF trials to encode at once (1 = one after another)
+    'SPLIT_CRF_TRIALS': False,  # Encode the parallel CRF trials in one FFmpeg process that decodes the clip once
+    'RESOLUTION_LADDER': True,  # Lower the resolution/frame rate when the size budget is too small for the source
+    'LADDER_MIN_BPP': 0.06,  # Fewest x264 bits per pixel the ladder accepts before stepping down a rung
+    'EARLY_ABORT_MARGIN': 0.25,  # Stop a Progressive trial projected this far outside the size range, 0 = off
+    'SAMPLE_ESTIMATION': True,  # Estimate the full-clip size from short samples before the first real encode
+    'METRICS_PORT': 0  # Serve stage timings on http://127.0.0.1:<port>/metrics, 0 = off
 }
 
 # Load configuration using config_helper
@@ -90,6 +109,11 @@ if not CONFIG:
     CONFIG = DEFAULT_VALUES.copy()
     config_helper.save_json_config(CONFIG, CONFIG_FILE)
 
+def configured_webhooks(config):
+    """Webhook URLs from WEBHOOK_URLS, or the single WEBHOOK_URL when that's empty"""
+    urls = config.get('WEBHOOK_URLS') or [config.get('WEBHOOK_URL', '')]
+    return [url.strip() for url in urls if url.strip()]
+
 def remove_last_line(text_edit):
     text = text_edit.toPlainText()
 
@@ -112,9 +136,13 @@ class NoWheelComboBox(QComboBox):
     def wheelEvent(self, event):
         event.ignore()
 
+# Progress lines printed by the clip processor, shown in a progress bar instead of the terminal
+PROGRESS_LINE = re.compile(r"^(Encode|Upload) progress: (\d+)% (.*)$")
+
 # Stream to redirect stdout/stderr to our QTextEdit
 class QTextEditLogger(QObject):
     log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(str, int, str)  # stage, percent, details
 
     def __init__(self, text_edit):
         super().__init__()
@@ -138,7 +166,10 @@ class QTextEditLogger(QObject):
                 
                 # Process complete lines (all except the last one)
                 for line in lines[:-1]:
-                    if line.strip():  # Skip empty lines
+                    progress = PROGRESS_LINE.match(line.strip())
+                    if progress:
+                        self.progress_signal.emit(progress.group(1), int(progress.group(2)), progress.group(3))
+                    elif line.strip():  # Skip empty lines
                         self.log_signal.emit(f"{timestamp}{line}\n")
             
             # If we have a complete message with no newline, emit it with timestamp
@@ -303,8 +334,22 @@ class AutoClipSenderGUI(QMainWindow):
         self.terminal_output.setStyleSheet("background-color: #232629; color: #ffffff;")
         terminal_layout.addWidget(self.terminal_output)
         
+        # Encode and upload progress, fed by the "Encode progress:"/"Upload progress:" lines instead of printing them
+        self.progress_rows = {}
+        for stage in ("Encode", "Upload"):
+            progress_layout = QHBoxLayout()
+            progress_label = QLabel(f"{stage}: idle")
+            progress_bar = QProgressBar()
+            progress_bar.setRange(0, 100)
+            progress_bar.setValue(0)
+            progress_layout.addWidget(progress_label, 1)
+            progress_layout.addWidget(progress_bar, 1)
+            terminal_layout.addLayout(progress_layout)
+            self.progress_rows[stage] = (progress_label, progress_bar)
+        
         # Redirect stdout and stderr to our terminal output
         self.logger = QTextEditLogger(self.terminal_output)
+        self.logger.progress_signal.connect(self.update_progress)
         sys.stdout = self.logger
         sys.stderr = self.logger
         
@@ -321,14 +366,19 @@ class AutoClipSenderGUI(QMainWindow):
         # Set the central widget
         self.setCentralWidget(main_widget)
         
-        # Load webhook URL from config
+        # Load webhook URLs from config
         if hasattr(self, 'webhook_url'):
-            self.webhook_url.setText(CONFIG.get('WEBHOOK_URL', ''))
+            self.webhook_url.setPlainText("\n".join(configured_webhooks(CONFIG)))
         
         # Log startup
         print(f"Auto Clip Sender GUI initialized at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("Ready to start monitoring. Configure your settings and click 'Start Monitoring'.")
     
+    def update_progress(self, stage, percent, details):
+        progress_label, progress_bar = self.progress_rows[stage]
+        progress_bar.setValue(percent)
+        progress_label.setText(f"{stage}: {details}" if percent < 100 else f"{stage} complete: {details}")
+    
     def setup_dark_palette(self):
         # Set up the dark mode palette
         palette = QPalette()
@@ -427,6 +477,8 @@ class AutoClipSenderGUI(QMainWindow):
             button.clicked.connect(lambda: self.reset_control(control, DEFAULT_VALUES[setting_name], setting_name))
         elif isinstance(control, QComboBox):
             button.clicked.connect(lambda: self.reset_control(control, DEFAULT_VALUES[setting_name], setting_name))
+        elif isinstance(control, QCheckBox):
+            button.clicked.connect(lambda: self.reset_control(control, DEFAULT_VALUES[setting_name], setting_name))
             
         return button
     
@@ -438,6 +490,8 @@ class AutoClipSenderGUI(QMainWindow):
             control.setValue(default_value)
         elif isinstance(control, QComboBox):
             control.setCurrentText(default_value)
+        elif isinstance(control, QCheckBox):
+            control.setChecked(bool(default_value))
         
         print(f"Reset {setting_name} to default value: {default_value}")
         # Update tooltip in case DEFAULT_VALUES changes
@@ -493,11 +547,31 @@ class AutoClipSenderGUI(QMainWindow):
         output_browse = QPushButton("Browse...")
         output_browse.clicked.connect(lambda: self.browse_folder(self.output_folder))
         
+        # How long a new recording has to stay unchanged before it's processed
+        self.ready_stable_seconds = NoWheelDoubleSpinBox()
+        self.ready_stable_seconds.setRange(0.5, 60)
+        self.ready_stable_seconds.setSingleStep(0.5)
+        self.ready_stable_seconds.setValue(float(self.get_config_value('READY_STABLE_SECONDS')))
+        
+        self.ready_timeout_seconds = NoWheelSpinBox()
+        self.ready_timeout_seconds.setRange(10, 3600)
+        self.ready_timeout_seconds.setValue(int(self.get_config_value('READY_TIMEOUT_SECONDS')))
+        
+        ready_help = QLabel("A new recording is processed once its size stops changing for the settle time and the recorder has released it. Recordings that stop changing but stay open in another program (e.g. a virus scanner) are processed once the timeout passes.")
+        ready_help.setWordWrap(True)
+        
         # Add folder settings to layout
         folders_layout.addWidget(QLabel("Shadowplay Recordings Folder:"))
         folders_layout.addWidget(self.create_browse_row(self.shadowplay_folder, shadowplay_browse, 'SHADOWPLAY_FOLDER'))
         folders_layout.addWidget(QLabel("Output Folder for Processed Clips:"))
         folders_layout.addWidget(self.create_browse_row(self.output_folder, output_browse, 'OUTPUT_FOLDER'))
+        folders_layout.addSpacing(20)
+        
+        folders_layout.addWidget(QLabel("Recording Settle Time (seconds):"))
+        folders_layout.addWidget(self.create_setting_row("Settle Time (seconds):", self.ready_stable_seconds, 'READY_STABLE_SECONDS')[1])
+        folders_layout.addWidget(QLabel("Locked Recording Timeout (seconds):"))
+        folders_layout.addWidget(self.create_setting_row("Timeout (seconds):", self.ready_timeout_seconds, 'READY_TIMEOUT_SECONDS')[1])
+        folders_layout.addWidget(ready_help)
         folders_layout.addStretch()
 
         # SIZE LIMITS TAB
@@ -540,7 +614,7 @@ class AutoClipSenderGUI(QMainWindow):
         
         # Compression method selector
         self.compression_method = NoWheelComboBox()
-        self.compression_method.addItems(["Progressive", "Quick"])
+        self.compression_method.addItems(["Progressive", "Quick", "Two-Pass"])
         self.compression_method.setCurrentText(self.get_config_value('COMPRESSION_METHOD'))
         
         # Quick CRF value setting
@@ -554,7 +628,7 @@ class AutoClipSenderGUI(QMainWindow):
         
         # Compression method selector
         self.compression_method = NoWheelComboBox()
-        self.compression_method.addItems(["Progressive", "Quick"])
+        self.compression_method.addItems(["Progressive", "Quick", "Two-Pass"])
         self.compression_method.setCurrentText(self.get_config_value('COMPRESSION_METHOD'))
         
         # Quick CRF value setting
@@ -562,12 +636,28 @@ class AutoClipSenderGUI(QMainWindow):
         self.quick_crf.setRange(1, 51)
         self.quick_crf.setValue(int(self.get_config_value('QUICK_CRF')))
         
-        compression_method_help = QLabel("• Quick: Single pass compression that produces smaller files quickly\n• Progressive: Multiple passes to find optimal quality-to-size ratio (slower but higher quality)")
+        # Audio budget inside the target size
+        self.audio_bitrate = NoWheelSpinBox()
+        self.audio_bitrate.setRange(32, 320)
+        self.audio_bitrate.setSingleStep(16)
+        self.audio_bitrate.setValue(int(self.get_config_value('AUDIO_BITRATE_KBPS')))
+        self.audio_channels = NoWheelSpinBox()
+        self.audio_channels.setRange(0, 2)
+        self.audio_channels.setValue(int(self.get_config_value('AUDIO_CHANNELS')))
+        
+        compression_method_help = QLabel("• Quick: Single pass compression that produces smaller files quickly\n• Progressive: Multiple passes to find optimal quality-to-size ratio (slower but higher quality)\n• Two-Pass: Calculates the bitrate that fills the target size and encodes once in two passes (predictable size and time)")
         compression_method_help.setWordWrap(True)
         
+        # Single FFmpeg run for Quick compression
+        self.quick_direct_encode = QCheckBox("Trim and compress in a single FFmpeg run")
+        self.quick_direct_encode.setChecked(bool(self.get_config_value('QUICK_DIRECT_ENCODE')))
+        
         quick_crf_help = QLabel("CRF value for Quick compression (1-51). Lower values = better quality but larger files. Higher values = worse quality but smaller files. Values above 35 may show noticeable quality loss.")
         quick_crf_help.setWordWrap(True)
         
+        audio_bitrate_help = QLabel("Audio bitrate (kbps) and channels (0 = same as the recording, 1 = mono, 2 = stereo) of compressed clips. Progressive and Two-Pass encode the audio once and give the rest of the target size to video. Lower values leave more room for video.")
+        audio_bitrate_help.setWordWrap(True)
+        
         # Add settings to clipping tab layout
         clipping_layout.addWidget(QLabel("Clip Duration (seconds):"))
         clipping_layout.addWidget(self.create_setting_row("Clip Duration (seconds):", self.clip_duration, 'CLIP_DURATION')[1])
@@ -582,6 +672,17 @@ class AutoClipSenderGUI(QMainWindow):
         clipping_layout.addWidget(QLabel("Quick Compression CRF:"))
         clipping_layout.addWidget(self.create_setting_row("Quick CRF:", self.quick_crf, 'QUICK_CRF')[1])
         clipping_layout.addWidget(quick_crf_help)
+        clipping_layout.addWidget(self.create_setting_row("Quick Direct Encode:", self.quick_direct_encode, 'QUICK_DIRECT_ENCODE')[1])
+        quick_direct_help = QLabel("Quick compression encodes straight from the recording without an intermediate high-quality file. Roughly halves processing time.")
+        quick_direct_help.setWordWrap(True)
+        clipping_layout.addWidget(quick_direct_help)
+        clipping_layout.addSpacing(10)
+        
+        clipping_layout.addWidget(QLabel("Audio Bitrate (kbps):"))
+        clipping_layout.addWidget(self.create_setting_row("Audio Bitrate (kbps):", self.audio_bitrate, 'AUDIO_BITRATE_KBPS')[1])
+        clipping_layout.addWidget(QLabel("Audio Channels (0=Source):"))
+        clipping_layout.addWidget(self.create_setting_row("Audio Channels:", self.audio_channels, 'AUDIO_CHANNELS')[1])
+        clipping_layout.addWidget(audio_bitrate_help)
         clipping_layout.addStretch()
 
         # COMPRESSION TAB
@@ -602,6 +703,30 @@ class AutoClipSenderGUI(QMainWindow):
         self.high_quality_crf.setRange(0, 51)
         self.high_quality_crf.setValue(int(self.get_config_value('HIGH_QUALITY_CRF')))
         
+        # Learned starting CRF for Progressive compression
+        self.crf_predictor = QCheckBox("Learn the starting CRF from previous clips of the same game")
+        self.crf_predictor.setChecked(bool(self.get_config_value('CRF_PREDICTOR')))
+        
+        # Sampled size estimation for Progressive compression
+        self.sample_estimation = QCheckBox("Estimate the starting CRF from short samples")
+        self.sample_estimation.setChecked(bool(self.get_config_value('SAMPLE_ESTIMATION')))
+        
+        # Resolution/frame rate ladder for Progressive and Two-Pass compression
+        self.resolution_ladder = QCheckBox("Lower the resolution or frame rate when the clip can't fit at full size")
+        self.resolution_ladder.setChecked(bool(self.get_config_value('RESOLUTION_LADDER')))
+        self.ladder_min_bpp = NoWheelDoubleSpinBox()
+        self.ladder_min_bpp.setRange(0.01, 0.3)
+        self.ladder_min_bpp.setDecimals(3)
+        self.ladder_min_bpp.setSingleStep(0.01)
+        self.ladder_min_bpp.setValue(float(self.get_config_value('LADDER_MIN_BPP')))
+        
+        # Stopping Progressive trials that are projected to miss the size range
+        self.early_abort_margin = NoWheelDoubleSpinBox()
+        self.early_abort_margin.setRange(0.0, 1.0)
+        self.early_abort_margin.setDecimals(2)
+        self.early_abort_margin.setSingleStep(0.05)
+        self.early_abort_margin.setValue(float(self.get_config_value('EARLY_ABORT_MARGIN')))
+        
         # Add a help label explaining CRF values
         crf_help = QLabel("CRF (Constant Rate Factor) controls quality. Lower values = higher quality, larger files.")
         crf_help.setWordWrap(True)
@@ -618,6 +743,26 @@ class AutoClipSenderGUI(QMainWindow):
         compression_layout.addWidget(self.create_setting_row("CRF Step Size:", self.crf_step, 'CRF_STEP')[1])
         compression_layout.addWidget(QLabel("High Quality CRF:"))
         compression_layout.addWidget(self.create_setting_row("High Quality CRF:", self.high_quality_crf, 'HIGH_QUALITY_CRF')[1])
+        compression_layout.addSpacing(10)
+        compression_layout.addWidget(self.create_setting_row("CRF Predictor:", self.crf_predictor, 'CRF_PREDICTOR')[1])
+        crf_predictor_help = QLabel("Progressive compression remembers which CRF produced which size for each game and resolution, and starts the next clip at the CRF predicted to hit the target size.")
+        crf_predictor_help.setWordWrap(True)
+        compression_layout.addWidget(crf_predictor_help)
+        compression_layout.addWidget(self.create_setting_row("Sample Estimation:", self.sample_estimation, 'SAMPLE_ESTIMATION')[1])
+        sample_estimation_help = QLabel("Before the first full Progressive attempt, encode three 1-second slices at two CRFs and extrapolate the full clip size to choose the CRF. Skipped when the CRF predictor has already learned from similar clips.")
+        sample_estimation_help.setWordWrap(True)
+        compression_layout.addWidget(sample_estimation_help)
+        compression_layout.addWidget(self.create_setting_row("Resolution Ladder:", self.resolution_ladder, 'RESOLUTION_LADDER')[1])
+        compression_layout.addWidget(QLabel("Minimum Bits per Pixel:"))
+        compression_layout.addWidget(self.create_setting_row("Minimum Bits per Pixel:", self.ladder_min_bpp, 'LADDER_MIN_BPP')[1])
+        ladder_help = QLabel("Progressive and Two-Pass compression work out how many bits per pixel the target size leaves for the recording's resolution and frame rate. Below this value (for x264 - more efficient codecs need less) the clip is encoded at a lower resolution and/or 30fps instead, so it stays sharp rather than smeared.")
+        ladder_help.setWordWrap(True)
+        compression_layout.addWidget(ladder_help)
+        compression_layout.addWidget(QLabel("Early Stop Margin:"))
+        compression_layout.addWidget(self.create_setting_row("Early Stop Margin:", self.early_abort_margin, 'EARLY_ABORT_MARGIN')[1])
+        early_abort_help = QLabel("While a Progressive trial encodes, its final size is projected from the bytes written so far. Once 20% is encoded, a trial projected to end up more than this fraction outside the size range (0.25 = 25%) is stopped and the projection guides the next CRF. 0 = always finish every trial.")
+        early_abort_help.setWordWrap(True)
+        compression_layout.addWidget(early_abort_help)
         compression_layout.addStretch()
 
         # FFMPEG TAB
@@ -627,16 +772,43 @@ class AutoClipSenderGUI(QMainWindow):
                                      "fast", "medium", "slow", "slower", "veryslow"])
         self.extract_preset.setCurrentText(self.get_config_value('EXTRACT_PRESET'))
         
+        # Extraction mode selector
+        self.extract_mode = NoWheelComboBox()
+        self.extract_mode.addItems(["Stream Copy", "Re-encode"])
+        self.extract_mode.setCurrentText(self.get_config_value('EXTRACT_MODE'))
+        
         self.compression_preset = NoWheelComboBox()
         self.compression_preset.addItems(["ultrafast", "superfast", "veryfast", "faster", 
                                          "fast", "medium", "slow", "slower", "veryslow"])
         self.compression_preset.setCurrentText(self.get_config_value('COMPRESSION_PRESET'))
         
+        # Encoder for the final clip
+        self.video_codec = NoWheelComboBox()
+        self.video_codec.addItems(list(VIDEO_CODECS))
+        self.video_codec.setCurrentText(self.get_config_value('VIDEO_CODEC'))
+        
         # Add CPU thread limit setting
         self.cpu_threads = NoWheelSpinBox()
         self.cpu_threads.setRange(0, 64) # 0 means auto/all cores, up to 64 cores
         self.cpu_threads.setValue(int(self.get_config_value('CPU_THREADS')))
         
+        # Number of clips processed at the same time
+        self.max_concurrent_jobs = NoWheelSpinBox()
+        self.max_concurrent_jobs.setRange(1, 8)
+        self.max_concurrent_jobs.setValue(int(self.get_config_value('MAX_CONCURRENT_JOBS')))
+        
+        # Parallel Progressive trials
+        self.parallel_crf_trials = NoWheelSpinBox()
+        self.parallel_crf_trials.setRange(1, 16)
+        self.parallel_crf_trials.setValue(int(self.get_config_value('PARALLEL_CRF_TRIALS')))
+        self.split_crf_trials = QCheckBox("Decode the clip once for all parallel trials")
+        self.split_crf_trials.setChecked(bool(self.get_config_value('SPLIT_CRF_TRIALS')))
+        
+        # Local metrics endpoint
+        self.metrics_port = NoWheelSpinBox()
+        self.metrics_port.setRange(0, 65535)
+        self.metrics_port.setValue(int(self.get_config_value('METRICS_PORT')))
+        
         # Help text for the settings
         preset_help = QLabel("Presets control the speed vs. efficiency tradeoff in FFmpeg:\n• Faster presets (ultrafast, superfast) = quicker encoding but larger files\n• Slower presets (slow, veryslow) = better compression but slower encoding")
         preset_help.setWordWrap(True)
@@ -644,25 +816,82 @@ class AutoClipSenderGUI(QMainWindow):
         cpu_threads_help = QLabel("Limit the number of CPU threads used by FFmpeg:\n• 0 = Automatic (use all available threads)\n• 1-4 = Good for low-end PCs to reduce system slowdown\n• Higher values = Use more CPU power for faster processing\n\nLowering this value will make processing take longer but keep your system more responsive.")
         cpu_threads_help.setWordWrap(True)
         
+        extract_mode_help = QLabel("• Stream Copy: Cut the clip on the nearest keyframe without re-encoding (falls back to re-encoding when the recording can't be copied)\n• Re-encode: Always re-encode the clip at the High Quality CRF before compressing")
+        extract_mode_help.setWordWrap(True)
+        
         # Add FFmpeg settings to layout
+        ffmpeg_layout.addWidget(QLabel("Extraction Mode:"))
+        ffmpeg_layout.addWidget(self.create_setting_row("Extraction Mode:", self.extract_mode, 'EXTRACT_MODE')[1])
+        ffmpeg_layout.addWidget(extract_mode_help)
+        ffmpeg_layout.addSpacing(10)
+        
         ffmpeg_layout.addWidget(QLabel("Extract Preset:"))
         ffmpeg_layout.addWidget(self.create_setting_row("Extract Preset:", self.extract_preset, 'EXTRACT_PRESET')[1])
         ffmpeg_layout.addWidget(QLabel("Compression Preset:"))
         ffmpeg_layout.addWidget(self.create_setting_row("Compression Preset:", self.compression_preset, 'COMPRESSION_PRESET')[1])
         ffmpeg_layout.addWidget(preset_help)
+        ffmpeg_layout.addSpacing(10)
+        
+        ffmpeg_layout.addWidget(QLabel("Video Codec:"))
+        ffmpeg_layout.addWidget(self.create_setting_row("Video Codec:", self.video_codec, 'VIDEO_CODEC')[1])
+        video_codec_help = QLabel("Encoder used for the final clip:\n• libx264: H.264, fastest and plays everywhere\n• libx265: HEVC, better quality per MB but slower\n• libsvtav1: AV1, best quality per MB\n• libvpx-vp9: VP9, good quality per MB but slow\nCRF values keep the x264 0-51 scale and are converted for each codec. Run codec_benchmark.py to compare them on your own clips.")
+        video_codec_help.setWordWrap(True)
+        ffmpeg_layout.addWidget(video_codec_help)
         ffmpeg_layout.addSpacing(20)
         
         ffmpeg_layout.addWidget(QLabel("CPU Threads (0=Auto):"))
         ffmpeg_layout.addWidget(self.create_setting_row("CPU Threads:", self.cpu_threads, 'CPU_THREADS')[1])
         ffmpeg_layout.addWidget(cpu_threads_help)
+        ffmpeg_layout.addSpacing(20)
+        
+        ffmpeg_layout.addWidget(QLabel("Concurrent Clips:"))
+        ffmpeg_layout.addWidget(self.create_setting_row("Concurrent Clips:", self.max_concurrent_jobs, 'MAX_CONCURRENT_JOBS')[1])
+        concurrent_jobs_help = QLabel("Number of clips processed at the same time when several recordings are saved in a burst. The CPU threads are split evenly between them. 1 = one clip at a time.")
+        concurrent_jobs_help.setWordWrap(True)
+        ffmpeg_layout.addWidget(concurrent_jobs_help)
+        ffmpeg_layout.addSpacing(20)
+        
+        ffmpeg_layout.addWidget(QLabel("Parallel CRF Trials (Progressive):"))
+        ffmpeg_layout.addWidget(self.create_setting_row("Parallel CRF Trials:", self.parallel_crf_trials, 'PARALLEL_CRF_TRIALS')[1])
+        parallel_trials_help = QLabel("Number of Progressive compression attempts to encode at the same time. The CPU thread budget is shared between them and the others are cancelled as soon as one lands in the target size range. 1 = one attempt at a time.")
+        parallel_trials_help.setWordWrap(True)
+        ffmpeg_layout.addWidget(parallel_trials_help)
+        ffmpeg_layout.addWidget(self.create_setting_row("Split CRF Trials:", self.split_crf_trials, 'SPLIT_CRF_TRIALS')[1])
+        split_trials_help = QLabel("Encode the parallel trials in a single FFmpeg process that decodes (and scales) the clip once and feeds the same frames to every encoder. Saves the repeated decoding, but the trials always run to the end instead of being cancelled when one lands in range.")
+        split_trials_help.setWordWrap(True)
+        ffmpeg_layout.addWidget(split_trials_help)
+        ffmpeg_layout.addSpacing(20)
+        
+        ffmpeg_layout.addWidget(QLabel("Metrics Port:"))
+        ffmpeg_layout.addWidget(self.create_setting_row("Metrics Port:", self.metrics_port, 'METRICS_PORT')[1])
+        metrics_port_help = QLabel("Publishes how long each stage takes (readiness wait, probe, extraction, compression attempts, file moves, uploads) along with queue depth, jobs in flight and bytes uploaded on http://127.0.0.1:<port>/metrics for Prometheus, and as JSON on /metrics.json. 0 = off.")
+        metrics_port_help.setWordWrap(True)
+        ffmpeg_layout.addWidget(metrics_port_help)
         ffmpeg_layout.addStretch()
 
         # DISCORD TAB
         # Create Discord credential settings
-        self.webhook_url = QLineEdit()
-        # Load the webhook URL from CONFIG
-        self.webhook_url.setText(self.get_config_value('WEBHOOK_URL'))
-        print(f"Loaded webhook URL from config: {'[SET]' if self.webhook_url.text() else '[NOT SET]'}")
+        # One webhook URL per line - every clip is sent to all of them
+        self.webhook_url = QPlainTextEdit()
+        self.webhook_url.setPlaceholderText("https://discord.com/api/webhooks/...")
+        self.webhook_url.setFixedHeight(80)
+        # Load the webhook URLs from CONFIG
+        self.webhook_url.setPlainText("\n".join(configured_webhooks(CONFIG)))
+        webhook_count = len(self.webhook_urls())
+        print(f"Loaded webhook URL from config: {f'[SET] ({webhook_count} webhooks)' if webhook_count > 1 else '[SET]' if webhook_count else '[NOT SET]'}")
+        
+        # Upload bandwidth cap
+        self.upload_limit = NoWheelSpinBox()
+        self.upload_limit.setRange(0, 100000)
+        self.upload_limit.setSingleStep(100)
+        self.upload_limit.setValue(int(self.get_config_value('UPLOAD_LIMIT_KBPS')))
+        
+        # Re-share cache
+        self.reshare_cache = QCheckBox("Post a link instead of uploading a clip that was already uploaded")
+        self.reshare_cache.setChecked(bool(self.get_config_value('RESHARE_CACHE')))
+        self.reshare_cache_max_age = NoWheelSpinBox()
+        self.reshare_cache_max_age.setRange(1, 23)
+        self.reshare_cache_max_age.setValue(int(self.get_config_value('RESHARE_CACHE_MAX_AGE_HOURS')))
         
         # Add user name setting
         self.user_name = QLineEdit()
@@ -685,14 +914,14 @@ class AutoClipSenderGUI(QMainWindow):
         user_name_widget = QWidget()
         user_name_widget.setLayout(user_name_layout)
         
-        discord_layout.addWidget(QLabel("Discord Webhook URL:"))
+        discord_layout.addWidget(QLabel("Discord Webhook URLs (one per line):"))
         discord_layout.addWidget(webhook_widget)
         
         discord_layout.addWidget(QLabel("Your Name (for Discord messages):"))
         discord_layout.addWidget(user_name_widget)
         
         # Add a note about webhook usage
-        webhook_note = QLabel("Create a webhook in your Discord server settings and paste the URL here.\nThe URL should look like: https://discord.com/api/webhooks/...")
+        webhook_note = QLabel("Create a webhook in your Discord server settings and paste the URL here.\nThe URL should look like: https://discord.com/api/webhooks/...\nAdd one URL per line to send every clip to several servers or channels - clips are still only encoded once.")
         webhook_note.setWordWrap(True)
         discord_layout.addWidget(webhook_note)
         
@@ -700,6 +929,21 @@ class AutoClipSenderGUI(QMainWindow):
         user_name_note = QLabel("Your name will be shown in Discord messages when clips are sent.\nLeave blank to use the default message format.")
         user_name_note.setWordWrap(True)
         discord_layout.addWidget(user_name_note)
+        discord_layout.addSpacing(10)
+        
+        discord_layout.addWidget(QLabel("Upload Limit (KB/s, 0=Unlimited):"))
+        discord_layout.addWidget(self.create_setting_row("Upload Limit (KB/s):", self.upload_limit, 'UPLOAD_LIMIT_KBPS')[1])
+        upload_limit_note = QLabel("Caps the upload bandwidth used to send clips, so uploads don't cause lag in a game that is still running. Lower values make uploads take longer.")
+        upload_limit_note.setWordWrap(True)
+        discord_layout.addWidget(upload_limit_note)
+        discord_layout.addSpacing(10)
+        
+        discord_layout.addWidget(self.create_setting_row("Re-share Cache:", self.reshare_cache, 'RESHARE_CACHE')[1])
+        discord_layout.addWidget(QLabel("Reuse Links For (hours):"))
+        discord_layout.addWidget(self.create_setting_row("Reuse Links For (hours):", self.reshare_cache_max_age, 'RESHARE_CACHE_MAX_AGE_HOURS')[1])
+        reshare_note = QLabel("When a clip is sent again with Send Clip Again, or resumed after a restart, the Discord link of its earlier upload is posted instead of uploading the file again. New clips are always uploaded. Discord links expire after about a day, so older links are not reused.")
+        reshare_note.setWordWrap(True)
+        discord_layout.addWidget(reshare_note)
         
         # Add a spacer to push everything to the top
         discord_layout.addStretch()
@@ -709,6 +953,11 @@ class AutoClipSenderGUI(QMainWindow):
         test_webhook_button.clicked.connect(self.test_webhook)
         discord_layout.addWidget(test_webhook_button)
         
+        # Add a "Send Clip Again" button for sharing a finished clip with the webhooks again
+        resend_button = QPushButton("Send Clip Again...")
+        resend_button.clicked.connect(self.resend_clip)
+        discord_layout.addWidget(resend_button)
+        
         return self.tabs
     
     def create_browse_row(self, line_edit, button, setting_name):
@@ -744,7 +993,7 @@ class AutoClipSenderGUI(QMainWindow):
             return
         
         # Save current webhook URL and user name before restoring defaults
-        current_webhook_url = self.webhook_url.text().strip()
+        current_webhook_url = self.webhook_url.toPlainText().strip()
         current_user_name = self.user_name.text().strip()
         
         try:
@@ -757,6 +1006,8 @@ class AutoClipSenderGUI(QMainWindow):
             # Restore folder settings
             self.shadowplay_folder.setText(defaults.get('SHADOWPLAY_FOLDER', DEFAULT_CONFIG['SHADOWPLAY_FOLDER']))
             self.output_folder.setText(defaults.get('OUTPUT_FOLDER', DEFAULT_CONFIG['OUTPUT_FOLDER']))
+            self.ready_stable_seconds.setValue(defaults.get('READY_STABLE_SECONDS', DEFAULT_CONFIG['READY_STABLE_SECONDS']))
+            self.ready_timeout_seconds.setValue(defaults.get('READY_TIMEOUT_SECONDS', DEFAULT_CONFIG['READY_TIMEOUT_SECONDS']))
             
             # Restore size settings
             self.min_size.setValue(defaults.get('MIN_SIZE_MB', DEFAULT_CONFIG['MIN_SIZE_MB']))
@@ -772,13 +1023,31 @@ class AutoClipSenderGUI(QMainWindow):
             self.crf_min.setValue(defaults.get('CRF_MIN', DEFAULT_CONFIG['CRF_MIN']))
             self.crf_max.setValue(defaults.get('CRF_MAX', DEFAULT_CONFIG['CRF_MAX']))
             self.crf_step.setValue(defaults.get('CRF_STEP', DEFAULT_CONFIG['CRF_STEP']))
+            self.crf_predictor.setChecked(defaults.get('CRF_PREDICTOR', DEFAULT_CONFIG['CRF_PREDICTOR']))
+            self.sample_estimation.setChecked(defaults.get('SAMPLE_ESTIMATION', DEFAULT_CONFIG['SAMPLE_ESTIMATION']))
+            self.resolution_ladder.setChecked(defaults.get('RESOLUTION_LADDER', DEFAULT_CONFIG['RESOLUTION_LADDER']))
+            self.ladder_min_bpp.setValue(defaults.get('LADDER_MIN_BPP', DEFAULT_CONFIG['LADDER_MIN_BPP']))
+            self.early_abort_margin.setValue(defaults.get('EARLY_ABORT_MARGIN', DEFAULT_CONFIG['EARLY_ABORT_MARGIN']))
             self.compression_method.setCurrentText(defaults.get('COMPRESSION_METHOD', DEFAULT_CONFIG['COMPRESSION_METHOD']))
             self.quick_crf.setValue(defaults.get('QUICK_CRF', DEFAULT_CONFIG['QUICK_CRF']))
+            self.quick_direct_encode.setChecked(defaults.get('QUICK_DIRECT_ENCODE', DEFAULT_CONFIG['QUICK_DIRECT_ENCODE']))
+            self.audio_bitrate.setValue(defaults.get('AUDIO_BITRATE_KBPS', DEFAULT_CONFIG['AUDIO_BITRATE_KBPS']))
+            self.audio_channels.setValue(defaults.get('AUDIO_CHANNELS', DEFAULT_CONFIG['AUDIO_CHANNELS']))
             
             # Restore FFmpeg presets
             self.extract_preset.setCurrentText(defaults.get('EXTRACT_PRESET', DEFAULT_CONFIG['EXTRACT_PRESET']))
+            self.extract_mode.setCurrentText(defaults.get('EXTRACT_MODE', DEFAULT_CONFIG['EXTRACT_MODE']))
             self.compression_preset.setCurrentText(defaults.get('COMPRESSION_PRESET', DEFAULT_CONFIG['COMPRESSION_PRESET']))
+            self.video_codec.setCurrentText(defaults.get('VIDEO_CODEC', DEFAULT_CONFIG['VIDEO_CODEC']))
             self.cpu_threads.setValue(defaults.get('CPU_THREADS', DEFAULT_CONFIG['CPU_THREADS']))
+            self.max_concurrent_jobs.setValue(defaults.get('MAX_CONCURRENT_JOBS', DEFAULT_CONFIG['MAX_CONCURRENT_JOBS']))
+            self.parallel_crf_trials.setValue(defaults.get('PARALLEL_CRF_TRIALS', DEFAULT_CONFIG['PARALLEL_CRF_TRIALS']))
+            self.split_crf_trials.setChecked(defaults.get('SPLIT_CRF_TRIALS', DEFAULT_CONFIG['SPLIT_CRF_TRIALS']))
+            self.metrics_port.setValue(defaults.get('METRICS_PORT', DEFAULT_CONFIG['METRICS_PORT']))
+            
+            self.upload_limit.setValue(defaults.get('UPLOAD_LIMIT_KBPS', DEFAULT_CONFIG['UPLOAD_LIMIT_KBPS']))
+            self.reshare_cache.setChecked(defaults.get('RESHARE_CACHE', DEFAULT_CONFIG['RESHARE_CACHE']))
+            self.reshare_cache_max_age.setValue(defaults.get('RESHARE_CACHE_MAX_AGE_HOURS', DEFAULT_CONFIG['RESHARE_CACHE_MAX_AGE_HOURS']))
             
             # Restore user name
             self.user_name.setText(defaults.get('USER_NAME', DEFAULT_CONFIG['USER_NAME']))
@@ -791,6 +1060,8 @@ class AutoClipSenderGUI(QMainWindow):
             # Fall back to DEFAULT_CONFIG if defaults.json has issues
             self.shadowplay_folder.setText(DEFAULT_CONFIG['SHADOWPLAY_FOLDER'])
             self.output_folder.setText(DEFAULT_CONFIG['OUTPUT_FOLDER'])
+            self.ready_stable_seconds.setValue(DEFAULT_CONFIG['READY_STABLE_SECONDS'])
+            self.ready_timeout_seconds.setValue(DEFAULT_CONFIG['READY_TIMEOUT_SECONDS'])
             
             # Restore size settings
             self.min_size.setValue(DEFAULT_CONFIG['MIN_SIZE_MB'])
@@ -806,19 +1077,36 @@ class AutoClipSenderGUI(QMainWindow):
             self.crf_min.setValue(DEFAULT_CONFIG['CRF_MIN'])
             self.crf_max.setValue(DEFAULT_CONFIG['CRF_MAX'])
             self.crf_step.setValue(DEFAULT_CONFIG['CRF_STEP'])
+            self.crf_predictor.setChecked(DEFAULT_CONFIG['CRF_PREDICTOR'])
+            self.sample_estimation.setChecked(DEFAULT_CONFIG['SAMPLE_ESTIMATION'])
+            self.resolution_ladder.setChecked(DEFAULT_CONFIG['RESOLUTION_LADDER'])
+            self.ladder_min_bpp.setValue(DEFAULT_CONFIG['LADDER_MIN_BPP'])
+            self.early_abort_margin.setValue(DEFAULT_CONFIG['EARLY_ABORT_MARGIN'])
             self.compression_method.setCurrentText(DEFAULT_CONFIG['COMPRESSION_METHOD'])
             self.quick_crf.setValue(DEFAULT_CONFIG['QUICK_CRF'])
+            self.quick_direct_encode.setChecked(DEFAULT_CONFIG['QUICK_DIRECT_ENCODE'])
+            self.audio_bitrate.setValue(DEFAULT_CONFIG['AUDIO_BITRATE_KBPS'])
+            self.audio_channels.setValue(DEFAULT_CONFIG['AUDIO_CHANNELS'])
             
             # Restore FFmpeg presets
             self.extract_preset.setCurrentText(DEFAULT_CONFIG['EXTRACT_PRESET'])
+            self.extract_mode.setCurrentText(DEFAULT_CONFIG['EXTRACT_MODE'])
             self.compression_preset.setCurrentText(DEFAULT_CONFIG['COMPRESSION_PRESET'])
+            self.video_codec.setCurrentText(DEFAULT_CONFIG['VIDEO_CODEC'])
             self.cpu_threads.setValue(DEFAULT_CONFIG['CPU_THREADS'])
+            self.max_concurrent_jobs.setValue(DEFAULT_CONFIG['MAX_CONCURRENT_JOBS'])
+            self.upload_limit.setValue(DEFAULT_CONFIG['UPLOAD_LIMIT_KBPS'])
+            self.reshare_cache.setChecked(DEFAULT_CONFIG['RESHARE_CACHE'])
+            self.reshare_cache_max_age.setValue(DEFAULT_CONFIG['RESHARE_CACHE_MAX_AGE_HOURS'])
+            self.parallel_crf_trials.setValue(DEFAULT_CONFIG['PARALLEL_CRF_TRIALS'])
+            self.split_crf_trials.setChecked(DEFAULT_CONFIG['SPLIT_CRF_TRIALS'])
+            self.metrics_port.setValue(DEFAULT_CONFIG['METRICS_PORT'])
             
             # Restore user name
             self.user_name.setText(DEFAULT_CONFIG['USER_NAME'])
         
         # Keep the current webhook URL and user name instead of resetting them
-        self.webhook_url.setText(current_webhook_url)
+        self.webhook_url.setPlainText(current_webhook_url)
         self.user_name.setText(current_user_name)
         print("Webhook URL and user name preserved during defaults restoration")
         
@@ -830,6 +1118,8 @@ class AutoClipSenderGUI(QMainWindow):
         config = {
             'SHADOWPLAY_FOLDER': self.shadowplay_folder.text(),
             'OUTPUT_FOLDER': self.output_folder.text(),
+            'READY_STABLE_SECONDS': self.ready_stable_seconds.value(),
+            'READY_TIMEOUT_SECONDS': self.ready_timeout_seconds.value(),
             'MIN_SIZE_MB': self.min_size.value(),
             'MAX_SIZE_MB': self.max_size.value(),
             'TARGET_SIZE_MB': self.target_size.value(),
@@ -837,33 +1127,36 @@ class AutoClipSenderGUI(QMainWindow):
             'CRF_MIN': self.crf_min.value(),
             'CRF_MAX': self.crf_max.value(),
             'CRF_STEP': self.crf_step.value(),
+            'CRF_PREDICTOR': self.crf_predictor.isChecked(),
+            'SAMPLE_ESTIMATION': self.sample_estimation.isChecked(),
+            'RESOLUTION_LADDER': self.resolution_ladder.isChecked(),
+            'LADDER_MIN_BPP': self.ladder_min_bpp.value(),
+            'EARLY_ABORT_MARGIN': self.early_abort_margin.value(),
             'EXTRACT_PRESET': self.extract_preset.currentText(),
+            'EXTRACT_MODE': self.extract_mode.currentText(),
             'COMPRESSION_PRESET': self.compression_preset.currentText(),
+            'VIDEO_CODEC': self.video_codec.currentText(),
             'CLIP_DURATION': self.clip_duration.value(),
             'HIGH_QUALITY_CRF': self.high_quality_crf.value(),
             'QUICK_CRF': self.quick_crf.value(),
-            'WEBHOOK_URL': self.webhook_url.text(),
+            'QUICK_DIRECT_ENCODE': self.quick_direct_encode.isChecked(),
+            'AUDIO_BITRATE_KBPS': self.audio_bitrate.value(),
+            'AUDIO_CHANNELS': self.audio_channels.value(),
+            'WEBHOOK_URL': (self.webhook_urls() or [""])[0],
+            'WEBHOOK_URLS': self.webhook_urls(),
             'COMPRESSION_METHOD': self.compression_method.currentText(),
             'CPU_THREADS': self.cpu_threads.value(),
+            'MAX_CONCURRENT_JOBS': self.max_concurrent_jobs.value(),
+            'PARALLEL_CRF_TRIALS': self.parallel_crf_trials.value(),
+            'SPLIT_CRF_TRIALS': self.split_crf_trials.isChecked(),
+            'METRICS_PORT': self.metrics_port.value(),
+            'UPLOAD_LIMIT_KBPS': self.upload_limit.value(),
+            'RESHARE_CACHE': self.reshare_cache.isChecked(),
+            'RESHARE_CACHE_MAX_AGE_HOURS': self.reshare_cache_max_age.value(),
             'USER_NAME': self.user_name.text().strip()
         }
         
-        # Add threshold values from CONFIG (these don't have UI elements)
         global CONFIG
-        if 'CLOSE_THRESHOLD' in CONFIG:
-            config['CLOSE_THRESHOLD'] = CONFIG['CLOSE_THRESHOLD']
-        else:
-            config['CLOSE_THRESHOLD'] = DEFAULT_CONFIG['CLOSE_THRESHOLD']
-            
-        if 'MEDIUM_THRESHOLD' in CONFIG:
-            config['MEDIUM_THRESHOLD'] = CONFIG['MEDIUM_THRESHOLD']
-        else:
-            config['MEDIUM_THRESHOLD'] = DEFAULT_CONFIG['MEDIUM_THRESHOLD']
-            
-        if 'FAR_THRESHOLD' in CONFIG:
-            config['FAR_THRESHOLD'] = CONFIG['FAR_THRESHOLD']
-        else:
-            config['FAR_THRESHOLD'] = DEFAULT_CONFIG['FAR_THRESHOLD']
         
         # Save to config.json
         try:
@@ -882,12 +1175,21 @@ class AutoClipSenderGUI(QMainWindow):
             print(f"Error saving configuration: {e}")
             QMessageBox.warning(self, "Error", f"Failed to save configuration: {str(e)}")
 
+    def webhook_urls(self):
+        """Webhook URLs entered in the Discord tab, one per line, without duplicates"""
+        urls = []
+        for line in self.webhook_url.toPlainText().splitlines():
+            url = line.strip()
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+    
     def test_webhook(self):
         """
-        Test the Discord webhook URL by sending a test message
+        Test every Discord webhook URL by sending a test message
         """
-        webhook_url = self.webhook_url.text().strip()
-        if not webhook_url:
+        webhook_urls = self.webhook_urls()
+        if not webhook_urls:
             QMessageBox.warning(self, "Warning", "Please enter a webhook URL first")
             return
             
@@ -903,18 +1205,58 @@ class AutoClipSenderGUI(QMainWindow):
                 "content": "Test message from Auto-Clip-Sender! If you see this, your webhook is working correctly."
             }
             
-            response = requests.post(webhook_url, json=data)
+            failures = []
+            for number, webhook_url in enumerate(webhook_urls, start=1):
+                label = f"Webhook {number}" if len(webhook_urls) > 1 else "Webhook"
+                try:
+                    response = requests.post(webhook_url, json=data, timeout=(10, 30))
+                except Exception as e:
+                    failures.append(f"{label}: {e}")
+                    print(f"Error testing {label.lower()}: {e}")
+                    continue
+                if response.status_code == 204 or response.status_code == 200:
+                    print(f"{label} test successful")
+                else:
+                    failures.append(f"{label}: HTTP {response.status_code}: {response.text}")
+                    print(f"{label} test failed: HTTP {response.status_code} - {response.text}")
             
-            if response.status_code == 204 or response.status_code == 200:
+            if not failures:
                 QMessageBox.information(self, "Success", "Webhook test successful! Check your Discord channel for the test message.")
-                print("Webhook test successful")
             else:
-                QMessageBox.warning(self, "Warning", f"Webhook test failed with status code {response.status_code}: {response.text}")
-                print(f"Webhook test failed: HTTP {response.status_code} - {response.text}")
+                QMessageBox.warning(self, "Warning", "Webhook test failed:\n" + "\n".join(failures))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to test webhook: {e}")
             print(f"Error testing webhook: {e}")
     
+    def resend_clip(self):
+        """
+        Send a finished clip to every webhook again, reusing the link of a recent upload of it
+        """
+        if not self.webhook_urls():
+            QMessageBox.warning(self, "Warning", "Please enter a webhook URL first")
+            return
+        
+        clip_path, _ = QFileDialog.getOpenFileName(self, "Select Clip", self.output_folder.text(),
+                                                   "Videos (*.mp4 *.mov *.avi)")
+        if not clip_path:
+            return
+        
+        # The clip processor reads the webhooks and upload settings from the saved config
+        self.save_configuration()
+        
+        def send_clip():
+            try:
+                import clip_processor
+                failed = clip_processor.resend_clip(clip_path)
+                if failed:
+                    print(f"Could not send {os.path.basename(clip_path)} to {len(failed)} webhook(s)")
+            except Exception as e:
+                print(f"Error sending clip again: {e}")
+        
+        if self.statusBar():
+            self.statusBar().showMessage(f"Sending {os.path.basename(clip_path)}...", 3000)
+        threading.Thread(target=send_clip, daemon=True).start()
+    
     def start_monitoring(self):
         # Validate settings before starting
         if not self.validate_settings():
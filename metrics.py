@@ -0,0 +1,190 @@
+"""
+Timing and throughput metrics for the clip pipeline.
+
+The "Total processing time" log line only says how long one clip took. The pipeline records every
+stage (readiness wait, probe, extraction, compression attempts, file moves, uploads) in histograms
+here, next to counters and gauges such as queue depth and bytes uploaded, so the latency
+distribution can be watched over many clips. MetricsServer publishes them on localhost in the
+Prometheus text format (/metrics) and as a JSON snapshot (/metrics.json).
+"""
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Histogram bucket upper bounds in seconds, from a quick probe to a slow upload
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms, each kept per combination of label values"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.definitions = {}  # name -> (kind, help text), in definition order
+        self.values = {}  # name -> {label key -> number, or histogram dict for histograms}
+        self.gauge_functions = {}  # name -> callable giving the gauge value when it is read
+
+    def define(self, name, kind, help_text, function=None):
+        """Declare a metric. A gauge with function is read from it instead of being set."""
+        with self.lock:
+            self.definitions[name] = (kind, help_text)
+            self.values.setdefault(name, {})
+            if function is not None:
+                self.gauge_functions[name] = function
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[name][_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        """Add one observation (e.g. a duration in seconds) to a histogram"""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.values[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the with-block took, whether or not it raised"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def _read(self):
+        """(name, kind, help text, {label key -> value}) for every metric, gauge functions evaluated"""
+        with self.lock:
+            metrics = [(name, kind, help_text, dict(self.values[name]))
+                       for name, (kind, help_text) in self.definitions.items()]
+            functions = dict(self.gauge_functions)
+        for name, kind, help_text, series in metrics:
+            if name in functions:
+                try:
+                    series[()] = functions[name]()
+                except Exception as e:
+                    print(f"Error reading metric {name}: {e}")
+        return metrics
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, kind, help_text, series in self._read():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(series.items()):
+                if kind != HISTOGRAM:
+                    lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+                    continue
+                for bound, count in zip(self.buckets, value['buckets']):
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_number(float(bound)))])} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_number(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(key)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """All metrics as a JSON-serialisable dict"""
+        snapshot = {'timestamp': time.time(), 'metrics': {}}
+        for name, kind, help_text, series in self._read():
+            samples = []
+            for key, value in sorted(series.items()):
+                sample = {'labels': dict(key)}
+                if kind == HISTOGRAM:
+                    sample.update(count=value['count'], sum=value['sum'],
+                                  buckets={str(bound): count for bound, count in zip(self.buckets, value['buckets'])})
+                else:
+                    sample['value'] = value
+                samples.append(sample)
+            snapshot['metrics'][name] = {'type': kind, 'help': help_text, 'samples': samples}
+        return snapshot
+
+
+class MetricsServer:
+    """Serves a Metrics object over HTTP on localhost: /metrics (Prometheus) and /metrics.json"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = self.path.split('?', 1)[0]
+                if route in ('/', '/metrics'):
+                    body, content_type = metrics.prometheus_text().encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+                elif route == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot()).encode('utf-8'), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the terminal output
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="MetricsServer")
+        self.thread.start()
+
+    def stop(self):
+        if self.httpd is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=2.0)
+        self.httpd = None
+        self.thread = None
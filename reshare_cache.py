@@ -0,0 +1,95 @@
+"""
+Cache of Discord attachment URLs for clips that have already been uploaded.
+
+Webhook uploads are sent with ?wait=true, so Discord answers with the created message including
+the CDN URL of the attachment. The URL is stored under the SHA-256 of the file contents. When the
+same clip is sent again (a retry after a restart, or a re-send with clip_processor.resend_clip) the
+cached URL is posted instead of uploading the file again - Discord embeds the video from the link.
+
+The webhook targets of a new clip each upload it themselves, so a slow target never holds up the
+others; whichever upload finishes first provides the cached URL.
+
+Discord attachment URLs are signed and expire, so entries are evicted once they are older than
+max_age_hours.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+import config_helper
+
+CACHE_FILE = 'reshare_cache.json'
+DEFAULT_MAX_AGE_HOURS = 20
+
+
+def file_sha256(filepath):
+    """Hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReshareCache:
+    """Persisted content hash -> attachment URL map with eviction by age"""
+
+    def __init__(self, filename=CACHE_FILE, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+        self.filename = filename
+        self.max_age_seconds = max_age_hours * 3600
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        self._evict()
+
+    def _load(self):
+        cache_path = config_helper.get_config_file_path(self.filename)
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except Exception as e:
+            print(f"Error loading reshare cache {self.filename}, starting a new one: {e}")
+            return {}
+
+    def _save(self):
+        cache_path = config_helper.get_config_file_path(self.filename)
+        temp_path = cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': self.entries}, f)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            print(f"Error saving reshare cache {self.filename}: {e}")
+
+    def _evict(self):
+        """Drop expired entries. Returns True if anything was removed."""
+        cutoff = time.time() - self.max_age_seconds
+        expired = [content_hash for content_hash, entry in self.entries.items() if entry['created_at'] < cutoff]
+        for content_hash in expired:
+            del self.entries[content_hash]
+        return bool(expired)
+
+    def get(self, content_hash):
+        """Cached attachment URL for the content hash, or None if unknown or expired"""
+        with self.lock:
+            if content_hash not in self.entries:
+                # A re-send from another process (the settings window) may have uploaded it since
+                self.entries.update(self._load())
+            if self._evict():
+                self._save()
+            entry = self.entries.get(content_hash)
+            return entry['url'] if entry else None
+
+    def put_first(self, content_hash, url):
+        """Cache url unless another upload of the same contents already left a live one"""
+        with self.lock:
+            # Keep entries saved by other processes since this cache was loaded
+            self.entries.update(self._load())
+            self._evict()
+            if content_hash in self.entries:
+                return
+            self.entries[content_hash] = {'url': url, 'created_at': time.time()}
+            self._save()
@@ -0,0 +1,75 @@
+"""
+Resolution and frame-rate ladder for size-targeted compression.
+
+A 15 second clip has to fit in about 10MB, which leaves roughly 5Mbps for video. Spread over
+1440p at 60fps that is far too few bits per pixel, and the CRF search can only get there by
+smearing every frame. The ladder picks the largest output (pixels per second) that still gets at
+least min_bpp bits per pixel from the bitrate budget, so the encoder spends its bits on fewer,
+sharper pixels and never encodes pixels that would be thrown away.
+"""
+from collections import namedtuple
+
+# Output heights the ladder can step down to (the source height is always a candidate too)
+LADDER_HEIGHTS = (2160, 1440, 1080, 900, 720, 540, 480, 360)
+# Frame rates the ladder can step down to
+LADDER_FRAME_RATES = (60, 30)
+# Source frame rates within this of a ladder frame rate count as that rate (59.94 -> 60)
+FRAME_RATE_TOLERANCE = 1.0
+
+Rung = namedtuple('Rung', ['width', 'height', 'fps'])
+
+
+def parse_frame_rate(rate):
+    """Frame rate from an ffprobe rate string such as '60000/1001', or None"""
+    try:
+        numerator, _, denominator = str(rate).partition('/')
+        value = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return value if value > 0 else None
+
+
+def even(value):
+    return max(2, int(round(value / 2)) * 2)
+
+
+def ladder_rungs(width, height, fps):
+    """Every rung at or below the source resolution and frame rate, largest pixel rate first"""
+    heights = [height] + [h for h in LADDER_HEIGHTS if h < height]
+    frame_rates = [fps] + [r for r in LADDER_FRAME_RATES if r < fps - FRAME_RATE_TOLERANCE]
+    rungs = [Rung(width if h == height else even(width * h / height), h, r) for h in heights for r in frame_rates]
+    return sorted(rungs, key=lambda rung: (rung.width * rung.height * rung.fps, rung.height), reverse=True)
+
+
+def bits_per_pixel(video_kbps, rung):
+    return video_kbps * 1000 / (rung.width * rung.height * rung.fps)
+
+
+def plan_rung(width, height, fps, video_kbps, min_bpp):
+    """Pick the largest rung that gets at least min_bpp bits per pixel from video_kbps.
+
+    Falls back to the smallest rung when even that is below min_bpp.
+    """
+    rungs = ladder_rungs(width, height, fps)
+    for rung in rungs:
+        if bits_per_pixel(video_kbps, rung) >= min_bpp:
+            return rung
+    return rungs[-1]
+
+
+def rung_filters(rung, width, height, fps):
+    """(name, args, kwargs) of the FFmpeg filters that turn the source into the rung"""
+    filters = []
+    if rung.height != height:
+        filters.append(('scale', (rung.width, rung.height), {'flags': 'lanczos'}))
+    if rung.fps < fps - FRAME_RATE_TOLERANCE:
+        filters.append(('fps', (f"{rung.fps:g}",), {}))
+    return filters
+
+
+def rung_filter(rung, width, height, fps):
+    """-vf filter string that turns the source into the rung, or None when nothing changes"""
+    return ','.join(
+        f"{name}=" + ':'.join([str(arg) for arg in args] + [f"{key}={value}" for key, value in kwargs.items()])
+        for name, args, kwargs in rung_filters(rung, width, height, fps)
+    ) or None
@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from clip_ledger import ClipLedger, STATUS_DONE, STATUS_ENCODED, STATUS_FAILED
+
+WEBHOOK = 'webhook'
+WEEK = 7 * 24 * 3600
+
+
+class LedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.ledger = ClipLedger(os.path.join(self.directory, 'ledger.db'))
+        self.addCleanup(self.ledger.close)
+        self.recordings = 0
+
+    def make_recording(self):
+        self.recordings += 1
+        recording = os.path.join(self.directory, f'recording{self.recordings}.mp4')
+        with open(recording, 'wb') as f:
+            f.write(b'\0' * self.recordings)
+        return recording
+
+    def status(self, clip_id):
+        return self.ledger._query("SELECT status FROM clips WHERE id = ?", (clip_id,))[0]['status']
+
+    def add_clip(self, game, sent=True, crf=28, size_mb=9.0, encode_started_at=None, encode_seconds=60,
+                 upload_seconds=30):
+        """Run a clip through every stage, optionally at fixed times"""
+        recording = self.make_recording()
+        clip_id = self.ledger.claim(recording, game)
+        self.ledger.encode_started(clip_id)
+        self.ledger.encoded(clip_id, recording, size_mb, crf, [WEBHOOK])
+        self.ledger.upload_started(clip_id, WEBHOOK)
+        self.ledger.upload_finished(clip_id, WEBHOOK, sent)
+        if encode_started_at is not None:
+            encode_finished_at = encode_started_at + encode_seconds
+            self.ledger._execute(
+                "UPDATE clips SET detected_at = ?, encode_started_at = ?, encode_finished_at = ?, "
+                "upload_started_at = ?, upload_finished_at = ? WHERE id = ?",
+                (encode_started_at - 5, encode_started_at, encode_finished_at, encode_finished_at,
+                 encode_finished_at + upload_seconds, clip_id)
+            )
+        return clip_id
+
+
+class ClaimTests(LedgerTestCase):
+    def test_same_recording_is_claimed_once(self):
+        recording = self.make_recording()
+        self.assertIsNotNone(self.ledger.claim(recording, 'Game'))
+        self.assertIsNone(self.ledger.claim(recording, 'Game'))
+
+    def test_rewritten_recording_is_a_new_clip(self):
+        recording = self.make_recording()
+        first = self.ledger.claim(recording, 'Game')
+        with open(recording, 'ab') as f:
+            f.write(b'\0' * 100)
+        second = self.ledger.claim(recording, 'Game')
+        self.assertIsNotNone(second)
+        self.assertNotEqual(first, second)
+
+    def test_finished_recording_is_not_claimed_again(self):
+        clip_id = self.add_clip('Game')
+        recording = self.ledger._query("SELECT source_path FROM clips WHERE id = ?", (clip_id,))[0]['source_path']
+        self.assertEqual(self.status(clip_id), STATUS_DONE)
+        self.assertIsNone(self.ledger.claim(recording, 'Game'))
+
+    def test_failed_recording_is_claimed_again(self):
+        recording = self.make_recording()
+        clip_id = self.ledger.claim(recording, 'Game')
+        self.ledger.failed(clip_id, "FFmpeg failed")
+        self.assertEqual(self.ledger.claim(recording, 'Game'), clip_id)
+
+
+class UploadTests(LedgerTestCase):
+    def test_clip_is_done_once_every_target_is_sent(self):
+        recording = self.make_recording()
+        clip_id = self.ledger.claim(recording, 'Game')
+        self.ledger.encoded(clip_id, recording, 9.0, 28, ['a', 'b'])
+        self.ledger.upload_finished(clip_id, 'a', True)
+        self.assertEqual(self.ledger.pending_targets(clip_id), ['b'])
+        self.ledger.upload_finished(clip_id, 'b', True)
+        self.assertEqual(self.status(clip_id), STATUS_DONE)
+
+    def test_partial_upload_fails_the_clip(self):
+        recording = self.make_recording()
+        clip_id = self.ledger.claim(recording, 'Game')
+        self.ledger.encoded(clip_id, recording, 9.0, 28, ['a', 'b'])
+        self.ledger.upload_finished(clip_id, 'a', True)
+        self.ledger.upload_finished(clip_id, 'b', False, "HTTP 500")
+        self.assertEqual(self.status(clip_id), STATUS_FAILED)
+        self.assertEqual(self.ledger.pending_targets(clip_id), [])
+
+    def partly_sent_clip(self):
+        recording = self.make_recording()
+        output = os.path.join(self.directory, 'Game-01012026-1200.mp4')
+        with open(output, 'wb') as f:
+            f.write(b'\0')
+        clip_id = self.ledger.claim(recording, 'Game')
+        self.ledger.encoded(clip_id, output, 9.0, 28, ['a', 'b'])
+        self.ledger.upload_finished(clip_id, 'a', True)
+        self.ledger.upload_finished(clip_id, 'b', False, "HTTP 500")
+        return recording, output, clip_id
+
+    def test_claiming_a_partial_upload_keeps_the_output(self):
+        recording, output, clip_id = self.partly_sent_clip()
+        self.assertEqual(self.ledger.claim(recording, 'Game'), clip_id)
+        job = self.ledger.job(clip_id)
+        self.assertEqual((job['status'], job['output_path']), (STATUS_ENCODED, output))
+        self.assertEqual(self.ledger.pending_targets(clip_id), ['b'])
+
+        self.ledger.upload_finished(clip_id, 'b', True)
+        self.assertEqual(self.status(clip_id), STATUS_DONE)
+
+    def test_encoding_again_does_not_resend_to_sent_targets(self):
+        recording, output, clip_id = self.partly_sent_clip()
+        os.remove(output)
+        self.assertEqual(self.ledger.claim(recording, 'Game'), clip_id)
+        self.ledger.encoded(clip_id, output, 9.0, 28, ['a', 'b'])
+        self.assertEqual(self.ledger.pending_targets(clip_id), ['b'])
+
+
+class GameReportTests(LedgerTestCase):
+    def report(self, game):
+        return next(entry for entry in self.ledger.game_report() if entry['game'] == game)
+
+    def test_counts_and_averages(self):
+        self.add_clip('Game', crf=26, size_mb=9.0)
+        self.add_clip('Game', crf=30, size_mb=8.0, sent=False)
+        self.add_clip('Other', crf=20)
+
+        entry = self.report('Game')
+        self.assertEqual((entry['clips'], entry['sent'], entry['failed']), (2, 1, 1))
+        self.assertAlmostEqual(entry['avg_crf'], 28)
+        self.assertAlmostEqual(entry['avg_output_mb'], 8.5)
+        self.assertEqual(self.ledger.game_report()[0]['game'], 'Game')  # Most clips first
+
+    def test_latency_only_counts_sent_clips(self):
+        start = 1_700_000_000
+        self.add_clip('Game', encode_started_at=start, encode_seconds=60, upload_seconds=30)
+        self.add_clip('Game', sent=False, encode_started_at=start + 600, encode_seconds=300, upload_seconds=300)
+
+        entry = self.report('Game')
+        self.assertAlmostEqual(entry['avg_latency_seconds'], 95)
+        self.assertAlmostEqual(entry['max_latency_seconds'], 95)
+        self.assertAlmostEqual(entry['avg_encode_seconds'], 180)
+
+    def test_sessions_a_week_apart_are_not_averaged_over_the_gap(self):
+        start = 1_700_000_000
+        for session_start in (start, start + WEEK):
+            for minute in (0, 10, 20):
+                self.add_clip('Game', encode_started_at=session_start + minute * 60, encode_seconds=60,
+                              upload_seconds=30)
+
+        # Six clips, each busy for 90 seconds without overlapping
+        self.assertAlmostEqual(self.report('Game')['clips_per_busy_hour'], 6 / (6 * 90 / 3600))
+
+    def test_overlapping_clips_count_their_busy_time_once(self):
+        start = 1_700_000_000
+        self.add_clip('Game', encode_started_at=start, encode_seconds=100, upload_seconds=20)       # start .. +120
+        self.add_clip('Game', encode_started_at=start + 60, encode_seconds=100, upload_seconds=20)  # +60 .. +180
+
+        self.assertAlmostEqual(self.report('Game')['clips_per_busy_hour'], 2 / (180 / 3600))
+
+    def test_games_are_reported_separately(self):
+        start = 1_700_000_000
+        self.add_clip('A', encode_started_at=start, encode_seconds=30, upload_seconds=30)
+        self.add_clip('B', sent=False, encode_started_at=start, encode_seconds=90, upload_seconds=30)
+
+        self.assertAlmostEqual(self.report('A')['clips_per_busy_hour'], 60)
+        self.assertEqual(self.report('B')['clips_per_busy_hour'], 0)
+
+    def test_unfinished_clips_have_no_rate(self):
+        self.ledger.claim(self.make_recording(), 'Game')
+
+        self.assertIsNone(self.report('Game')['clips_per_busy_hour'])
+
+
+if __name__ == '__main__':
+    unittest.main()
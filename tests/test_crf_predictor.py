@@ -0,0 +1,144 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import crf_predictor
+from crf_predictor import CrfSizeModel, DEFAULT_LOG_SLOPE, MAX_LOG_SLOPE, MAX_POINTS_PER_KEY, MIN_LOG_SLOPE
+
+CLIP_SECONDS = 15.0
+GAME = 'Game'
+SOURCE = (2560, 1440, 40000, 'medium')  # width, height, source kbps, preset
+
+
+def log_linear(size_at_zero_mb, slope):
+    """Clip size in MB as a function of CRF, with log size linear in CRF"""
+    return lambda crf: size_at_zero_mb * math.exp(slope * crf)
+
+
+class CrfSizeModelTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.model_path = os.path.join(directory, 'crf_model.json')
+        self.model = CrfSizeModel(self.model_path)
+
+    def record(self, size_of, crfs, game=GAME, source=SOURCE, model=None):
+        width, height, source_kbps, preset = source
+        (model or self.model).record(game, width, height, source_kbps, preset, CLIP_SECONDS,
+                                     [(crf, size_of(crf)) for crf in crfs])
+
+    def predict(self, target_size_mb=9.0, game=GAME, source=SOURCE, crf_min=1, crf_max=50, model=None):
+        width, height, source_kbps, preset = source
+        return (model or self.model).predict(game, width, height, source_kbps, preset, CLIP_SECONDS,
+                                             target_size_mb, crf_min, crf_max)
+
+    def test_nothing_learned_predicts_nothing(self):
+        self.assertIsNone(self.predict())
+
+    def test_fit_recovers_a_log_linear_curve(self):
+        for slope in (-0.05, -0.1, -0.2):
+            with self.subTest(slope=slope):
+                size_of = log_linear(500, slope)
+                points = [[crf, size_of(crf) / CLIP_SECONDS, 0] for crf in (18, 22, 26, 30)]
+                intercept, fitted_slope = CrfSizeModel._fit(points)
+                self.assertAlmostEqual(fitted_slope, slope)
+                self.assertAlmostEqual(intercept, math.log(500 / CLIP_SECONDS))
+
+    def test_predicts_the_crf_nearest_the_target(self):
+        size_of = log_linear(500, -0.1)
+        self.record(size_of, (18, 24, 30))
+        crf = self.predict(target_size_mb=9.0)[0]
+        # 500 * exp(-0.1 * crf) = 9 at CRF ~40.2
+        self.assertEqual(crf, 40)
+
+    def test_prediction_is_clamped_to_the_crf_range(self):
+        self.record(log_linear(500, -0.1), (18, 24, 30))
+        self.assertEqual(self.predict(target_size_mb=9.0, crf_max=30)[0], 30)
+        self.assertEqual(self.predict(target_size_mb=400.0, crf_min=10)[0], 10)
+
+    def test_noisy_slopes_are_clamped(self):
+        too_flat = [[20, 1.0, 0], [30, 0.999, 0]]
+        too_steep = [[20, 1.0, 0], [30, 1e-4, 0]]
+        rising = [[20, 1.0, 0], [30, 2.0, 0]]
+        self.assertEqual(CrfSizeModel._fit(too_flat)[1], MAX_LOG_SLOPE)
+        self.assertEqual(CrfSizeModel._fit(too_steep)[1], MIN_LOG_SLOPE)
+        self.assertEqual(CrfSizeModel._fit(rising)[1], MAX_LOG_SLOPE)
+
+    def test_points_at_one_crf_use_the_default_slope(self):
+        intercept, slope = CrfSizeModel._fit([[24, 0.6, 0], [24, 0.6, 0]])
+        self.assertEqual(slope, DEFAULT_LOG_SLOPE)
+        self.assertAlmostEqual(intercept + slope * 24, math.log(0.6))
+
+    def test_recent_points_outweigh_old_ones(self):
+        # The game got harder to compress: the newer points are twice the size at every CRF
+        self.record(log_linear(500, -0.1), range(10, 30))
+        self.record(log_linear(1000, -0.1), range(10, 30))
+        crf = self.predict(target_size_mb=9.0)[0]
+        old_crf = math.log(500 / 9.0) / 0.1
+        new_crf = math.log(1000 / 9.0) / 0.1
+        self.assertGreater(crf, (old_crf + new_crf) / 2)
+
+    def test_only_the_newest_points_are_kept(self):
+        self.record(log_linear(500, -0.1), range(1, MAX_POINTS_PER_KEY + 11))
+        for key_points in self.model.points.values():
+            self.assertEqual(len(key_points), MAX_POINTS_PER_KEY)
+            self.assertEqual(key_points[0][0], 11)
+
+    def test_unusable_results_are_ignored(self):
+        width, height, source_kbps, preset = SOURCE
+        self.model.record(GAME, width, height, source_kbps, preset, 0, [(24, 9.0)])
+        self.model.record(GAME, width, height, source_kbps, preset, CLIP_SECONDS, [(24, 0.0)])
+        self.model.record(GAME, width, height, source_kbps, preset, CLIP_SECONDS, [])
+        self.assertIsNone(self.predict())
+
+    def test_falls_back_to_broader_keys(self):
+        self.record(log_linear(500, -0.1), (18, 24, 30))
+        width, height, source_kbps, preset = SOURCE
+        cases = [
+            ('same bitrate bucket', GAME, (width, height, source_kbps * 1.1, preset), 0),
+            ('other bitrate bucket', GAME, (width, height, source_kbps * 4, preset), 1),
+            ('other game', 'Other Game', SOURCE, 2),
+        ]
+        for description, game, source, key_index in cases:
+            with self.subTest(description):
+                crf, key = self.predict(game=game, source=source)[:2]
+                self.assertEqual(key, CrfSizeModel.make_keys(game, *source)[key_index])
+                self.assertEqual(crf, 40)
+
+    def test_no_fallback_across_resolutions_or_presets(self):
+        self.record(log_linear(500, -0.1), (18, 24, 30))
+        width, height, source_kbps, preset = SOURCE
+        self.assertIsNone(self.predict(source=(1920, 1080, source_kbps, preset)))
+        self.assertIsNone(self.predict(source=(width, height, source_kbps, 'slow')))
+
+    def test_specific_key_wins_over_broader_data(self):
+        self.record(log_linear(2000, -0.1), (18, 24, 30), game='Other Game')
+        self.record(log_linear(500, -0.1), (18, 24, 30))
+        crf, key = self.predict()[:2]
+        self.assertEqual(key, CrfSizeModel.make_keys(GAME, *SOURCE)[0])
+        self.assertEqual(crf, 40)
+
+    def test_bitrate_buckets_double(self):
+        self.assertEqual(crf_predictor.bitrate_bucket(16000), crf_predictor.bitrate_bucket(17000))
+        self.assertEqual(crf_predictor.bitrate_bucket(32000), crf_predictor.bitrate_bucket(16000) + 1)
+        self.assertEqual(crf_predictor.bitrate_bucket(0), 0)
+
+    def test_saved_model_loads_back(self):
+        self.record(log_linear(500, -0.1), (18, 24, 30))
+        reloaded = CrfSizeModel(self.model_path)
+        self.assertEqual(reloaded.points, self.model.points)
+        self.assertEqual(self.predict(model=reloaded), self.predict())
+
+    def test_corrupt_model_file_starts_a_new_model(self):
+        with open(self.model_path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        model = CrfSizeModel(self.model_path)
+        self.assertEqual(model.points, {})
+        self.record(log_linear(500, -0.1), (18, 24, 30), model=model)
+        self.assertIsNotNone(self.predict(model=CrfSizeModel(self.model_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
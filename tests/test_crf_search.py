@@ -0,0 +1,202 @@
+import math
+import unittest
+
+from crf_search import CrfSearch, DEFAULT_LOG_SLOPE
+
+# The shipped defaults: 8-10MB with 9MB as the target and five attempts
+MIN_SIZE_MB = 8.0
+MAX_SIZE_MB = 10.0
+TARGET_SIZE_MB = 9.0
+MAX_ATTEMPTS = 5
+
+
+def log_linear(size_at_zero_mb, slope):
+    """Size curve where log size falls linearly with CRF, as it roughly does for x264"""
+    return lambda crf: size_at_zero_mb * math.exp(slope * crf)
+
+
+def make_search(crf_min=1, crf_max=50, initial_crf=23, crf_step=1, log_slope=None, max_attempts=MAX_ATTEMPTS):
+    return CrfSearch(crf_min, crf_max, MIN_SIZE_MB, MAX_SIZE_MB, TARGET_SIZE_MB, max_attempts, initial_crf,
+                     log_slope=log_slope, crf_step=crf_step)
+
+
+class SearchRun:
+    """Drives a search against a size curve, checking its invariants after every step"""
+
+    def __init__(self, test, search, size_of, early_stop_margin=None):
+        self.test = test
+        self.search = search
+        self.size_of = size_of
+        self.early_stop_margin = early_stop_margin  # Report sizes this far outside the range as projected
+        self.tried = []
+
+    def run(self):
+        search = self.search
+        previous_width = None
+        while True:
+            low, high = search.bracket()
+            candidates = search.candidates()
+            crf = search.next_crf()
+            if crf is None:
+                break
+
+            self.test.assertNotIn(crf, self.tried, "the search proposed a CRF twice")
+            self.test.assertIn(crf, candidates)
+            self.test.assertTrue(search.crf_min <= crf <= search.crf_max)
+            self.test.assertEqual((crf - search.crf_min) % search.crf_step, 0, "CRF is off the CRF_STEP grid")
+            self.test.assertTrue(low < crf < high, "CRF is outside the bracket")
+
+            two_sided = low >= search.crf_min and high <= search.crf_max
+            if two_sided:
+                width = high - low
+                if previous_width is not None and width > previous_width / 2:
+                    # The secant step did not halve the bracket, so this step must be a bisection
+                    midpoint = (low + high) / 2
+                    self.test.assertEqual(crf, min(candidates, key=lambda c: (abs(c - midpoint), c)))
+                previous_width = width
+
+            self.tried.append(crf)
+            search.record(crf, self.reported_size(crf))
+
+            # The result just recorded rules out the CRF and never widens the bracket
+            new_low, new_high = search.bracket()
+            self.test.assertGreaterEqual(new_low, low)
+            self.test.assertLessEqual(new_high, high)
+            self.test.assertNotIn(crf, search.candidates())
+            self.test.assertLess(len(search.candidates()), len(candidates))
+
+        self.test.assertLessEqual(search.attempts, search.max_attempts)
+        return self
+
+    def reported_size(self, crf):
+        size_mb = self.size_of(crf)
+        if self.early_stop_margin is None:
+            return size_mb
+        # An early-stopped trial reports the size projected from the part it encoded, which can be
+        # well off the size the full encode would have had - but always on the same side of the range
+        if size_mb > MAX_SIZE_MB * (1 + self.early_stop_margin):
+            return size_mb * 1.5
+        if size_mb < MIN_SIZE_MB * (1 - self.early_stop_margin):
+            return size_mb * 0.5
+        return size_mb
+
+    def landed(self):
+        return [crf for crf in self.tried if MIN_SIZE_MB <= self.size_of(crf) <= MAX_SIZE_MB]
+
+
+def grid_has_answer(size_of, crf_min, crf_max, crf_step):
+    return any(MIN_SIZE_MB <= size_of(crf) <= MAX_SIZE_MB for crf in range(crf_min, crf_max + 1, crf_step))
+
+
+class LogLinearTests(unittest.TestCase):
+    def assert_converges(self, size_of, crf_step=1, crf_min=1, crf_max=50, initial_crf=23, log_slope=None,
+                         early_stop_margin=None):
+        search = make_search(crf_min, crf_max, initial_crf, crf_step, log_slope)
+        run = SearchRun(self, search, size_of, early_stop_margin).run()
+        self.assertTrue(run.landed(), f"no CRF in range after trying {run.tried}")
+        self.assertTrue(search.found())
+        self.assertIsNone(search.next_crf())
+
+    def test_converges_from_default_slope(self):
+        for size_at_zero_mb in (30, 100, 300, 1000, 3000):
+            with self.subTest(size_at_zero_mb=size_at_zero_mb):
+                self.assert_converges(log_linear(size_at_zero_mb, DEFAULT_LOG_SLOPE))
+
+    def test_converges_when_the_real_slope_differs(self):
+        for slope in (-0.06, -0.08, -0.1, -0.14):
+            for size_at_zero_mb in (60, 200, 800, 5000):
+                size_of = log_linear(size_at_zero_mb, slope)
+                if not grid_has_answer(size_of, 1, 50, 1):
+                    continue
+                with self.subTest(slope=slope, size_at_zero_mb=size_at_zero_mb):
+                    self.assert_converges(size_of)
+
+    def test_converges_from_a_bad_starting_crf(self):
+        for initial_crf in (1, 10, 40, 50):
+            with self.subTest(initial_crf=initial_crf):
+                self.assert_converges(log_linear(1000, DEFAULT_LOG_SLOPE), initial_crf=initial_crf)
+
+    def test_respects_crf_step_grid(self):
+        # With a step of 2 only odd CRFs from CRF_MIN=1 are allowed; the curve hits 9MB at CRF 27
+        size_of = lambda crf: 9.0 * math.exp(DEFAULT_LOG_SLOPE * (crf - 27))
+        self.assertTrue(grid_has_answer(size_of, 1, 50, 2))
+        self.assert_converges(size_of, crf_step=2, initial_crf=20)
+
+    def test_respects_crf_bounds(self):
+        # The target would need CRF ~6, below CRF_MIN, so the search must end at the bound
+        search = make_search(crf_min=18, crf_max=30, initial_crf=24)
+        run = SearchRun(self, search, log_linear(18, DEFAULT_LOG_SLOPE)).run()
+        self.assertFalse(run.landed())
+        self.assertIn(18, run.tried)
+        self.assertTrue(all(18 <= crf <= 30 for crf in run.tried))
+
+    def test_stops_without_candidates(self):
+        # Every CRF is too large: once CRF_MAX has been tried there is nothing left to propose
+        search = make_search(crf_min=20, crf_max=24, initial_crf=22, max_attempts=10)
+        run = SearchRun(self, search, log_linear(10000, DEFAULT_LOG_SLOPE)).run()
+        self.assertIn(24, run.tried)
+        self.assertEqual(search.candidates(), [])
+
+    def test_projected_results_from_early_stopped_trials(self):
+        # Early-stopped trials report a projected size that can be far off, but never on the wrong
+        # side of the range - the search must still narrow correctly and converge
+        for size_at_zero_mb in (30, 300, 3000):
+            with self.subTest(size_at_zero_mb=size_at_zero_mb):
+                self.assert_converges(log_linear(size_at_zero_mb, DEFAULT_LOG_SLOPE), early_stop_margin=0.25)
+
+    def test_projected_results_narrow_the_bracket(self):
+        search = make_search()
+        search.record(23, MAX_SIZE_MB * 1.25 * 1.5)
+        search.record(35, MIN_SIZE_MB * 0.75 * 0.5)
+        self.assertFalse(search.found())
+        self.assertEqual(search.bracket(), (23, 35))
+        self.assertTrue(all(23 < crf < 35 for crf in search.candidates()))
+
+    def test_parallel_trial_results_seed_the_bracket(self):
+        # Progressive records a batch of parallel trials before asking for the next CRF
+        size_of = log_linear(300, -0.09)
+        search = make_search()
+        for crf in (20, 23, 26):
+            search.record(crf, size_of(crf))
+        run = SearchRun(self, search, size_of)
+        run.tried.extend([20, 23, 26])
+        run.run()
+        self.assertTrue(run.landed())
+
+
+class NonMonotonicTests(unittest.TestCase):
+    def wobbly(self, size_at_zero_mb, amplitude):
+        """Log-linear curve with bumps, so a higher CRF is sometimes larger than a lower one"""
+        base = log_linear(size_at_zero_mb, DEFAULT_LOG_SLOPE)
+        return lambda crf: base(crf) * (1 + amplitude * math.sin(crf * 2.1))
+
+    def test_invariants_hold_on_bumpy_curves(self):
+        for amplitude in (0.05, 0.15, 0.3):
+            for size_at_zero_mb in (50, 1000, 5000):
+                for initial_crf in (15, 23, 35):
+                    with self.subTest(amplitude=amplitude, size_at_zero_mb=size_at_zero_mb, initial_crf=initial_crf):
+                        SearchRun(self, make_search(initial_crf=initial_crf),
+                                  self.wobbly(size_at_zero_mb, amplitude)).run()
+
+    def test_small_bumps_still_converge(self):
+        for size_at_zero_mb in (50, 200, 1000):
+            with self.subTest(size_at_zero_mb=size_at_zero_mb):
+                run = SearchRun(self, make_search(), self.wobbly(size_at_zero_mb, 0.05)).run()
+                self.assertTrue(run.landed(), f"no CRF in range after trying {run.tried}")
+
+    def test_contradicting_results_end_the_search(self):
+        # A too-large result above a too-small one leaves an empty bracket, not a loop
+        search = make_search(max_attempts=10)
+        search.record(20, MIN_SIZE_MB / 2)
+        search.record(30, MAX_SIZE_MB * 2)
+        self.assertEqual(search.candidates(), [])
+        self.assertIsNone(search.next_crf())
+
+    def test_flat_curve_does_not_repeat(self):
+        # Size barely reacts to CRF, so the secant step overshoots to the bounds
+        run = SearchRun(self, make_search(max_attempts=10), lambda crf: 20.0 - crf * 0.01).run()
+        self.assertEqual(len(run.tried), len(set(run.tried)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from discord_uploader import DiscordUploader, RateLimiter, UploadCancelled, UploadError, set_upload_limit
+from webhook_server import StandInWebhook, WebhookResponse
+
+# Timer resolution slack when checking that a wait lasted at least as long as asked
+TOLERANCE = 0.05
+
+
+def make_uploader(**kwargs):
+    kwargs.setdefault('rate_limiter', RateLimiter())
+    kwargs.setdefault('backoff_base', 0.05)
+    return DiscordUploader(**kwargs)
+
+
+def post_message(uploader, url, content, stop_event=None):
+    return uploader.post(url, lambda: {'json': {'content': content}}, stop_event)
+
+
+class RateLimitTests(unittest.TestCase):
+    def test_429_waits_for_retry_after_then_retries(self):
+        with StandInWebhook([WebhookResponse(429, {'Retry-After': '0.3'}, {'retry_after': 0.3})]) as webhook:
+            uploader = make_uploader(backoff_base=5.0)  # A backoff delay would make the test time out
+            response = post_message(uploader, webhook.url(), "clip")
+
+            self.assertEqual(response.status_code, 200)
+            first, second = webhook.request_times()
+            self.assertGreaterEqual(second - first, 0.3 - TOLERANCE)
+            self.assertLess(second - first, 2.0)
+
+    def test_429_retry_after_from_json_body(self):
+        with StandInWebhook([WebhookResponse(429, body={'retry_after': 0.3})]) as webhook:
+            post_message(make_uploader(backoff_base=5.0), webhook.url(), "clip")
+
+            first, second = webhook.request_times()
+            self.assertGreaterEqual(second - first, 0.3 - TOLERANCE)
+
+    def test_global_429_blocks_every_webhook(self):
+        responses = [WebhookResponse(429, {'Retry-After': '0.3', 'X-RateLimit-Global': 'true'})]
+        with StandInWebhook(responses) as webhook:
+            uploader = make_uploader(max_retries=0)
+            with self.assertRaises(UploadError):
+                post_message(uploader, webhook.url('/api/webhooks/1/a'), "clip")
+            post_message(uploader, webhook.url('/api/webhooks/2/b'), "clip")
+
+            first, second = webhook.request_times()
+            self.assertGreaterEqual(second - first, 0.3 - TOLERANCE)
+
+    def test_exhausted_bucket_waits_for_reset_after(self):
+        exhausted = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '0.3'}
+        with StandInWebhook([WebhookResponse(200, exhausted)]) as webhook:
+            uploader = make_uploader()
+            post_message(uploader, webhook.url(), "first")
+            post_message(uploader, webhook.url(), "second")
+
+            first, second = webhook.request_times()
+            self.assertGreaterEqual(second - first, 0.3 - TOLERANCE)
+
+    def test_exhausted_bucket_does_not_hold_up_other_webhooks(self):
+        exhausted = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '30'}
+        with StandInWebhook([WebhookResponse(200, exhausted)]) as webhook:
+            uploader = make_uploader()
+            post_message(uploader, webhook.url('/api/webhooks/1/a'), "first")
+            started = time.monotonic()
+            post_message(uploader, webhook.url('/api/webhooks/2/b'), "second")
+
+            self.assertLess(time.monotonic() - started, 1.0)
+
+
+class RetryTests(unittest.TestCase):
+    def test_5xx_is_retried_with_backoff(self):
+        with StandInWebhook([WebhookResponse(502), WebhookResponse(503)]) as webhook:
+            uploader = make_uploader(backoff_base=0.1)
+            response = post_message(uploader, webhook.url(), "clip")
+
+            self.assertEqual(response.status_code, 200)
+            first, second, third = webhook.request_times()
+            # Half of each backoff delay is fixed: 0.05s before the first retry, 0.1s before the second
+            self.assertGreaterEqual(second - first, 0.05 - TOLERANCE / 2)
+            self.assertGreaterEqual(third - second, 0.1 - TOLERANCE / 2)
+
+    def test_5xx_gives_up_after_max_retries(self):
+        with StandInWebhook([WebhookResponse(500)] * 3) as webhook:
+            uploader = make_uploader(max_retries=2)
+            with self.assertRaises(UploadError) as raised:
+                post_message(uploader, webhook.url(), "clip")
+
+            self.assertEqual(raised.exception.response.status_code, 500)
+            self.assertEqual(len(webhook.requests), 3)
+
+    def test_4xx_is_not_retried(self):
+        with StandInWebhook([WebhookResponse(400, body={'message': 'Bad request'})]) as webhook:
+            with self.assertRaises(UploadError):
+                post_message(make_uploader(), webhook.url(), "clip")
+
+            self.assertEqual(len(webhook.requests), 1)
+
+    def test_read_timeout_is_not_retried(self):
+        with StandInWebhook([WebhookResponse(200, delay=1.0)]) as webhook:
+            uploader = make_uploader(read_timeout=0.2)
+            with self.assertRaises(UploadError):
+                post_message(uploader, webhook.url(), "clip")
+
+            # Discord already received the post, retrying would send the clip twice
+            self.assertEqual(len(webhook.requests), 1)
+
+    def test_connection_error_is_retried(self):
+        with StandInWebhook() as webhook:
+            url = webhook.url()
+        # The server is gone, so every attempt is refused before anything is sent
+        uploader = make_uploader(max_retries=1, backoff_base=0.01)
+        with self.assertRaises(UploadError):
+            post_message(uploader, url, "clip")
+
+    def test_file_upload_is_streamed_again_on_retry(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_path = os.path.join(directory, 'clip.mp4')
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(200 * 1024))
+
+        with StandInWebhook([WebhookResponse(500)]) as webhook:
+            make_uploader().send_file(webhook.url(), file_path, 'clip.mp4', "clip")
+
+            first_body, second_body = (body for _, _, body in webhook.requests)
+            self.assertGreater(len(second_body), 200 * 1024)
+            self.assertEqual(len(first_body), len(second_body))
+
+
+class CancelTests(unittest.TestCase):
+    def stop_soon(self, delay=0.2):
+        stop_event = threading.Event()
+        timer = threading.Timer(delay, stop_event.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        return stop_event
+
+    def test_stop_during_rate_limit_wait(self):
+        with StandInWebhook([WebhookResponse(429, {'Retry-After': '30'})]) as webhook:
+            started = time.monotonic()
+            with self.assertRaises(UploadCancelled):
+                post_message(make_uploader(), webhook.url(), "clip", stop_event=self.stop_soon())
+
+            self.assertLess(time.monotonic() - started, 5.0)
+            self.assertEqual(len(webhook.requests), 1)
+
+    def test_stop_during_backoff(self):
+        with StandInWebhook([WebhookResponse(500)]) as webhook:
+            started = time.monotonic()
+            with self.assertRaises(UploadCancelled):
+                post_message(make_uploader(backoff_base=30.0), webhook.url(), "clip", stop_event=self.stop_soon())
+
+            self.assertLess(time.monotonic() - started, 5.0)
+            self.assertEqual(len(webhook.requests), 1)
+
+    def test_stop_during_throttled_upload(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_path = os.path.join(directory, 'clip.mp4')
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(1024 * 1024))
+        set_upload_limit(64)  # 16 seconds for the whole file
+        self.addCleanup(set_upload_limit, 0)
+
+        with StandInWebhook() as webhook:
+            started = time.monotonic()
+            with self.assertRaises(UploadCancelled):
+                make_uploader().send_file(webhook.url(), file_path, 'clip.mp4', "clip", stop_event=self.stop_soon())
+
+            self.assertLess(time.monotonic() - started, 5.0)
+
+    def test_stopped_upload_stays_pending_in_the_ledger(self):
+        import clip_processor
+        from clip_ledger import ClipLedger, RESUMABLE_STATUSES
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        recording = os.path.join(directory, 'recording.mp4')
+        output = os.path.join(directory, 'Game-01012026-1200.mp4')
+        for file_path in (recording, output):
+            with open(file_path, 'wb') as f:
+                f.write(b'\0' * 1024)
+
+        ledger = ClipLedger(os.path.join(directory, 'ledger.db'))
+        self.addCleanup(ledger.close)
+
+        with StandInWebhook([WebhookResponse(429, {'Retry-After': '30'})]) as webhook:
+            url = webhook.url()
+            clip_id = ledger.claim(recording, 'Game')
+            ledger.encode_started(clip_id)
+            ledger.encoded(clip_id, output, 0.001, 30, [url])
+
+            stop_event = self.stop_soon(0.5)
+            uploads = queue.Queue()
+            uploads.put((output, 'Game', 0.001, None, clip_id, None, None))
+            with mock.patch.multiple(clip_processor, global_stop_event=stop_event, clip_ledger=ledger,
+                                     discord_uploader=make_uploader(), reshare_cache=None,
+                                     upload_queues={url: uploads}, WEBHOOK_URLS=[url]):
+                uploader = threading.Thread(target=clip_processor.process_uploads, args=(url,))
+                uploader.start()
+                uploader.join(10)
+
+            self.assertFalse(uploader.is_alive())
+            self.assertEqual(ledger.pending_targets(clip_id), [url])
+            job, = ledger.resumable_jobs()
+            self.assertEqual(job['id'], clip_id)
+            self.assertIn(job['status'], RESUMABLE_STATUSES)
+
+
+if __name__ == '__main__':
+    unittest.main()
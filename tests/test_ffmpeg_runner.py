@@ -0,0 +1,148 @@
+import io
+import time
+import unittest
+from types import SimpleNamespace
+
+from ffmpeg_runner import EncodeProgress, _read_progress
+
+REPORT = """frame={frame}
+fps=118.50
+stream_0_0_q=28.0
+bitrate=4096.0kbits/s
+total_size={total_size}
+out_time_us={out_time_us}
+out_time_ms={out_time_us}
+out_time=00:00:05.000000
+dup_frames=0
+drop_frames=0
+speed={speed}
+progress={progress}
+"""
+
+
+def report(out_time_us, total_size, speed='1.98x', progress='continue', frame=300):
+    return REPORT.format(frame=frame, total_size=total_size, out_time_us=out_time_us, speed=speed, progress=progress)
+
+
+def parse(text, duration=10.0, started=None):
+    """Feed canned -progress output through the reader, returning the reports it produced"""
+    reports = []
+    process = SimpleNamespace(stdout=io.BytesIO(text.encode('utf-8')), stopped_early=None)
+    _read_progress(process, duration, reports.append, started if started is not None else time.monotonic())
+    return reports
+
+
+class ReadProgressTests(unittest.TestCase):
+    def test_parses_each_block(self):
+        first, second, last = parse(report(2500000, 1048576) + report(5000000, 2097152) +
+                                    report(10000000, 4194304, progress='end'))
+
+        self.assertAlmostEqual(first.out_seconds, 2.5)
+        self.assertAlmostEqual(first.fps, 118.5)
+        self.assertAlmostEqual(first.speed, 1.98)
+        self.assertEqual(first.total_bytes, 1048576)
+        self.assertEqual(first.duration, 10.0)
+        self.assertFalse(first.finished)
+        self.assertAlmostEqual(second.out_seconds, 5.0)
+        self.assertTrue(last.finished)
+        # A quarter of the way through with 1MiB written, the output is heading for 4MiB
+        self.assertAlmostEqual(first.projected_bytes, 4194304)
+        self.assertAlmostEqual(last.projected_bytes, 4194304)
+
+    def test_values_before_the_first_frame(self):
+        # FFmpeg writes N/A until it has output something
+        progress, = parse(report('N/A', 'N/A', speed='N/A', frame=0).replace('fps=118.50', 'fps=0.00'))
+
+        self.assertIsNone(progress.out_seconds)
+        self.assertIsNone(progress.total_bytes)
+        self.assertIsNone(progress.speed)
+        self.assertIsNone(progress.fraction)
+        self.assertIsNone(progress.eta_seconds)
+        self.assertIsNone(progress.projected_bytes)
+
+    def test_out_time_ms_is_read_as_microseconds(self):
+        text = report(3000000, 1000).replace('out_time_us=3000000\n', '')
+        progress, = parse(text)
+        self.assertAlmostEqual(progress.out_seconds, 3.0)
+
+    def test_windows_line_endings_and_missing_keys(self):
+        progress, = parse("out_time_us=4000000\r\ntotal_size=2000\r\nprogress=continue\r\n")
+        self.assertAlmostEqual(progress.out_seconds, 4.0)
+        self.assertEqual(progress.total_bytes, 2000)
+        self.assertIsNone(progress.speed)
+        self.assertIsNone(progress.fps)
+
+    def test_each_block_starts_empty(self):
+        _, second = parse(report(2000000, 1000) + "progress=continue\n")
+        self.assertIsNone(second.out_seconds)
+        self.assertIsNone(second.total_bytes)
+
+    def test_callback_errors_do_not_stop_the_reader(self):
+        calls = []
+
+        def callback(progress):
+            calls.append(progress)
+            raise ValueError("broken callback")
+
+        process = SimpleNamespace(stdout=io.BytesIO((report(1000000, 10) + report(2000000, 20)).encode()),
+                                  stopped_early=None)
+        _read_progress(process, 10.0, callback, time.monotonic())
+        self.assertEqual(len(calls), 2)
+
+    def test_callback_can_stop_the_encode(self):
+        killed = []
+        process = SimpleNamespace(stdout=io.BytesIO((report(2000000, 10) + report(5000000, 20) +
+                                                     report(6000000, 30)).encode()),
+                                  stopped_early=None, kill=lambda: killed.append(True))
+        _read_progress(process, 10.0, lambda progress: progress.out_seconds >= 5, time.monotonic())
+        self.assertAlmostEqual(process.stopped_early.out_seconds, 5.0)
+        self.assertEqual(len(killed), 1)
+
+    def test_finished_encode_is_not_stopped(self):
+        killed = []
+        process = SimpleNamespace(stdout=io.BytesIO(report(10000000, 10, progress='end').encode()),
+                                  stopped_early=None, kill=lambda: killed.append(True))
+        _read_progress(process, 10.0, lambda progress: True, time.monotonic())
+        self.assertIsNone(process.stopped_early)
+        self.assertEqual(killed, [])
+
+
+class EncodeProgressTests(unittest.TestCase):
+    def progress(self, out_seconds=2.5, duration=10.0, total_bytes=1000000, elapsed=4.0, finished=False):
+        return EncodeProgress(out_seconds, duration, 60.0, 1.0, total_bytes, elapsed, finished)
+
+    def test_fraction_eta_and_projection(self):
+        progress = self.progress()
+        self.assertAlmostEqual(progress.fraction, 0.25)
+        self.assertAlmostEqual(progress.eta_seconds, 12.0)
+        self.assertAlmostEqual(progress.projected_bytes, 4000000)
+
+    def test_fraction_is_clamped(self):
+        self.assertEqual(self.progress(out_seconds=12.0).fraction, 1.0)
+        self.assertEqual(self.progress(out_seconds=-1.0).fraction, 0.0)
+
+    def test_finished_encode(self):
+        progress = self.progress(out_seconds=9.9, finished=True)
+        self.assertEqual(progress.fraction, 1.0)
+        self.assertEqual(progress.eta_seconds, 0.0)
+        self.assertEqual(progress.projected_bytes, 1000000)
+
+    def test_unknown_duration(self):
+        progress = self.progress(duration=None)
+        self.assertIsNone(progress.fraction)
+        self.assertIsNone(progress.eta_seconds)
+        self.assertIsNone(progress.projected_bytes)
+
+    def test_nothing_encoded_yet(self):
+        progress = self.progress(out_seconds=0.0, total_bytes=48)
+        self.assertEqual(progress.fraction, 0.0)
+        self.assertIsNone(progress.eta_seconds)
+        self.assertIsNone(progress.projected_bytes)
+
+    def test_unknown_size(self):
+        self.assertIsNone(self.progress(total_bytes=None).projected_bytes)
+        self.assertIsNone(self.progress(total_bytes=0).projected_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
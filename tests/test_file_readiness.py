@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import file_readiness
+from file_readiness import ReadinessChecker
+
+
+class ReadinessCheckerTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.recording = os.path.join(directory, 'recording.mp4')
+        with open(self.recording, 'wb') as f:
+            f.write(b'\0' * 1024)
+        self.checker = ReadinessChecker(lambda filepath: None, threading.Event(), stable_seconds=1.0,
+                                        timeout_seconds=10.0)
+        self.checker.watch(self.recording)
+        self.checker._poll()  # First look at the file records its size and mtime
+
+    def quiet_for(self, seconds):
+        self.checker.pending[os.path.normpath(self.recording)]['changed_at'] = time.time() - seconds
+
+    def test_ready_once_stable_and_released(self):
+        self.assertEqual(self.checker._poll(), [])
+        self.quiet_for(2)
+        self.assertEqual(self.checker._poll(), [self.recording])
+        self.assertFalse(self.checker.is_pending(self.recording))
+
+    def test_changes_restart_the_wait(self):
+        self.quiet_for(2)
+        with open(self.recording, 'ab') as f:
+            f.write(b'\0' * 1024)
+        self.assertEqual(self.checker._poll(), [])
+        self.assertTrue(self.checker.is_pending(self.recording))
+
+    def test_open_file_is_not_ready(self):
+        with mock.patch.object(file_readiness, 'can_open_exclusively', return_value=False):
+            self.quiet_for(2)
+            self.assertEqual(self.checker._poll(), [])
+            self.assertTrue(self.checker.is_pending(self.recording))
+
+    def test_file_left_open_is_ready_after_the_timeout(self):
+        # Held open by a thumbnailer or virus scanner long after the recorder finished
+        with mock.patch.object(file_readiness, 'can_open_exclusively', return_value=False):
+            self.quiet_for(11)
+            self.assertEqual(self.checker._poll(), [self.recording])
+            self.assertFalse(self.checker.is_pending(self.recording))
+
+    def test_deleted_file_is_forgotten(self):
+        os.remove(self.recording)
+        self.assertEqual(self.checker._poll(), [])
+        self.assertFalse(self.checker.is_pending(self.recording))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import clip_processor
+from discord_uploader import DiscordUploader, RateLimiter
+from reshare_cache import ReshareCache, file_sha256
+from webhook_server import StandInWebhook, WebhookResponse
+
+CDN_URL = 'https://cdn.discordapp.com/attachments/1/2/Game-01012026-1200.mp4'
+
+
+class ReshareCacheTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache_path = os.path.join(directory, 'reshare_cache.json')
+
+    def test_first_upload_wins(self):
+        cache = ReshareCache(self.cache_path)
+        cache.put_first('hash', 'first')
+        cache.put_first('hash', 'second')
+        self.assertEqual(cache.get('hash'), 'first')
+
+    def test_entries_from_another_process_are_kept(self):
+        monitoring = ReshareCache(self.cache_path)
+        resend = ReshareCache(self.cache_path)
+        resend.put_first('resent', 'resent-url')
+        monitoring.put_first('new', 'new-url')
+
+        self.assertEqual(monitoring.get('resent'), 'resent-url')
+        self.assertEqual(ReshareCache(self.cache_path).get('resent'), 'resent-url')
+
+    def test_expired_entries_are_not_reused(self):
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': {'hash': {'url': 'old', 'created_at': 0}}}, f)
+        self.assertIsNone(ReshareCache(self.cache_path).get('hash'))
+
+
+class ResendTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.clip = os.path.join(directory, 'Game-01012026-1200-2.mp4')
+        with open(self.clip, 'wb') as f:
+            f.write(os.urandom(64 * 1024))
+        self.cache = ReshareCache(os.path.join(directory, 'reshare_cache.json'))
+
+    def resend(self, webhook_urls):
+        with mock.patch.multiple(clip_processor, global_stop_event=threading.Event(), WEBHOOK_URLS=webhook_urls,
+                                 USER_NAME='', discord_uploader=DiscordUploader(rate_limiter=RateLimiter()),
+                                 reshare_cache=self.cache):
+            return clip_processor.resend_clip(self.clip)
+
+    def test_game_name_comes_from_the_output_filename(self):
+        self.assertEqual(clip_processor.clip_game_name(self.clip), 'Game')
+        self.assertEqual(clip_processor.clip_game_name('Apex Legends-12312025-2359.mp4'), 'Apex Legends')
+
+    def test_resend_posts_the_link_of_an_earlier_upload(self):
+        self.cache.put_first(file_sha256(self.clip), CDN_URL)
+        with StandInWebhook() as webhook:
+            self.assertEqual(self.resend([webhook.url()]), [])
+
+            (_, _, body), = webhook.requests
+            self.assertIn(CDN_URL, json.loads(body)['content'])
+
+    def test_resend_uploads_once_then_links(self):
+        responses = [WebhookResponse(200, body={'attachments': [{'url': CDN_URL}]})]
+        with StandInWebhook(responses) as webhook:
+            urls = [webhook.url('/api/webhooks/1/a'), webhook.url('/api/webhooks/2/b')]
+            self.assertEqual(self.resend(urls), [])
+
+            (_, upload_path, upload), (_, _, link) = webhook.requests
+            self.assertIn('wait=true', upload_path)
+            self.assertGreater(len(upload), 64 * 1024)
+            self.assertIn(CDN_URL, json.loads(link)['content'])
+        self.assertEqual(self.cache.get(file_sha256(self.clip)), CDN_URL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from resolution_ladder import Rung, bits_per_pixel, ladder_rungs, parse_frame_rate, plan_rung, rung_filter
+
+MIN_BPP = 0.1
+
+
+class PlanRungTests(unittest.TestCase):
+    # (source width, height, fps, video kbps) -> rung
+    CASES = [
+        # 1440p60 needs 22.1Mbps at 0.1 bpp
+        ((2560, 1440, 60, 22200), Rung(2560, 1440, 60)),
+        ((2560, 1440, 60, 22000), Rung(1920, 1080, 60)),
+        # 1080p60 needs 12.4Mbps, 1440p30 11.1Mbps
+        ((2560, 1440, 60, 12000), Rung(2560, 1440, 30)),
+        ((2560, 1440, 60, 6300), Rung(1920, 1080, 30)),
+        ((2560, 1440, 60, 5000), Rung(1600, 900, 30)),
+        # Below even 360p30 (0.69Mbps) the smallest rung is the floor
+        ((2560, 1440, 60, 100), Rung(640, 360, 30)),
+        # A 30fps source never gets a 60fps rung, and 59.94 counts as 60
+        ((1920, 1080, 30, 50000), Rung(1920, 1080, 30)),
+        ((1920, 1080, 59.94, 50000), Rung(1920, 1080, 59.94)),
+        # A 720p source is never scaled up
+        ((1280, 720, 60, 50000), Rung(1280, 720, 60)),
+        ((1280, 720, 60, 2000), Rung(960, 540, 30)),
+    ]
+
+    def test_thresholds(self):
+        for (width, height, fps, video_kbps), expected in self.CASES:
+            with self.subTest(source=(width, height, fps), video_kbps=video_kbps):
+                rung = plan_rung(width, height, fps, video_kbps, MIN_BPP)
+                self.assertEqual(rung, expected)
+
+    def test_chosen_rung_meets_the_minimum(self):
+        for video_kbps in range(500, 40000, 500):
+            with self.subTest(video_kbps=video_kbps):
+                rung = plan_rung(2560, 1440, 60, video_kbps, MIN_BPP)
+                if rung != Rung(640, 360, 30):
+                    self.assertGreaterEqual(bits_per_pixel(video_kbps, rung), MIN_BPP)
+
+    def test_never_upscales(self):
+        for width, height, fps in ((1280, 720, 60), (854, 480, 30), (640, 360, 24)):
+            with self.subTest(source=(width, height, fps)):
+                for rung in ladder_rungs(width, height, fps):
+                    self.assertLessEqual(rung.height, height)
+                    self.assertLessEqual(rung.width, width)
+                    self.assertLessEqual(rung.fps, fps)
+
+    def test_odd_aspect_ratios_keep_even_dimensions(self):
+        for rung in ladder_rungs(3440, 1440, 60):
+            self.assertEqual(rung.width % 2, 0)
+            self.assertEqual(rung.height % 2, 0)
+
+    def test_rungs_are_largest_first(self):
+        rungs = ladder_rungs(2560, 1440, 60)
+        pixel_rates = [rung.width * rung.height * rung.fps for rung in rungs]
+        self.assertEqual(pixel_rates, sorted(pixel_rates, reverse=True))
+        self.assertEqual(rungs[0], Rung(2560, 1440, 60))
+
+
+class FilterTests(unittest.TestCase):
+    def test_source_rung_needs_no_filter(self):
+        self.assertIsNone(rung_filter(Rung(1920, 1080, 60), 1920, 1080, 60))
+        self.assertIsNone(rung_filter(Rung(1920, 1080, 59.94), 1920, 1080, 59.94))
+
+    def test_scale_and_frame_rate(self):
+        self.assertEqual(rung_filter(Rung(1280, 720, 30), 1920, 1080, 60), "scale=1280:720:flags=lanczos,fps=30")
+        self.assertEqual(rung_filter(Rung(1920, 1080, 30), 1920, 1080, 60), "fps=30")
+
+    def test_parse_frame_rate(self):
+        self.assertAlmostEqual(parse_frame_rate('60000/1001'), 59.94, places=2)
+        self.assertEqual(parse_frame_rate('30'), 30)
+        for rate in ('0/0', 'N/A', '', None, '0/1'):
+            with self.subTest(rate=rate):
+                self.assertIsNone(parse_frame_rate(rate))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from video_codecs import CODEC_SVT_AV1, CODEC_VP9, CODEC_X264, CODEC_X265, VIDEO_CODECS, X264_CRF_MAX, get_codec
+
+
+class NativeCrfTests(unittest.TestCase):
+    # codec -> [(x264-scale CRF, native CRF)]
+    CASES = {
+        CODEC_X264: [(0, 0), (1, 1), (23, 23), (X264_CRF_MAX, 51)],
+        CODEC_X265: [(0, 0), (1, 1), (23, 23), (X264_CRF_MAX, 51)],
+        # libsvtav1 rejects CRF 0, so the bottom of the scale maps to 1
+        CODEC_SVT_AV1: [(0, 1), (1, 1), (23, 28), (30, 37), (X264_CRF_MAX, 63)],
+        CODEC_VP9: [(0, 0), (1, 1), (23, 28), (30, 37), (X264_CRF_MAX, 63)],
+    }
+
+    def test_linear_mapping(self):
+        for name, cases in self.CASES.items():
+            codec = VIDEO_CODECS[name]
+            for crf, native in cases:
+                with self.subTest(codec=name, crf=crf):
+                    self.assertEqual(codec.native_crf(crf), native)
+
+    def test_mapping_stays_on_the_native_scale(self):
+        for name, codec in VIDEO_CODECS.items():
+            with self.subTest(codec=name):
+                self.assertEqual(codec.native_crf(-5), codec.native_crf(0))
+                self.assertEqual(codec.native_crf(X264_CRF_MAX + 10), codec.crf_max)
+                mapped = [codec.native_crf(crf) for crf in range(X264_CRF_MAX + 1)]
+                self.assertEqual(mapped, sorted(mapped))
+
+    def test_crf_options_use_the_native_crf(self):
+        for name, codec in VIDEO_CODECS.items():
+            with self.subTest(codec=name):
+                options = codec.crf_options(X264_CRF_MAX, 'medium')
+                self.assertEqual(options['vcodec'], name)
+                self.assertEqual(options['crf'], codec.crf_max)
+
+    def test_unknown_codec_falls_back_to_x264(self):
+        self.assertIs(get_codec('h266'), VIDEO_CODECS[CODEC_X264])
+        self.assertIs(get_codec(CODEC_VP9), VIDEO_CODECS[CODEC_VP9])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Local stand-in for a Discord webhook that answers with scripted responses"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class WebhookResponse:
+    def __init__(self, status=200, headers=None, body=None, delay=0.0):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body if body is not None else {'attachments': []}
+        self.delay = delay  # Seconds to wait after reading the request, before answering
+
+
+class StandInWebhook:
+    """Serves scripted responses in order (200 once the script runs out) and records every request"""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.requests = []  # (time.monotonic() when received, path, body bytes)
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def url(self, path='/api/webhooks/1/token'):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def request_times(self):
+        with self.lock:
+            return [received_at for received_at, _, _ in self.requests]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _next_response(self, path, body):
+        with self.lock:
+            self.requests.append((time.monotonic(), path, body))
+            return self.responses.pop(0) if self.responses else WebhookResponse()
+
+    def _handler_class(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                response = webhook._next_response(self.path, body)
+                if response.delay:
+                    time.sleep(response.delay)
+                payload = json.dumps(response.body).encode('utf-8')
+                try:
+                    self.send_response(response.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    for name, value in response.headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up waiting
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
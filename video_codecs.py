@@ -0,0 +1,161 @@
+"""
+Encoder profiles for the video codecs clips can be compressed with.
+
+Every CRF in the configuration (CRF_MIN/CRF_MAX, QUICK_CRF, the Progressive search and the CRF model)
+stays on the x264 0-51 scale. Each profile maps that scale linearly onto its encoder's own quality
+scale and maps the x264 preset names onto its encoder's speed settings, so the same settings drive
+every codec and the search keeps working in steps the user already knows.
+
+Only the final compression uses the selected codec. Extraction keeps writing an x264 intermediate
+file, which is fast to decode for the trials that follow.
+
+Run `python video_codecs.py` to check that the CRF, bitrate and two-pass commands of every codec can
+be built (FFmpeg itself is not needed).
+"""
+import os
+import sys
+
+import ffmpeg
+
+CODEC_X264 = 'libx264'
+CODEC_X265 = 'libx265'
+CODEC_SVT_AV1 = 'libsvtav1'
+CODEC_VP9 = 'libvpx-vp9'
+
+X264_CRF_MAX = 51
+
+# x264 preset name -> SVT-AV1 preset (0 = slowest, 13 = fastest)
+SVT_AV1_PRESETS = {
+    'ultrafast': 12, 'superfast': 11, 'veryfast': 10, 'faster': 9, 'fast': 8,
+    'medium': 7, 'slow': 6, 'slower': 5, 'veryslow': 4
+}
+# x264 preset name -> libvpx cpu-used with the 'good' deadline (0 = slowest, 5 = fastest)
+VP9_CPU_USED = {
+    'ultrafast': 5, 'superfast': 5, 'veryfast': 4, 'faster': 4, 'fast': 3,
+    'medium': 2, 'slow': 1, 'slower': 1, 'veryslow': 0
+}
+
+
+class VideoCodec:
+    """FFmpeg output options for one encoder"""
+
+    def __init__(self, name, label, crf_max=X264_CRF_MAX, bpp_scale=1.0, extra_options=None, two_pass=True, crf_min=0):
+        self.name = name
+        self.label = label
+        self.crf_min = crf_min
+        self.crf_max = crf_max
+        self.bpp_scale = bpp_scale  # Bits per pixel needed for the same quality, relative to x264
+        self.extra_options = extra_options or {}
+        self.two_pass = two_pass  # False: Two-Pass mode falls back to one bitrate-targeted pass
+
+    def native_crf(self, crf):
+        """Map a CRF on the x264 0-51 scale onto this encoder's scale"""
+        return max(self.crf_min, min(self.crf_max, int(round(crf * self.crf_max / X264_CRF_MAX))))
+
+    def preset_options(self, preset):
+        return {'preset': preset}
+
+    def crf_options(self, crf, preset):
+        """Output options for a constant-quality encode at an x264-scale CRF"""
+        return {'vcodec': self.name, 'crf': self.native_crf(crf), **self.preset_options(preset), **self.extra_options}
+
+    def bitrate_options(self, video_kbps, preset):
+        """Output options for an average-bitrate encode"""
+        return {'vcodec': self.name, 'b:v': f"{video_kbps}k", **self.preset_options(preset), **self.extra_options}
+
+    def pass_options(self, pass_number, passlog_prefix):
+        return {'pass': pass_number, 'passlogfile': passlog_prefix}
+
+    def two_pass_options(self, video_kbps, preset, pass_number, passlog_prefix):
+        """Output options for one pass of a two-pass encode.
+
+        The pass options are merged over the bitrate options, so an encoder option both of them set
+        (x265-params) is passed once, in its pass-specific form.
+        """
+        return {**self.bitrate_options(video_kbps, preset), **self.pass_options(pass_number, passlog_prefix)}
+
+    def pass_log_files(self, passlog_prefix):
+        """Files the first pass leaves behind for the second one"""
+        return [f"{passlog_prefix}-0.log", f"{passlog_prefix}-0.log.mbtree"]
+
+    def model_preset(self, preset):
+        """Preset label for the CRF model, so sizes learned with different codecs aren't mixed"""
+        return preset if self.name == CODEC_X264 else f"{self.name}:{preset}"
+
+
+class X265Codec(VideoCodec):
+    """x265 reads its two-pass settings from x265-params instead of -pass/-passlogfile"""
+
+    def pass_options(self, pass_number, passlog_prefix):
+        # Replaces the x265-params of extra_options, so it repeats log-level=error
+        stats_file = f"{passlog_prefix}.log".replace('\\', '/').replace(':', '\\:')
+        return {'x265-params': f"log-level=error:pass={pass_number}:stats={stats_file}"}
+
+    def pass_log_files(self, passlog_prefix):
+        return [f"{passlog_prefix}.log", f"{passlog_prefix}.log.cutree"]
+
+
+class SvtAv1Codec(VideoCodec):
+    def preset_options(self, preset):
+        return {'preset': SVT_AV1_PRESETS.get(preset, SVT_AV1_PRESETS['medium'])}
+
+
+class Vp9Codec(VideoCodec):
+    def preset_options(self, preset):
+        return {'deadline': 'good', 'cpu-used': VP9_CPU_USED.get(preset, VP9_CPU_USED['medium'])}
+
+    def crf_options(self, crf, preset):
+        # libvpx only runs in constant-quality mode when the bitrate is explicitly 0
+        return {**super().crf_options(crf, preset), 'b:v': 0}
+
+    def pass_log_files(self, passlog_prefix):
+        return [f"{passlog_prefix}-0.log"]
+
+
+VIDEO_CODECS = {
+    CODEC_X264: VideoCodec(CODEC_X264, "H.264 (x264)"),
+    # hvc1 tag so Discord and Apple players recognise HEVC in MP4
+    CODEC_X265: X265Codec(CODEC_X265, "HEVC (x265)", bpp_scale=0.7, extra_options={'tag:v': 'hvc1', 'x265-params': 'log-level=error'}),
+    # libsvtav1 rejects CRF 0
+    CODEC_SVT_AV1: SvtAv1Codec(CODEC_SVT_AV1, "AV1 (SVT-AV1)", crf_min=1, crf_max=63, bpp_scale=0.6,
+                               extra_options={'pix_fmt': 'yuv420p'}, two_pass=False),
+    CODEC_VP9: Vp9Codec(CODEC_VP9, "VP9 (libvpx)", crf_max=63, bpp_scale=0.75,
+                        extra_options={'pix_fmt': 'yuv420p', 'row-mt': 1}),
+}
+
+
+def get_codec(name):
+    """Profile for a codec name, falling back to x264 for unknown names"""
+    codec = VIDEO_CODECS.get(name)
+    if codec is None:
+        print(f"Unknown video codec '{name}', using {CODEC_X264}")
+        return VIDEO_CODECS[CODEC_X264]
+    return codec
+
+
+def check_commands():
+    """Build the CRF, bitrate and two-pass FFmpeg commands of every codec. Returns the number of failures."""
+    failures = 0
+    passlog_prefix = os.path.join('out', 'passlog_clip.mp4')
+    for codec in VIDEO_CODECS.values():
+        commands = {
+            'crf': [codec.crf_options(0, 'medium'), codec.crf_options(X264_CRF_MAX, 'veryslow')],
+            'bitrate': [codec.bitrate_options(2500, 'medium')],
+            'two-pass': [codec.two_pass_options(2500, 'medium', n, passlog_prefix) for n in (1, 2)],
+        }
+        for kind, option_sets in commands.items():
+            for options in option_sets:
+                try:
+                    ffmpeg.compile(ffmpeg.input('clip.mp4').output('out.mp4', **options), overwrite_output=True)
+                except Exception as e:
+                    print(f"{codec.name}: {kind} command could not be built: {e!r}")
+                    failures += 1
+        if not codec.crf_min <= codec.native_crf(0) <= codec.native_crf(X264_CRF_MAX) <= codec.crf_max:
+            print(f"{codec.name}: CRF mapping leaves {codec.crf_min}..{codec.crf_max}")
+            failures += 1
+    print(f"Checked {len(VIDEO_CODECS)} codecs, {failures} problem(s)")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_commands() else 0)